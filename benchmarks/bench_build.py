@@ -0,0 +1,61 @@
+"""Benchmark building synthetic sites of increasing size.
+
+Run with `uv run python -m benchmarks.bench_build --output results.json` and
+compare two versions with `--compare results.json`. A single site can be
+benchmarked with `mackerel bench`.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from mackerel.bench import SiteSpec
+from mackerel.bench import format_results
+from mackerel.bench import run_benchmarks
+
+SITES = {
+    "small": SiteSpec(docs=50, static_files=10),
+    "medium": SiteSpec(docs=500, categories_per_doc=2, static_files=100),
+    "large": SiteSpec(
+        docs=2000,
+        body_size=8000,
+        categories=20,
+        categories_per_doc=3,
+        static_files=500,
+        static_size=64 * 1024,
+    ),
+    "lists": SiteSpec(docs=500, categories=10, category_lists_per_doc=2),
+}
+
+
+def main() -> None:
+    """Time building each site and write the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sites", nargs="*", default=list(SITES), help=", ".join(SITES))
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else {}
+    results = {}
+    for name in args.sites:
+        with tempfile.TemporaryDirectory(prefix="mackerel-bench-") as tmp:
+            results[name] = run_benchmarks(
+                Path(tmp) / name,
+                SITES[name],
+                jobs=args.jobs,
+                repeat=args.repeat,
+            )
+        sys.stdout.write(
+            f"{name}\n{format_results(results[name], baseline.get(name))}\n\n",
+        )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark the metadata parsers against each other.
+
+Run with `uv run python -m benchmarks.bench_parsers`.
+"""
+
+import argparse
+import sys
+import timeit
+from functools import partial
+
+from mackerel import types as t
+from mackerel.parsers import METADATA_PARSERS
+
+HEADERS = {
+    "yaml": """\
+---
+title: Benchmark document
+template: page
+created_at: 2025-01-01 10:00:00
+excerpt: A document used to benchmark the metadata parsers.
+categories: [posts, benchmarks]
+category_lists:
+  - name: posts
+    sort_by: created_at
+    order: desc
+---
+""",
+    "toml": """\
++++
+title = "Benchmark document"
+template = "page"
+created_at = 2025-01-01 10:00:00
+excerpt = "A document used to benchmark the metadata parsers."
+categories = ["posts", "benchmarks"]
+category_lists = [{ name = "posts", sort_by = "created_at", order = "desc" }]
++++
+""",
+    "json": """\
+;;;
+{
+  "title": "Benchmark document",
+  "template": "page",
+  "created_at": "2025-01-01 10:00:00",
+  "excerpt": "A document used to benchmark the metadata parsers.",
+  "categories": ["posts", "benchmarks"],
+  "category_lists": [{"name": "posts", "sort_by": "created_at", "order": "desc"}]
+}
+;;;
+""",
+}
+
+
+def _parse(metadata_parser: t.MetadataParser, raw: str) -> t.DocumentMetadata:
+    header, _ = metadata_parser.split(raw)
+    return metadata_parser.parse(header)
+
+
+def main() -> None:
+    """Time splitting and parsing a document with each metadata parser."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=5000)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    args = parser.parse_args()
+
+    body = "\n# Benchmark document\n\n" + "Lorem ipsum dolor sit.\n\n" * args.paragraphs
+    for name, parser_cls in METADATA_PARSERS.items():
+        metadata_parser = parser_cls()
+        for fmt, header in HEADERS.items():
+            raw = header + body
+            try:
+                _parse(metadata_parser, raw)
+            except KeyError:
+                continue  # The parser does not support this format
+            best = min(
+                timeit.repeat(
+                    partial(_parse, metadata_parser, raw),
+                    number=args.number,
+                    repeat=5,
+                ),
+            )
+            sys.stdout.write(
+                f"{name:<24} {fmt:<5} {best / args.number * 1e6:8.1f} us per doc\n",
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,27 @@
 """Mackerel - A static site generator."""
 
-from importlib.metadata import metadata
-from importlib.metadata import version
+from typing import Any
+from typing import Final
 
-__version__ = version("mackerel")
-_meta = metadata("mackerel")
+# Resolved from the installed package metadata on first access, importing
+# importlib.metadata only when they are used
+__version__: str
+__title__: str
+__description__: str | None
+__author__: str | None
+__author_email__: str | None
+__license__: str | None
+__url__: str
 
-__title__ = _meta.get("Name", "mackerel")
-__description__ = _meta.get("Summary")
-__author__ = _meta.get("Author")
-__author_email__ = _meta.get("Author-email")
-__license__ = _meta.get("License")
-__url__ = _meta.get("Home-page", "https://mackerel.sh")
+# Metadata attributes with their metadata field and default value
+_METADATA_FIELDS: Final[dict[str, tuple[str, str | None]]] = {
+    "__title__": ("Name", "mackerel"),
+    "__description__": ("Summary", None),
+    "__author__": ("Author", None),
+    "__author_email__": ("Author-email", None),
+    "__license__": ("License", None),
+    "__url__": ("Home-page", "https://mackerel.sh"),
+}
 
 __all__ = [
     "__author__",
@@ -22,3 +32,22 @@ __all__ = [
     "__url__",
     "__version__",
 ]
+
+
+def __getattr__(name: str) -> Any:  # noqa: ANN401
+    """Resolve the package metadata attributes once, when first accessed."""
+    value: str | None
+    if name == "__version__":
+        from importlib.metadata import version
+
+        value = version("mackerel")
+    elif name in _METADATA_FIELDS:
+        from importlib.metadata import metadata
+
+        key, default = _METADATA_FIELDS[name]
+        value = metadata("mackerel").get(key, default)
+    else:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    globals()[name] = value
+    return value
@@ -0,0 +1,298 @@
+"""The bench module generates synthetic sites and times building them."""
+
+import platform
+import random
+import shutil
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import Final
+
+import tomli_w
+
+import mackerel
+from mackerel import config
+from mackerel.develop import DevelopSite
+
+WORDS: Final[tuple[str, ...]] = (
+    "lorem",
+    "ipsum",
+    "dolor",
+    "sit",
+    "amet",
+    "consectetur",
+    "adipiscing",
+    "elit",
+    "sed",
+    "do",
+    "eiusmod",
+    "tempor",
+    "incididunt",
+    "ut",
+    "labore",
+    "et",
+    "dolore",
+    "magna",
+    "aliqua",
+    "enim",
+    "ad",
+    "minim",
+    "veniam",
+)
+
+# Timed benchmarks, in the order they run
+BENCHMARKS: Final[tuple[str, ...]] = (
+    "cold_build",
+    "warm_build",
+    "noop_build",
+    "develop_rebuild",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class SiteSpec:
+    """The size of a synthetic site."""
+
+    docs: int = 100
+    # Approximate size in bytes of the Markdown body of each document
+    body_size: int = 2000
+    categories: int = 5
+    categories_per_doc: int = 1
+    category_lists_per_doc: int = 0
+    static_files: int = 10
+    static_size: int = 16 * 1024
+    seed: int = 0
+
+    def __post_init__(self) -> None:
+        """Post-initialization validation."""
+        if self.docs < 1:
+            msg = f"Invalid number of docs: {self.docs}. It must be at least 1"
+            raise ValueError(msg)
+        if not 0 <= self.categories_per_doc <= self.categories:
+            msg = (
+                f"Invalid categories per doc: {self.categories_per_doc}. "
+                f"It must be between 0 and {self.categories}"
+            )
+            raise ValueError(msg)
+        if not 0 <= self.category_lists_per_doc <= self.categories:
+            msg = (
+                f"Invalid category lists per doc: {self.category_lists_per_doc}. "
+                f"It must be between 0 and {self.categories}"
+            )
+            raise ValueError(msg)
+
+
+def _body(rng: random.Random, size: int) -> str:
+    """Create a Markdown body of about the given size."""
+    parts: list[str] = []
+    length = 0
+    while length < size:
+        match len(parts) % 4:
+            case 0:
+                part = f"## {' '.join(rng.choices(WORDS, k=4)).capitalize()}"
+            case 1:
+                part = " ".join(rng.choices(WORDS, k=60)).capitalize() + "."
+            case 2:
+                part = "\n".join(
+                    f"* **{word}** item" for word in rng.choices(WORDS, k=4)
+                )
+            case _:
+                link, code = rng.choices(WORDS, k=2)
+                part = f"See [{link}](/index.html) and `{code}()`."
+        parts.append(part)
+        length += len(part) + 2
+    return "\n\n".join(parts)
+
+
+def _document(rng: random.Random, spec: SiteSpec, i: int) -> str:
+    """Create the source of the i-th document of the site."""
+    categories = [
+        f"category-{(i + j) % spec.categories}" for j in range(spec.categories_per_doc)
+    ]
+    lines = [
+        "---",
+        f"title: Document {i}",
+        f"template: {'list' if spec.category_lists_per_doc else 'page'}",
+        f"created_at: 2025-01-01 00:00:{i % 60:02d}",
+        f"excerpt: The excerpt of document {i}.",
+        f"categories: [{', '.join(categories)}]",
+        "category_lists:",
+    ]
+    for j in range(spec.category_lists_per_doc):
+        lines.append(f"  - name: category-{j}")
+        lines.append("    sort_by: created_at")
+    if not spec.category_lists_per_doc:
+        lines[-1] += " []"
+    return "\n".join([*lines, "---", "", _body(rng, spec.body_size), ""])
+
+
+def generate_site(site_path: Path, spec: SiteSpec, jobs: int = 1) -> Path:
+    """Write a synthetic site of the given size and return its config file.
+
+    The site uses the starter templates. The generated content only depends
+    on the spec, so sites generated with the same spec build the same pages.
+    """
+    rng = random.Random(spec.seed)  # noqa: S311
+    content_path = site_path / "content"
+    shutil.copytree(
+        Path(mackerel.__file__).parent / "site" / "templates",
+        site_path / "templates",
+    )
+    posts_path = content_path / "posts"
+    posts_path.mkdir(parents=True)
+    lists = "\n".join(
+        f"  - name: category-{j}\n    sort_by: created_at"
+        for j in range(spec.categories)
+    )
+    (content_path / "index.md").write_text(
+        f"---\ntitle: Index\ntemplate: list\ncategory_lists:\n{lists}\n---\n\nIndex\n",
+    )
+    for i in range(spec.docs):
+        (posts_path / f"post-{i:05d}.md").write_text(_document(rng, spec, i))
+    if spec.static_files:
+        static_path = content_path / "static"
+        static_path.mkdir()
+        for i in range(spec.static_files):
+            (static_path / f"file-{i:05d}.bin").write_bytes(
+                rng.randbytes(spec.static_size),
+            )
+
+    config_dict = config.AppConfig().to_dict()
+    config_dict["mackerel"]["jobs"] = jobs
+    config_path = site_path / "mackerelconfig.toml"
+    with config_path.open("wb") as f:
+        tomli_w.dump(config_dict, f)
+    return config_path
+
+
+@dataclass(frozen=True, slots=True)
+class Timing:
+    """The durations in seconds of the runs of a benchmark."""
+
+    runs: list[float]
+
+    @property
+    def min(self) -> float:
+        """The fastest run."""
+        return min(self.runs)
+
+    @property
+    def median(self) -> float:
+        """The median run."""
+        return statistics.median(self.runs)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to a JSON compatible dictionary."""
+        return {"runs": self.runs, "min": self.min, "median": self.median}
+
+
+def _timed_build(config_path: Path) -> float:
+    """Build the site and save its manifest, like `mackerel build`."""
+    start = time.perf_counter()
+    site = DevelopSite(config_path)
+    site.rebuild()
+    site.save()
+    return time.perf_counter() - start
+
+
+def _timed_clean_build(config_path: Path, *, clear_cache: bool) -> float:
+    """Build the site from an empty build directory."""
+    mcfg = config.load_config(config_path).mackerel
+    shutil.rmtree(mcfg.build_path, ignore_errors=True)
+    if clear_cache:
+        shutil.rmtree(mcfg.cache_path, ignore_errors=True)
+    return _timed_build(config_path)
+
+
+def _timed_rebuilds(config_path: Path, repeat: int) -> list[float]:
+    """Edit one document at a time and rebuild it like the development server."""
+    site = DevelopSite(config_path)
+    site.rebuild()
+    posts = sorted((site.cfg.mackerel.content_path / "posts").iterdir())
+    runs: list[float] = []
+    for i in range(repeat):
+        post = posts[i % len(posts)]
+        post.write_text(post.read_text() + f"\nEdited {i}.\n")
+        start = time.perf_counter()
+        site.rebuild({post})
+        runs.append(time.perf_counter() - start)
+    site.save()
+    return runs
+
+
+def peak_memory(config_path: Path) -> int:
+    """Measure the peak Python memory allocated by a cold build in bytes.
+
+    Allocations of worker processes are not counted, so the site should be
+    built with a single job to measure all of them.
+    """
+    tracemalloc.start()
+    try:
+        _timed_clean_build(config_path, clear_cache=True)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(
+    site_path: Path,
+    spec: SiteSpec,
+    *,
+    jobs: int = 1,
+    repeat: int = 3,
+    memory: bool = True,
+) -> dict[str, Any]:
+    """Generate a site and time building it, returning machine readable results.
+
+    The site is generated in site_path, which must not exist. A cold build
+    starts without build directory and caches, a warm build without build
+    directory but with the caches of the previous build, a no-op build with
+    nothing changed since the previous build, and a develop rebuild after
+    editing one document.
+    """
+    config_path = generate_site(site_path, spec, jobs=jobs)
+    timings = {
+        "cold_build": Timing(
+            [_timed_clean_build(config_path, clear_cache=True) for _ in range(repeat)],
+        ),
+        "warm_build": Timing(
+            [_timed_clean_build(config_path, clear_cache=False) for _ in range(repeat)],
+        ),
+        "noop_build": Timing([_timed_build(config_path) for _ in range(repeat)]),
+        "develop_rebuild": Timing(_timed_rebuilds(config_path, repeat)),
+    }
+    return {
+        "mackerel": mackerel.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": asdict(spec),
+        "jobs": jobs,
+        "repeat": repeat,
+        "results": {name: timing.to_dict() for name, timing in timings.items()},
+        "peak_memory": peak_memory(config_path) if memory else None,
+    }
+
+
+def format_results(
+    results: dict[str, Any],
+    baseline: dict[str, Any] | None = None,
+) -> str:
+    """Format the results as a table, compared to a baseline if given."""
+    lines = [f"mackerel {results['mackerel']}, Python {results['python']}"]
+    for name in BENCHMARKS:
+        timing = results["results"][name]
+        line = (
+            f"{name:<16} min {timing['min'] * 1e3:10.1f} ms  "
+            f"median {timing['median'] * 1e3:10.1f} ms"
+        )
+        if baseline is not None and name in baseline["results"]:
+            before = baseline["results"][name]["median"]
+            line += f"  {timing['median'] / before:6.2f}x baseline"
+        lines.append(line)
+    if results["peak_memory"] is not None:
+        lines.append(f"{'peak_memory':<16} {results['peak_memory'] / 2**20:.1f} MiB")
+    return "\n".join(lines)
@@ -1,22 +1,162 @@
 """The build module contains functions for building the static site."""
 
 import datetime as dt
+import hashlib
+import json
 import logging
+import os
 import shutil
-from collections.abc import Callable
+import stat
+from collections import defaultdict
+from collections import deque
+from collections.abc import Collection
+from collections.abc import Container
 from collections.abc import Generator
-from functools import wraps
-from itertools import chain
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Mapping
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager
+from contextlib import nullcontext
+from contextlib import suppress
+from dataclasses import dataclass
+from dataclasses import replace
+from functools import partial
 from pathlib import Path
+from pathlib import PurePath
+from pathlib import PurePosixPath
+from typing import Any
+from typing import Final
+from typing import TypeVar
+from typing import cast
 
-from dateutil.parser import ParserError
-from dateutil.parser import parse as parse_datetime
-
+import mackerel
+from mackerel import profiling
 from mackerel import types as t
+from mackerel.cache import CachedContentRenderer
+from mackerel.compress import compress_files
+from mackerel.compress import compressors
 from mackerel.config import AppConfig
+from mackerel.config import MackerelConfig
+from mackerel.discover import IGNORE_FILE_NAME
+from mackerel.discover import IgnoreRules
+from mackerel.discover import scan_files
+from mackerel.manifest import ASSET_MANIFEST_NAME
+from mackerel.manifest import BuildManifest
+from mackerel.manifest import DocumentEntry
+from mackerel.manifest import FileEntry
+from mackerel.manifest import check_file
+from mackerel.manifest import load_manifest
+from mackerel.manifest import save_asset_manifest
+from mackerel.manifest import save_manifest
+from mackerel.minify import Minifier
+from mackerel.minify import create_minifier
+from mackerel.parsers import parse_datetime
+from mackerel.store import DocumentSequence
+from mackerel.store import DocumentStore
+from mackerel.store import document_metadata
 
 logger = logging.getLogger(__name__)
 
+_P = TypeVar("_P", bound=PurePath)
+
+WRITE_BUFFER_SIZE: Final[int] = 64 * 1024
+# Hex digits of the content hash added to fingerprinted asset names
+FINGERPRINT_LENGTH: Final[int] = 12
+
+# State of a worker process, set once by the initializer of its pool
+_worker_state: dict[str, Any] = {}
+
+
+def _copy_file_range(src: Path, dst: Path, size: int) -> None:
+    """Copy a file inside the kernel, which reflinks on supporting filesystems."""
+    with src.open("rb") as fsrc, dst.open("wb") as fdst:
+        remaining = size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+def _copy_file(src: Path, dst: Path, *, link: bool = False) -> None:
+    """Copy or hard link a file, keeping its mtime to detect changes later.
+
+    Copies are written to a temporary file replacing the target, never
+    through it, since the target may be a hard link to the source left by a
+    build in hardlink mode.
+    """
+    st = src.stat()
+    if link:
+        dst.unlink(missing_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            logger.debug("Cannot link %s, copying it instead", src)
+        else:
+            return
+    tmp_path = dst.with_name(f".{dst.name}.tmp")
+    try:
+        try:
+            if (
+                not hasattr(os, "copy_file_range")
+                or dst.parent.stat().st_dev != st.st_dev
+            ):
+                raise OSError  # noqa: TRY301
+            _copy_file_range(src, tmp_path, st.st_size)
+        except OSError:
+            shutil.copyfile(src=src, dst=tmp_path)
+        os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        tmp_path.replace(dst)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _same_content(path: Path, other: Path) -> bool:
+    """Check if two files have the same bytes, comparing their sizes first."""
+    try:
+        if path.stat().st_size != other.stat().st_size:
+            return False
+        with path.open("rb") as f, other.open("rb") as f_other:
+            while True:
+                chunk = f.read(WRITE_BUFFER_SIZE)
+                if chunk != f_other.read(WRITE_BUFFER_SIZE):
+                    return False
+                if not chunk:
+                    return True
+    except FileNotFoundError:
+        return False
+
+
+def _minifies(minifier: Minifier | None, f: Path) -> bool:
+    """Whether the file is a template stylesheet the minifier minifies."""
+    return (
+        minifier is not None
+        and "css" in minifier.types
+        and isinstance(f, t.TemplateAsset)
+        and f.suffix == ".css"
+    )
+
+
+def _write_minified(src: Path, dst: Path, minifier: Minifier) -> None:
+    """Write a minified stylesheet, keeping the mtime of its source."""
+    st = src.stat()
+    css = minifier.css(src.read_text())
+    if css is None:
+        _copy_file(src, dst)
+        return
+    # The target may be a hard link to the source of a previous build
+    tmp_path = dst.with_name(f".{dst.name}.tmp")
+    tmp_path.write_text(css)
+    if _same_content(tmp_path, dst) and dst.stat().st_nlink == 1:
+        tmp_path.unlink()
+    else:
+        tmp_path.replace(dst)
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+
 
 def copy_static_file(
     f: t.StaticFile | t.TemplateAsset,
@@ -31,10 +171,55 @@ def copy_static_file(
     if dry_run:
         return
     target_path.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copyfile(src=f, dst=target_path)
+    with profiling.span("copy_static_file", "static", str(f)):
+        _copy_file(src=f, dst=target_path)
     # Plugin hook post static file handling here
 
 
+def fingerprint_path(key: str, digest: str) -> str:
+    """Add the start of a content hash to a path, like `styles.<hash>.css`."""
+    path = PurePosixPath(key)
+    return path.with_name(
+        f"{path.stem}.{digest[:FINGERPRINT_LENGTH]}{path.suffix}"
+    ).as_posix()
+
+
+def copy_static_files(
+    files: Iterable[tuple[t.StaticFile | t.TemplateAsset, t.BuildPath]],
+    *,
+    link: bool = False,
+    dry_run: bool = False,
+    minifier: Minifier | None = None,
+) -> list[t.BuildPath]:
+    """Copy static files to their target paths on a thread pool.
+
+    Target directories are created once up front. Files are hard linked when
+    link is set, falling back to copying across filesystems. Template
+    stylesheets are minified instead when the minifier minifies CSS.
+    """
+    # Plugin hook pre static file handling here
+    pending = list(files)
+    for f, _ in pending:
+        logger.info("Copying static file: %s", f)
+    if dry_run or not pending:
+        return []
+    for parent in sorted({target_path.parent for _, target_path in pending}):
+        parent.mkdir(parents=True, exist_ok=True)
+
+    def copy(item: tuple[t.StaticFile | t.TemplateAsset, t.BuildPath]) -> None:
+        with profiling.span("copy_static_file", "static", str(item[0])):
+            if minifier is not None and _minifies(minifier, item[0]):
+                _write_minified(*item, minifier=minifier)
+            else:
+                _copy_file(*item, link=link)
+
+    with ThreadPoolExecutor() as executor:
+        for _ in executor.map(copy, pending):
+            pass
+    # Plugin hook post static file handling here
+    return [target_path for _, target_path in pending]
+
+
 def read_document(
     f: t.DocumentFile,
     cfg: AppConfig,
@@ -44,7 +229,6 @@ def read_document(
     """Read and parse document files."""
     logger.info("Processing document file: %s", f)
     # Plugin hook pre document file parsing here
-    raw = f.read_text()
     target_path = cfg.mackerel.build_path / f.relative_to(
         cfg.mackerel.content_path,
     ).with_suffix(
@@ -53,191 +237,1118 @@ def read_document(
     url = t.RelativeURL(
         str(Path("/") / target_path.relative_to(cfg.mackerel.build_path).as_posix())
     )
-    # Plugin hook post document file parsing here
-    return target_path, t.RenderedDocument(
-        url=url,
-        html=content_renderer.render(raw),
-        metadata=metadata_parser.parse(raw),
+    with profiling.span("read_document", "document", url):
+        raw = f.read_text()
+        # Plugin hook post document file parsing here
+        # Structural parsers implementing only parse get the whole document
+        split = getattr(metadata_parser, "split", None)
+        header, body = (raw, raw) if split is None else split(raw)
+        with profiling.span("parse_metadata", "metadata", url):
+            metadata = metadata_parser.parse(header)
+        with profiling.span("render_content", "content", url):
+            html = content_renderer.render(body)
+    return target_path, t.RenderedDocument(url=url, html=html, metadata=metadata)
+
+
+def _parse_sort_value(meta: t.DocumentMetadata, field: str) -> str | dt.datetime:
+    if field == "title":
+        return meta.title
+
+    if field in ("created_at", "modified_at"):
+        value = (
+            meta.created_datetime if field == "created_at" else meta.modified_datetime
+        )
+        if value is None:
+            # Metadata from parsers that do not fill in the datetime fields
+            value = parse_datetime(getattr(meta, field))
+        if value is None:
+            return dt.datetime.min.replace(tzinfo=dt.UTC)
+        return value if value.tzinfo else value.replace(tzinfo=dt.UTC)
+
+    return ""  # fallback for unknown field
+
+
+class CategoryIndex:
+    """Inverted index from each category to its documents, built once per build.
+
+    Only the metadata of the documents is indexed. Sorted category lists are
+    computed once on first use and shared by all pages showing them. Their
+    items are views loading each document only when a template accesses it.
+    """
+
+    def __init__(self, docs: Mapping[t.BuildPath, t.RenderedDocument]) -> None:
+        """Index the documents by category, keeping the docs order."""
+        self.docs = docs
+        self.members: dict[t.Category, list[t.BuildPath]] = defaultdict(list)
+        for target_path in docs:
+            metadata = document_metadata(docs, target_path)
+            for category in dict.fromkeys(metadata.categories):
+                self.members[category].append(target_path)
+        self._lists: dict[t.CategoryList, t.BuildCategoryList] = {}
+
+    def get(self, category_list: t.CategoryList) -> t.BuildCategoryList:
+        """Get the sorted list of rendered documents for a category."""
+        if category_list in self._lists:
+            return self._lists[category_list]
+        paths = list(self.members.get(category_list.name, []))
+        # Apply sorting if requested
+        if category_list.sort_by:
+            with profiling.span("category_items", "category", category_list.name):
+                paths.sort(
+                    key=lambda path: _parse_sort_value(
+                        document_metadata(self.docs, path), category_list.sort_by
+                    ),
+                    reverse=(category_list.order == "desc"),
+                )
+        result = t.BuildCategoryList(
+            name=category_list.name,
+            sort_by=category_list.sort_by,
+            order=category_list.order,
+            per_page=category_list.per_page,
+            items=DocumentSequence(self.docs, paths),
+        )
+        self._lists[category_list] = result
+        return result
+
+
+def page_path(path: _P, page: int) -> _P:
+    """Return the path of a page of a paginated document.
+
+    The first page keeps the document path, the others are written in a
+    page directory named after the document, like `blog/page/2.html` for
+    `blog/index.html` or `blog.html`.
+    """
+    if page == 1:
+        return path
+    base = path.parent if path.stem == "index" else path.parent / path.stem
+    return base / "page" / f"{page}{path.suffix}"
+
+
+def page_count(metadata: t.DocumentMetadata, index: CategoryIndex) -> int:
+    """Count the pages of a document, split by its paginated category lists."""
+    return (
+        max(
+            (
+                -(-len(index.get(category_list).items) // category_list.per_page)
+                for category_list in metadata.category_lists
+                if category_list.per_page
+            ),
+            default=1,
+        )
+        or 1
+    )
+
+
+def paginate(
+    target_path: t.BuildPath,
+    doc: t.RenderedDocument,
+    index: CategoryIndex,
+) -> Iterator[tuple[t.BuildPath, t.BuildDocument]]:
+    """Create the pages of a document with their slice of the category lists.
+
+    Lists without per_page are shown in full on every page.
+    """
+    category_lists = [index.get(cl) for cl in doc.metadata.category_lists]
+    pages = page_count(doc.metadata, index)
+    urls = [
+        t.RelativeURL(page_path(PurePosixPath(doc.url), page).as_posix())
+        for page in range(1, pages + 1)
+    ]
+    for i, url in enumerate(urls):
+        yield (
+            t.BuildPath(page_path(target_path, i + 1)),
+            t.BuildDocument(
+                url=url,
+                html=doc.html,
+                metadata=doc.metadata,
+                category_lists=[
+                    replace(
+                        cl,
+                        items=cl.items[i * cl.per_page : (i + 1) * cl.per_page],
+                    )
+                    if cl.per_page
+                    else cl
+                    for cl in category_lists
+                ],
+                pagination=t.Pagination(
+                    page=i + 1,
+                    pages=pages,
+                    prev_url=urls[i - 1] if i > 0 else None,
+                    next_url=urls[i + 1] if i + 1 < pages else None,
+                )
+                if pages > 1
+                else None,
+            ),
+        )
+
+
+def _write_page(  # noqa: PLR0913
+    target_path: t.BuildPath,
+    build_doc: t.BuildDocument,
+    ctx: t.TemplateContext,
+    template_renderer: t.TemplateRenderer,
+    dry_run: bool,  # noqa: FBT001
+    minifier: Minifier | None = None,
+) -> t.BuildPath | None:
+    """Render a page with its template and write it to the build path."""
+    logger.info("Writing document: %s", target_path)
+    template = str(build_doc.metadata.template)
+    with (
+        profiling.span("write_document", "document", build_doc.url),
+        profiling.span("render_template", "template", template),
+    ):
+        chunks: Iterable[str] = template_renderer.stream(ctx=ctx, document=build_doc)
+        if minifier is not None:
+            chunks = minifier.html(chunks)
+        if dry_run:
+            deque(chunks, maxlen=0)
+            return None
+        # Chunks are written as they are rendered, into a temporary file so a
+        # failed render does not leave a partial page behind
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target_path.with_name(f".{target_path.name}.tmp")
+        try:
+            with tmp_path.open("w", buffering=WRITE_BUFFER_SIZE) as f:
+                f.writelines(chunks)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        if _same_content(tmp_path, target_path):
+            # Untouched pages are not synced again by the tools downstream
+            logger.info("Skipping unchanged document: %s", target_path)
+            tmp_path.unlink()
+            return None
+        tmp_path.replace(target_path)
+    return target_path
+
+
+def _write_document(  # noqa: PLR0913
+    target_path: t.BuildPath,
+    doc: t.RenderedDocument,
+    ctx: t.TemplateContext,
+    index: CategoryIndex,
+    template_renderer: t.TemplateRenderer,
+    dry_run: bool,  # noqa: FBT001
+    minifier: Minifier | None = None,
+) -> list[t.BuildPath]:
+    """Render the pages of a document and write them to the build path."""
+    return [
+        written
+        for page_target_path, build_doc in paginate(target_path, doc, index)
+        if (
+            written := _write_page(
+                page_target_path,
+                build_doc,
+                ctx,
+                template_renderer,
+                dry_run,
+                minifier,
+            )
+        )
+        is not None
+    ]
+
+
+def _init_writer(  # noqa: PLR0913
+    ctx: t.TemplateContext,
+    docs: Mapping[t.BuildPath, t.RenderedDocument],
+    template_renderer: t.TemplateRenderer,
+    dry_run: bool,  # noqa: FBT001
+    profile: bool,  # noqa: FBT001
+    minifier: Minifier | None,
+) -> None:
+    """Keep the documents and template renderer for this worker process."""
+    profiling.init_worker(profile)
+    _worker_state.update(
+        ctx=ctx,
+        docs=docs,
+        index=CategoryIndex(docs),
+        template_renderer=template_renderer,
+        dry_run=dry_run,
+        minifier=minifier,
+    )
+
+
+def _write_in_worker(target_path: t.BuildPath) -> list[t.BuildPath]:
+    """Render and write a document in a worker process."""
+    return _write_document(
+        target_path,
+        _worker_state["docs"][target_path],
+        ctx=_worker_state["ctx"],
+        index=_worker_state["index"],
+        template_renderer=_worker_state["template_renderer"],
+        dry_run=_worker_state["dry_run"],
+        minifier=_worker_state["minifier"],
     )
 
 
-def write_documents(
-    docs: dict[t.BuildPath, t.RenderedDocument],
+def write_documents(  # noqa: PLR0913
+    docs: Mapping[t.BuildPath, t.RenderedDocument],
     cfg: AppConfig,
     template_renderer: t.TemplateRenderer,
     dry_run: bool = False,  # noqa: FBT001, FBT002
-) -> None:
-    """Write the final documents html to the build path."""
+    changed: Container[t.BuildPath] | None = None,
+    *,
+    assets: Mapping[str, str] | None = None,
+) -> list[t.BuildPath]:
+    """Write the final documents html to the build path.
+
+    When changed is given only those documents are written, the rest of the
+    docs are only used to fill in category lists. Each document is loaded
+    only when it is written or listed, so documents kept in a DocumentStore
+    never all have their HTML in memory. With more than one job the
+    documents are rendered and written on a process pool, each worker
+    getting the documents once. Templates get the build paths of the
+    template assets in `ctx.assets`. Pages are minified as they are written
+    when HTML minification is configured.
+    """
     # Plugin hook pre documents file writing here
     ctx = t.TemplateContext(
         user=cfg.user,
         nav=cfg.mackerel.navigation,
+        assets=dict(assets or {}),
     )
-    for target_path, doc in docs.items():
-        if doc.metadata.draft:
+    pages: list[t.BuildPath] = []
+    for target_path in docs:
+        if changed is not None and target_path not in changed:
+            continue
+        if document_metadata(docs, target_path).draft:
             logger.info("Skipping draft document: %s", target_path)
             continue
-        logger.info("Writing document: %s", target_path)
-        build_doc = t.BuildDocument(
-            url=doc.url,
-            html=doc.html,
-            metadata=doc.metadata,
-            category_lists=[
-                create_category_items(category_list, docs)
-                for category_list in doc.metadata.category_lists
-            ],
-        )
-        html = template_renderer.render(ctx=ctx, document=build_doc)
-        if dry_run:
-            return
-        target_path.parent.mkdir(parents=True, exist_ok=True)
-        target_path.write_text(html)
-    # Plugin hook post documents file writing here
-
-
-def _parse_sort_value(doc: t.RenderedDocument, field: str) -> str | dt.datetime:
-    meta = doc.metadata
-
-    if field == "title":
-        return meta.title
-
-    if field in ("created_at", "modified_at"):
-        raw_value = getattr(meta, field)
-        if raw_value is not None:
-            try:
-                return parse_datetime(raw_value)
-            except ParserError:
-                return dt.datetime.min.replace(tzinfo=dt.UTC)
-
-    return ""  # fallback for unknown field
+        pages.append(target_path)
 
+    minifier = create_minifier(cfg)
+    jobs = cfg.mackerel.jobs
+    if jobs <= 1 or len(pages) <= 1:
+        index = CategoryIndex(docs)
+        results = [
+            _write_document(
+                target_path,
+                docs[target_path],
+                ctx=ctx,
+                index=index,
+                template_renderer=template_renderer,
+                dry_run=dry_run,
+                minifier=minifier,
+            )
+            for target_path in pages
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_writer,
+            initargs=(
+                ctx,
+                docs,
+                template_renderer,
+                dry_run,
+                profiling.active() is not None,
+                minifier,
+            ),
+        ) as executor:
+            results = list(
+                profiling.collect(
+                    executor.map(
+                        partial(profiling.call_in_worker, _write_in_worker),
+                        pages,
+                        chunksize=max(1, len(pages) // (jobs * 4)),
+                    ),
+                ),
+            )
+    # Plugin hook post documents file writing here
+    return [target_path for written in results for target_path in written]
 
-def cache_by_category_signature(
-    fn: Callable[
-        [t.CategoryList, dict[t.BuildPath, t.RenderedDocument]],
-        t.BuildCategoryList,
-    ],
-) -> Callable[
-    [t.CategoryList, dict[t.BuildPath, t.RenderedDocument]],
-    t.BuildCategoryList,
-]:
-    """Custom cache decorator that keys only by category name, sort_by, and order."""
-    cache: dict[tuple[str, str | None, str], t.BuildCategoryList] = {}
-
-    @wraps(fn)
-    def wrapper(
-        category_list: t.CategoryList,
-        docs: dict[t.BuildPath, t.RenderedDocument],
-    ) -> t.BuildCategoryList:
-        key = (category_list.name, category_list.sort_by, category_list.order)
-        if key in cache:
-            return cache[key]
-
-        result = fn(category_list, docs)
-        cache[key] = result
-        return result
 
-    return wrapper
+def _has_suffix(path: str, suffix: str) -> bool:
+    """Check the suffix of a path string like `Path.suffix` would."""
+    name = path.rpartition(os.sep)[2]
+    return name.endswith(suffix) and len(name) > len(suffix)
 
 
-@cache_by_category_signature
-def create_category_items(
-    category_list: t.CategoryList,
-    docs: dict[t.BuildPath, t.RenderedDocument],
-) -> t.BuildCategoryList:
-    """Create the sorted list of rendered documents for a category."""
-    # Filter matching documents
-    items = [
-        doc for doc in docs.values() if category_list.name in doc.metadata.categories
-    ]
+def _scan_content(
+    content_path: Path,
+    doc_suffix: t.DocSuffix,
+    ignore: Iterable[str],
+) -> Iterator[tuple[t.ContentFile, os.stat_result]]:
+    """Walk the content files once, typed from their path strings."""
+    for path, st in scan_files(content_path, IgnoreRules.load(content_path, ignore)):
+        kind = t.DocumentFile if _has_suffix(path, doc_suffix) else t.StaticFile
+        yield kind(path), st
 
-    # Apply sorting if requested
-    if category_list.sort_by:
-        items.sort(
-            key=lambda doc: _parse_sort_value(doc, category_list.sort_by),
-            reverse=(category_list.order == "desc"),
-        )
 
-    return t.BuildCategoryList(
-        name=category_list.name,
-        sort_by=category_list.sort_by,
-        order=category_list.order,
-        items=items,
-    )
+def _scan_templates(
+    template_path: t.TemplatePath,
+    template_suffix: t.TemplateSuffix,
+    ignore: Iterable[str],
+) -> Iterator[tuple[Path | t.TemplateAsset, os.stat_result]]:
+    """Walk the template files once, templates as Path and the rest as assets."""
+    rules = IgnoreRules.load(template_path, ignore)
+    for path, st in scan_files(template_path, rules):
+        kind = Path if _has_suffix(path, template_suffix) else t.TemplateAsset
+        yield kind(path), st
 
 
 def fetch_content_files(
     content_path: Path,
     doc_suffix: t.DocSuffix,
+    ignore: Iterable[str] = (),
 ) -> Generator[t.ContentFile, None, None]:
-    """Fetch content files from the specified path."""
-    files = (f for f in content_path.rglob("*") if f.is_file())
-    for f in files:
-        yield t.DocumentFile(f) if f.suffix == doc_suffix else t.StaticFile(f)
+    """Fetch content files from the specified path, skipping ignored ones."""
+    for f, _ in _scan_content(content_path, doc_suffix, ignore):
+        yield f
 
 
 def fetch_template_assets(
     template_path: t.TemplatePath,
     template_suffix: t.TemplateSuffix,
+    ignore: Iterable[str] = (),
 ) -> Generator[t.TemplateAsset, None, None]:
-    """Fetch template files from the specified path."""
-    files = (f for f in template_path.rglob("*") if f.is_file())
-    for f in files:
-        if f.suffix != template_suffix:
-            yield t.TemplateAsset(f)
+    """Fetch template files from the specified path, skipping ignored ones."""
+    for f, _ in _scan_templates(template_path, template_suffix, ignore):
+        if isinstance(f, t.TemplateAsset):
+            yield f
 
 
-def build(
+def fetch_templates(
+    template_path: t.TemplatePath,
+    template_suffix: t.TemplateSuffix,
+    ignore: Iterable[str] = (),
+) -> Generator[Path, None, None]:
+    """Fetch the template files from the specified path, skipping ignored ones."""
+    for f, _ in _scan_templates(template_path, template_suffix, ignore):
+        if not isinstance(f, t.TemplateAsset):
+            yield f
+
+
+def build_fingerprint(cfg: AppConfig, *components: object) -> str:
+    """Hash everything besides the sources that affects the build output."""
+    settings = cfg.to_dict()
+    # The number of jobs and the cache settings do not change the output
+    for key in ("jobs", "cache_path", "render_cache_size"):
+        settings["mackerel"].pop(key)
+    settings[cfg.mackerel.template_renderer].pop("bytecode_cache")
+    data = json.dumps(
+        [
+            mackerel.__version__,
+            settings,
+            [type(c).__qualname__ for c in components],
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _check_source(
+    f: Path,
+    entry: FileEntry | None,
+    changes: Container[Path] | None,
+    stats: Mapping[Path, os.stat_result],
+) -> tuple[bool, FileEntry]:
+    """Check a source file, trusting the entry of files outside the changes.
+
+    The stat of the file is reused from the discovery when it has one.
+    """
+    if changes is not None and entry is not None and f not in changes:
+        return False, entry
+    return check_file(f, entry, stats.get(f))
+
+
+def _check_static_file(  # noqa: PLR0913
+    f: t.StaticFile | t.TemplateAsset,
+    relative_path: t.ContentPath | t.TemplatePath,
+    build_path: t.BuildPath,
+    *,
+    previous: dict[str, FileEntry],
+    current: dict[str, FileEntry],
+    changes: Container[Path] | None,
+    stats: Mapping[Path, os.stat_result],
+    fingerprint: bool = False,
+    transformed: bool = False,
+) -> t.BuildPath | None:
+    """Return the target path of a static file if it has to be copied.
+
+    A file is skipped when it did not change since the previous build and
+    the size and mtime of the copy in the build path still match it. Only
+    the mtime is compared for transformed files, like minified stylesheets.
+    With fingerprint the target name has the content hash, taken from the
+    entry so unchanged files are not hashed again.
+    """
+    key = f.relative_to(relative_path).as_posix()
+    changed, entry = _check_source(f, previous.get(key), changes, stats)
+    entry.output = fingerprint_path(key, entry.digest) if fingerprint else key
+    target_path = t.BuildPath(build_path / entry.output)
+    current[key] = entry
+    if not changed:
+        if changes is not None and f not in changes:
+            return None
+        try:
+            target_st = target_path.stat()
+        except FileNotFoundError:
+            pass
+        else:
+            if target_st.st_mtime_ns == entry.mtime_ns and (
+                transformed or target_st.st_size == entry.size
+            ):
+                logger.info("Skipping unchanged static file: %s", f)
+                return None
+    return target_path
+
+
+def _sync_templates(  # noqa: PLR0913
     cfg: AppConfig,
-    content_renderer: t.ContentRenderer,
-    metadata_parser: t.MetadataParser,
-    template_renderer: t.TemplateRenderer,
+    previous: BuildManifest,
+    manifest: BuildManifest,
+    templates: Iterable[Path],
+    changes: Container[Path] | None,
+    stats: Mapping[Path, os.stat_result],
+) -> set[str]:
+    """Record the template files and find the added, changed and removed ones."""
+    changed_templates: set[str] = set()
+    for f in templates:
+        key = f.relative_to(cfg.mackerel.template_path).as_posix()
+        changed, manifest.templates[key] = _check_source(
+            f, previous.templates.get(key), changes, stats
+        )
+        if changed:
+            changed_templates.add(key)
+    return changed_templates | (previous.templates.keys() - manifest.templates.keys())
+
+
+@dataclass(frozen=True, slots=True)
+class _DocumentSource:
+    """A document file checked against the manifest of the previous build."""
+
+    key: str
+    f: t.DocumentFile
+    changed: bool
+    file_entry: FileEntry
+
+    def entry(
+        self,
+        meta: t.DocumentMetadata,
+        output: str,
+        templates: list[str],
+    ) -> DocumentEntry:
+        return DocumentEntry(
+            digest=self.file_entry.digest,
+            mtime_ns=self.file_entry.mtime_ns,
+            size=self.file_entry.size,
+            output="" if meta.draft else output,
+            template=meta.template.as_posix(),
+            draft=meta.draft,
+            categories=list(meta.categories),
+            category_lists=[cl.name for cl in meta.category_lists],
+            templates=templates,
+        )
+
+
+def _outputs_exist(entry: DocumentEntry, build_path: t.BuildPath) -> bool:
+    """Check that every page written for a document is still there."""
+    output = build_path / entry.output
+    return all(page_path(output, page).exists() for page in range(1, entry.pages + 1))
+
+
+def build_outputs(manifest: BuildManifest, mcfg: MackerelConfig) -> set[str]:
+    """Return the files the sources of a manifest produce in the build path.
+
+    Precompressed copies are not included, since small files get none.
+    """
+    outputs = {entry.output for entry in manifest.static.values()}
+    outputs.update(entry.output for entry in manifest.assets.values())
+    for entry in manifest.documents.values():
+        if entry.output:
+            output = PurePosixPath(entry.output)
+            outputs.update(
+                page_path(output, page).as_posix() for page in range(1, entry.pages + 1)
+            )
+    if mcfg.fingerprint_assets:
+        outputs.add(ASSET_MANIFEST_NAME)
+    return outputs
+
+
+def prune_outputs(
+    build_path: t.BuildPath,
+    stale: Iterable[str],
     dry_run: bool = False,  # noqa: FBT001, FBT002
-) -> None:
-    """Build the site."""
-    # Plugin hook pre build here
-    docs: dict[t.BuildPath, t.RenderedDocument] = {}
-    for f in chain(
-        fetch_template_assets(
-            template_path=cfg.mackerel.template_path,
-            template_suffix=cfg.mackerel.template_suffix,
-        ),
-        fetch_content_files(
-            content_path=cfg.mackerel.content_path,
-            doc_suffix=cfg.mackerel.doc_suffix,
-        ),
+) -> list[t.BuildPath]:
+    """Remove the stale outputs of previous builds and their empty directories.
+
+    Only paths recorded as outputs are removed, files added to the build
+    path by other tools are kept. Returns the removed paths.
+    """
+    removed: list[t.BuildPath] = []
+    parents: set[Path] = set()
+    for output in sorted(stale):
+        relative_path = PurePosixPath(output)
+        if relative_path.is_absolute() or ".." in relative_path.parts:
+            logger.warning("Not removing output outside the build path: %s", output)
+            continue
+        path = t.BuildPath(build_path / relative_path)
+        logger.info("Removing stale output: %s", path)
+        removed.append(path)
+        if dry_run:
+            continue
+        path.unlink(missing_ok=True)
+        parents.update(path.parents[: len(relative_path.parts) - 1])
+    # Deepest directories first, so emptied parents are removed too
+    for parent in sorted(parents, key=lambda p: len(p.parts), reverse=True):
+        with suppress(OSError):
+            parent.rmdir()
+    return removed
+
+
+def _dirty_documents(  # noqa: PLR0913
+    previous: dict[str, DocumentEntry],
+    entries: dict[str, DocumentEntry],
+    changed: Container[str],
+    build_path: t.BuildPath,
+    *,
+    changed_templates: Collection[str],
+    check_outputs: bool,
+    changed_assets: bool = False,
+) -> set[str]:
+    """Find the documents whose output has to be rendered again.
+
+    All documents are rendered again when the fingerprinted asset names
+    changed, since any template can link to them.
+    """
+    # Categories gain, lose or change members when their documents change
+    affected: set[str] = set()
+    for key, entry in previous.items():
+        if key not in entries or key in changed:
+            affected.update(entry.categories)
+    for key, entry in entries.items():
+        if key in changed:
+            affected.update(entry.categories)
+    # Documents with unknown template dependencies depend on every template
+    dependents: defaultdict[str, set[str]] = defaultdict(set)
+    for key, entry in entries.items():
+        for template in entry.templates or changed_templates:
+            dependents[template].add(key)
+    templated = set().union(*(dependents[key] for key in changed_templates))
+    return {
+        key
+        for key, entry in entries.items()
+        if changed_assets
+        or key in changed
+        or key in templated
+        or affected.intersection(entry.category_lists)
+        or (check_outputs and entry.output and not _outputs_exist(entry, build_path))
+    }
+
+
+def discover_files(
+    cfg: AppConfig,
+) -> tuple[
+    list[Path],
+    list[t.TemplateAsset | t.ContentFile],
+    dict[Path, os.stat_result],
+]:
+    """Find the templates and the files to build, with their stat.
+
+    Each source directory is walked once, skipping the ignored paths.
+    """
+    mcfg = cfg.mackerel
+    templates: list[Path] = []
+    files: list[t.TemplateAsset | t.ContentFile] = []
+    stats: dict[Path, os.stat_result] = {}
+    for f, st in _scan_templates(mcfg.template_path, mcfg.template_suffix, mcfg.ignore):
+        if isinstance(f, t.TemplateAsset):
+            files.append(f)
+        else:
+            templates.append(f)
+        stats[f] = st
+    for f, st in _scan_content(mcfg.content_path, mcfg.doc_suffix, mcfg.ignore):
+        files.append(f)
+        stats[f] = st
+    return templates, files, stats
+
+
+def _source_kind(mcfg: MackerelConfig, path: Path) -> type[Path] | None:
+    """Return the source type of a path, Path for templates."""
+    if path.is_relative_to(mcfg.template_path):
+        return Path if path.suffix == mcfg.template_suffix else t.TemplateAsset
+    if path.is_relative_to(mcfg.content_path):
+        return t.DocumentFile if path.suffix == mcfg.doc_suffix else t.StaticFile
+    return None
+
+
+def discover_changes(
+    cfg: AppConfig,
+    previous: BuildManifest,
+    changes: Iterable[Path],
+) -> (
+    tuple[
+        list[Path],
+        list[t.TemplateAsset | t.ContentFile],
+        dict[Path, os.stat_result],
+    ]
+    | None
+):
+    """Find the templates and files to build from the previous manifest.
+
+    The sources of the previous build are updated with the added and deleted
+    paths in changes, without walking the source directories. Ignored paths
+    are skipped. Returns None when the changes cannot be applied and a full
+    discovery is needed, like when a directory was added or moved or when
+    an ignore file changed.
+    """
+    mcfg = cfg.mackerel
+    if not previous.fingerprint:
+        return None
+    rules = {
+        root: IgnoreRules.load(root, mcfg.ignore)
+        for root in (mcfg.template_path, mcfg.content_path)
+    }
+    sources: dict[Path, type[Path]] = {}
+    stats: dict[Path, os.stat_result] = {}
+    for source_kind, base, entries in (
+        (Path, mcfg.template_path, previous.templates),
+        (t.TemplateAsset, mcfg.template_path, previous.assets),
+        (t.StaticFile, mcfg.content_path, previous.static),
+        (t.DocumentFile, mcfg.content_path, previous.documents),
     ):
+        sources.update((base / key, source_kind) for key in entries)
+    for path in changes:
+        kind = _source_kind(mcfg, path)
+        if kind is None:
+            continue
+        root = (
+            mcfg.template_path
+            if path.is_relative_to(mcfg.template_path)
+            else mcfg.content_path
+        )
+        relative_path = PurePosixPath(path.relative_to(root).as_posix())
+        if relative_path.as_posix() == IGNORE_FILE_NAME:
+            return None
+        if rules[root].ignores_path(relative_path):
+            continue
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            st = None
+        if st is not None and stat.S_ISREG(st.st_mode):
+            sources.setdefault(path, kind)
+            stats[path] = st
+        elif sources.pop(path, None) is None:
+            return None
+    templates = [path for path, kind in sources.items() if kind is Path]
+    files = [
+        cast("t.TemplateAsset | t.ContentFile", kind(path))
+        for path, kind in sources.items()
+        if kind is not Path
+    ]
+    return templates, files, stats
+
+
+def _sync_files(  # noqa: PLR0913
+    cfg: AppConfig,
+    previous: BuildManifest,
+    manifest: BuildManifest,
+    files: Iterable[t.TemplateAsset | t.ContentFile],
+    changes: Container[Path] | None,
+    *,
+    stats: Mapping[Path, os.stat_result],
+    dry_run: bool,
+    minifier: Minifier | None,
+) -> tuple[list[t.BuildPath], list[_DocumentSource]]:
+    """Copy the changed static files and check the documents for changes."""
+    mcfg = cfg.mackerel
+    copies: list[tuple[t.StaticFile | t.TemplateAsset, t.BuildPath]] = []
+    sources: list[_DocumentSource] = []
+    for f in files:
         match f:
             case t.StaticFile():
-                copy_static_file(
+                target_path = _check_static_file(
                     f=f,
-                    relative_path=cfg.mackerel.content_path,
-                    build_path=cfg.mackerel.build_path,
-                    dry_run=dry_run,
+                    relative_path=mcfg.content_path,
+                    build_path=mcfg.build_path,
+                    previous=previous.static,
+                    current=manifest.static,
+                    changes=changes,
+                    stats=stats,
                 )
+                if target_path is not None:
+                    copies.append((f, target_path))
             case t.TemplateAsset():
-                copy_static_file(
+                target_path = _check_static_file(
                     f=f,
-                    relative_path=cfg.mackerel.template_path,
-                    build_path=cfg.mackerel.build_path,
-                    dry_run=dry_run,
+                    relative_path=mcfg.template_path,
+                    build_path=mcfg.build_path,
+                    previous=previous.assets,
+                    current=manifest.assets,
+                    changes=changes,
+                    stats=stats,
+                    fingerprint=mcfg.fingerprint_assets,
+                    transformed=_minifies(minifier, f),
                 )
+                if target_path is not None:
+                    copies.append((f, target_path))
             case t.DocumentFile():
-                try:
-                    target_path, document = read_document(
-                        f=f,
-                        cfg=cfg,
-                        content_renderer=content_renderer,
-                        metadata_parser=metadata_parser,
+                key = f.relative_to(mcfg.content_path).as_posix()
+                sources.append(
+                    _DocumentSource(
+                        key,
+                        f,
+                        *_check_source(f, previous.documents.get(key), changes, stats),
                     )
-                except Exception:
-                    logger.exception("Error reading document %s", f)
-                else:
-                    docs[target_path] = document
-    write_documents(
+                )
+    copied = copy_static_files(
+        copies,
+        link=mcfg.static_copy_mode == "hardlink",
+        dry_run=dry_run,
+        minifier=minifier,
+    )
+    return copied, sources
+
+
+def _init_reader(
+    cfg: AppConfig,
+    content_renderer: t.ContentRenderer,
+    metadata_parser: t.MetadataParser,
+    profile: bool,  # noqa: FBT001
+) -> None:
+    """Keep the renderer and parser unpickled once for this worker process."""
+    profiling.init_worker(profile)
+    _worker_state.update(
+        cfg=cfg,
+        content_renderer=content_renderer,
+        metadata_parser=metadata_parser,
+    )
+
+
+def _read_document_safely(
+    f: t.DocumentFile,
+    cfg: AppConfig,
+    content_renderer: t.ContentRenderer,
+    metadata_parser: t.MetadataParser,
+) -> tuple[t.BuildPath, t.RenderedDocument] | Exception:
+    """Read a document, returning the error instead of raising it."""
+    try:
+        return read_document(
+            f=f,
+            cfg=cfg,
+            content_renderer=content_renderer,
+            metadata_parser=metadata_parser,
+        )
+    except Exception as e:  # noqa: BLE001
+        return e
+
+
+def _read_in_worker(
+    f: t.DocumentFile,
+) -> tuple[t.BuildPath, t.RenderedDocument] | Exception:
+    """Read a document in a worker process."""
+    return _read_document_safely(
+        f,
+        cfg=_worker_state["cfg"],
+        content_renderer=_worker_state["content_renderer"],
+        metadata_parser=_worker_state["metadata_parser"],
+    )
+
+
+def document_executor(
+    cfg: AppConfig,
+    content_renderer: t.ContentRenderer,
+    metadata_parser: t.MetadataParser,
+) -> AbstractContextManager[Executor | None]:
+    """Create the process pool for reading documents, if more than one job."""
+    if cfg.mackerel.jobs <= 1:
+        return nullcontext()
+    return ProcessPoolExecutor(
+        max_workers=cfg.mackerel.jobs,
+        initializer=_init_reader,
+        initargs=(
+            cfg,
+            content_renderer,
+            metadata_parser,
+            profiling.active() is not None,
+        ),
+    )
+
+
+def _read_sources(  # noqa: PLR0913
+    keys: Container[str],
+    *,
+    sources: list[_DocumentSource],
+    read: dict[str, t.BuildPath],
+    docs: DocumentStore,
+    cfg: AppConfig,
+    content_renderer: t.ContentRenderer,
+    metadata_parser: t.MetadataParser,
+    executor: Executor | None,
+) -> None:
+    """Read the given documents that were not read yet into the store."""
+    pending = [s for s in sources if s.key in keys and s.key not in read]
+    results: Iterable[tuple[t.BuildPath, t.RenderedDocument] | Exception]
+    if executor is None:
+        results = (
+            _read_document_safely(s.f, cfg, content_renderer, metadata_parser)
+            for s in pending
+        )
+    else:
+        results = profiling.collect(
+            executor.map(
+                partial(profiling.call_in_worker, _read_in_worker),
+                [s.f for s in pending],
+                chunksize=max(1, len(pending) // (cfg.mackerel.jobs * 4)),
+            )
+        )
+    # Results come back in submission order, keeping the build deterministic
+    for source, result in zip(pending, results, strict=True):
+        if isinstance(result, Exception):
+            logger.error("Error reading document %s", source.f, exc_info=result)
+        else:
+            target_path, doc = result
+            docs.add(target_path, doc)
+            read[source.key] = target_path
+
+
+def _read_documents(  # noqa: PLR0913
+    cfg: AppConfig,
+    content_renderer: t.ContentRenderer,
+    metadata_parser: t.MetadataParser,
+    template_renderer: t.TemplateRenderer,
+    *,
+    docs: DocumentStore,
+    sources: list[_DocumentSource],
+    previous: BuildManifest,
+    manifest: BuildManifest,
+    changed_templates: Collection[str],
+    check_outputs: bool = True,
+    changed_assets: bool = False,
+    executor: Executor | None = None,
+) -> set[t.BuildPath]:
+    """Read the documents needed to render the dirty documents into the store.
+
+    The documents are ordered in discovery order. Returns the target paths
+    of the documents that have to be written again.
+    """
+    build_path = cfg.mackerel.build_path
+    read: dict[str, t.BuildPath] = {}
+    read_sources = partial(
+        _read_sources,
+        sources=sources,
+        read=read,
         docs=docs,
         cfg=cfg,
-        template_renderer=template_renderer,
-        dry_run=dry_run,
+        content_renderer=content_renderer,
+        metadata_parser=metadata_parser,
+        executor=executor,
+    )
+    dependencies: dict[Path, list[str]] = {}
+
+    def record_read_documents() -> None:
+        for source in sources:
+            if source.key not in read:
+                continue
+            target_path = read[source.key]
+            meta = docs.metadata(target_path)
+            if meta.template not in dependencies:
+                deps = template_renderer.dependencies(meta.template)
+                dependencies[meta.template] = sorted(
+                    path.as_posix() for path in deps or ()
+                )
+            manifest.documents[source.key] = source.entry(
+                meta,
+                target_path.relative_to(build_path).as_posix(),
+                dependencies[meta.template],
+            )
+
+    # Changed documents are read first to learn their current categories
+    changed = {source.key for source in sources if source.changed}
+    read_sources(changed)
+    record_read_documents()
+    for source in sources:
+        if source.key not in read and not source.changed:
+            manifest.documents[source.key] = previous.documents[source.key]
+
+    dirty = _dirty_documents(
+        previous=previous.documents,
+        entries=manifest.documents,
+        changed=changed,
+        build_path=build_path,
+        changed_templates=changed_templates,
+        check_outputs=check_outputs,
+        changed_assets=changed_assets,
     )
+    # Unchanged members of the category lists shown by dirty documents are
+    # read again only to fill in those lists
+    shown = {name for key in dirty for name in manifest.documents[key].category_lists}
+    read_sources(
+        {
+            key
+            for key, entry in manifest.documents.items()
+            if key in dirty or shown.intersection(entry.categories)
+        }
+    )
+    # The templates of dirty documents may have gained or lost dependencies
+    record_read_documents()
+
+    docs.reorder(read[source.key] for source in sources if source.key in read)
+    # Only dirty documents have all the members of their lists read, the
+    # others keep the page count of the build that wrote them
+    index = CategoryIndex(docs)
+    for key, target_path in read.items():
+        if key in dirty:
+            pages = page_count(docs.metadata(target_path), index)
+        elif key in previous.documents:
+            pages = previous.documents[key].pages
+        else:
+            continue
+        manifest.documents[key].pages = pages
+    return {read[key] for key in dirty if key in read}
+
+
+def build(  # noqa: PLR0913
+    cfg: AppConfig,
+    content_renderer: t.ContentRenderer,
+    metadata_parser: t.MetadataParser,
+    template_renderer: t.TemplateRenderer,
+    dry_run: bool = False,  # noqa: FBT001, FBT002
+    *,
+    incremental: bool = True,
+    manifest: BuildManifest | None = None,
+    changes: Collection[Path] | None = None,
+    persist_manifest: bool = True,
+) -> t.BuildResult:
+    """Build the site.
+
+    Incremental builds compare the sources against the manifest of the
+    previous build and only copy and render what changed. A document is
+    rendered again when its source changed, when a template it depends on
+    changed or when one of the category lists it shows changed.
+
+    Long running processes can pass the manifest of their previous build
+    instead of loading it from the build path, and the paths that changed
+    since. Only those paths are then checked, the sources and outputs of the
+    previous build are trusted to be unchanged.
+
+    Pages are only replaced when their content changed. The outputs of the
+    previous build that the sources no longer produce are removed, even
+    when the previous build cannot be reused.
+    """
+    # Plugin hook pre build here
+    mcfg = cfg.mackerel
+    current = BuildManifest(
+        fingerprint=build_fingerprint(
+            cfg, content_renderer, metadata_parser, template_renderer
+        ),
+    )
+    previous = manifest if manifest is not None else load_manifest(mcfg.build_path)
+    previous_outputs = set(previous.outputs)
+    if not incremental or previous.fingerprint != current.fingerprint:
+        previous = BuildManifest()
+
+    with profiling.span("discover", "phase"):
+        discovered = (
+            discover_changes(cfg, previous, changes) if changes is not None else None
+        )
+        if discovered is None:
+            changes = None
+            discovered = discover_files(cfg)
+    templates, files, stats = discovered
+    with profiling.span("check_templates", "phase"):
+        changed_templates = _sync_templates(
+            cfg, previous, current, templates, changes, stats
+        )
+    # Stylesheets share the render cache of the content renderer, dry runs
+    # do not write it
+    render_cache = (
+        content_renderer.cache
+        if isinstance(content_renderer, CachedContentRenderer) and not dry_run
+        else None
+    )
+    with profiling.span("sync_files", "phase"):
+        copied, sources = _sync_files(
+            cfg,
+            previous,
+            current,
+            files,
+            changes,
+            stats=stats,
+            dry_run=dry_run,
+            minifier=create_minifier(cfg, render_cache),
+        )
+    assets = {key: entry.output for key, entry in current.assets.items()}
+    changed_assets = mcfg.fingerprint_assets and assets != {
+        key: entry.output for key, entry in previous.assets.items()
+    }
+    if mcfg.fingerprint_assets and not dry_run:
+        save_asset_manifest(assets, mcfg.build_path)
+    # Documents are read first, keeping only their metadata in memory, and
+    # loaded again one at a time while writing them
+    with DocumentStore.temporary() as docs:
+        with (
+            profiling.span("read_documents", "phase"),
+            document_executor(cfg, content_renderer, metadata_parser) as executor,
+        ):
+            dirty_paths = _read_documents(
+                cfg=cfg,
+                content_renderer=content_renderer,
+                metadata_parser=metadata_parser,
+                template_renderer=template_renderer,
+                docs=docs,
+                sources=sources,
+                previous=previous,
+                manifest=current,
+                changed_templates=changed_templates,
+                check_outputs=changes is None,
+                changed_assets=changed_assets,
+                executor=executor,
+            )
+        if dirty_paths:
+            with profiling.span("load_templates", "phase"):
+                template_renderer.load()
+        with profiling.span("write_documents", "phase"):
+            written = write_documents(
+                docs=docs,
+                cfg=cfg,
+                template_renderer=template_renderer,
+                dry_run=dry_run,
+                changed=dirty_paths,
+                assets=assets,
+            )
+    outputs = build_outputs(current, mcfg)
+    compressed: list[t.BuildPath] = []
+    if mcfg.precompress:
+        # Unchanged outputs keep the copies compressed by the previous build,
+        # unless it cannot be reused
+        if previous.fingerprint:
+            pending = {*copied, *written}
+        else:
+            pending = {t.BuildPath(mcfg.build_path / output) for output in outputs}
+        if not dry_run:
+            with profiling.span("compress", "phase"):
+                compressed = [
+                    t.BuildPath(path) for path in compress_files(sorted(pending))
+                ]
+        unchanged = outputs - {
+            path.relative_to(mcfg.build_path).as_posix() for path in pending
+        }
+        outputs.update(
+            path.relative_to(mcfg.build_path).as_posix() for path in compressed
+        )
+        outputs.update(
+            f"{output}{suffix}"
+            for output in unchanged
+            for suffix in compressors()
+            if f"{output}{suffix}" in previous_outputs
+        )
+    current.outputs = sorted(outputs)
+    with profiling.span("prune_outputs", "phase"):
+        removed = prune_outputs(
+            mcfg.build_path, previous_outputs - outputs, dry_run=dry_run
+        )
+    if not dry_run and persist_manifest:
+        with profiling.span("save_manifest", "phase"):
+            save_manifest(current, mcfg.build_path)
     # Plugin hook post build here
+    return t.BuildResult(
+        written=written,
+        copied=copied,
+        manifest=current,
+        compressed=compressed,
+        removed=removed,
+    )
@@ -0,0 +1,229 @@
+"""The cache module keeps rendered content between builds."""
+
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Final
+from typing import Self
+
+from mackerel import types as t
+from mackerel.manifest import text_digest
+
+logger = logging.getLogger(__name__)
+
+RENDER_CACHE_NAME: Final[str] = "renders.sqlite3"
+BYTECODE_CACHE_NAME: Final[str] = "jinja2"
+# A logical clock ordering the accesses, shared by all connections
+_NEXT_ACCESS: Final[str] = "(SELECT COALESCE(MAX(accessed), 0) + 1 FROM renders)"
+# Evict below the size limit, so a full cache does not evict on every insert
+EVICTION_RATIO: Final[float] = 0.9
+# Keys hit before their access times are written in one transaction
+FLUSH_HITS: Final[int] = 256
+
+_SCHEMA: Final[str] = """
+CREATE TABLE IF NOT EXISTS renders (
+    key TEXT PRIMARY KEY,
+    html TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS renders_accessed ON renders (accessed);
+"""
+
+
+def _flush_hits(db: sqlite3.Connection, hits: dict[str, None]) -> None:
+    """Write the access times of the buffered hits, oldest hit first."""
+    if not hits:
+        return
+    keys = [(key,) for key in hits]
+    hits.clear()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        db.executemany(
+            f"UPDATE renders SET accessed = {_NEXT_ACCESS} WHERE key = ?",  # noqa: S608
+            keys,
+        )
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    db.execute("COMMIT")
+
+
+@dataclass(frozen=True, slots=True)
+class CacheStats:
+    """The entries and size of a render cache."""
+
+    path: Path
+    entries: int
+    size: int
+    max_size: int
+
+
+class RenderCache:
+    """A size bounded SQLite store of rendered content.
+
+    Entries are evicted least recently used first once the total size of the
+    rendered content exceeds max_size. The database is opened on first use,
+    so the cache can be pickled to worker processes which open their own
+    connection.
+
+    Hits only bump the access clock in memory, so concurrent workers do not
+    take the write lock on every read. The buffered hits are written in one
+    transaction every FLUSH_HITS keys, before evicting, and when the cache is
+    closed, collected or its process exits. The connection is shared by the
+    threads of a process, one at a time.
+    """
+
+    def __init__(self, path: Path, max_size: int) -> None:
+        """Initialize the cache stored in the given database file."""
+        self.path = path
+        self.max_size = max_size
+        self._db: sqlite3.Connection | None = None
+        self._hits: dict[str, None] = {}
+        self._finalizer: Finalize | None = None
+        self._lock = threading.RLock()
+
+    def __reduce__(self) -> tuple[type[Self], tuple[Path, int]]:
+        """Pickle only the settings, so each worker process connects itself."""
+        return type(self), (self.path, self.max_size)
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """The connection to the cache database."""
+        with self._lock:
+            if self._db is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(
+                    self.path,
+                    timeout=30,
+                    isolation_level=None,
+                    check_same_thread=False,
+                )
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.executescript(_SCHEMA)
+                self._db = db
+                # Also run when a worker process exits, which skips atexit
+                self._finalizer = Finalize(
+                    self, _flush_hits, args=(db, self._hits), exitpriority=10
+                )
+            return self._db
+
+    def get(self, key: str) -> str | None:
+        """Return the cached content of a key, None if it is not cached."""
+        with self._lock:
+            row = self.db.execute("SELECT html FROM renders WHERE key = ?", (key,))
+            found = row.fetchone()
+            if found is None:
+                return None
+            # Move the key last, the most recently used
+            self._hits.pop(key, None)
+            self._hits[key] = None
+            if len(self._hits) >= FLUSH_HITS:
+                self.flush()
+            return str(found[0])
+
+    def flush(self) -> None:
+        """Write the access times of the buffered hits."""
+        with self._lock:
+            if self._db is not None:
+                _flush_hits(self._db, self._hits)
+
+    def put(self, key: str, html: str) -> None:
+        """Store the content of a key, evicting old entries when full."""
+        with self._lock:
+            size = len(html.encode())
+            if size > self.max_size:
+                return
+            self.db.execute(
+                f"INSERT OR REPLACE INTO renders VALUES (?, ?, ?, {_NEXT_ACCESS})",  # noqa: S608
+                (key, html, size),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        (total,) = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM renders"
+        ).fetchone()
+        if total <= self.max_size:
+            return
+        self.flush()
+        excess = total - int(self.max_size * EVICTION_RATIO)
+        evicted: list[tuple[str]] = []
+        for key, size in self.db.execute(
+            "SELECT key, size FROM renders ORDER BY accessed",
+        ):
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+        self.db.executemany("DELETE FROM renders WHERE key = ?", evicted)
+        logger.info("Evicted %d entries from the render cache.", len(evicted))
+
+    def stats(self) -> CacheStats:
+        """Count the entries and the size of the cache."""
+        with self._lock:
+            entries, size = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM renders",
+            ).fetchone()
+            return CacheStats(
+                path=self.path,
+                entries=entries,
+                size=size,
+                max_size=self.max_size,
+            )
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._hits.clear()
+            self.db.execute("DELETE FROM renders")
+            self.db.execute("VACUUM")
+
+    def close(self) -> None:
+        """Write the buffered hits and close the connection to the database."""
+        with self._lock:
+            if self._finalizer is not None:
+                self._finalizer()
+                self._finalizer = None
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class CachedContentRenderer(t.ContentRenderer):
+    """Content renderer serving the output of another renderer from a cache.
+
+    Bodies are cached by the hash of the body and the cache key of the
+    renderer. Renderers without a cache key render every body.
+    """
+
+    def __init__(self, renderer: t.ContentRenderer, cache: RenderCache) -> None:
+        """Initialize with the wrapped renderer and its cache."""
+        self.renderer = renderer
+        self.cache = cache
+        self.renderer_key = renderer.cache_key()
+
+    def __reduce__(
+        self,
+    ) -> tuple[type[Self], tuple[t.ContentRenderer, RenderCache]]:
+        """Pickle the wrapped renderer and the cache settings."""
+        return type(self), (self.renderer, self.cache)
+
+    def cache_key(self) -> str | None:
+        """Return the cache key of the wrapped renderer."""
+        return self.renderer_key
+
+    def render(self, raw: str) -> t.HTML:
+        """Render the raw content, or return its cached HTML."""
+        if self.renderer_key is None:
+            return self.renderer.render(raw)
+        key = text_digest(f"{self.renderer_key}\0{raw}")
+        html = self.cache.get(key)
+        if html is None:
+            html = self.renderer.render(raw)
+            self.cache.put(key, html)
+        return t.HTML(html)
@@ -1,36 +1,31 @@
-"""Mackerel CLI."""
+"""Mackerel CLI.
 
-import http.server
+The renderers, the build and the development server depend on heavy
+packages, so they are imported by the commands using them, keeping
+commands like `mackerel --version` and `mackerel init` fast to start.
+"""
+
+import json
 import logging
 import shutil
-from functools import partial
+import tempfile
 from pathlib import Path
-from typing import Final
 
 import click
-import tomli_w
-from watchfiles import run_process
 
 import mackerel
 from mackerel import config
-from mackerel.build import build
-from mackerel.parsers import PythonFrontmatterParser
-from mackerel.renderers import Jinja2Renderer
-from mackerel.renderers import MarkdownRenderer
+from mackerel import profiling
+from mackerel.factories import create_content_renderer
+from mackerel.factories import create_metadata_parser
+from mackerel.factories import create_render_cache
+from mackerel.factories import setup_logging
 
 logger = logging.getLogger(__name__)
 
-LOG_FORMAT: Final[str] = "%(levelname)s:%(name)s:%(message)s"
-
-
-def setup_logging(verbose: bool) -> None:  # noqa: FBT001
-    """Setup logging configuration."""
-    level = logging.INFO if verbose else logging.WARNING
-    logging.basicConfig(level=level, format=LOG_FORMAT, force=True)
-
 
 @click.group()
-@click.version_option(message=f"{mackerel.__title__} {mackerel.__version__}")
+@click.version_option(package_name="mackerel", message="%(package)s %(version)s")
 @click.option("-v", "--verbose", is_flag=True, help="Enable verbose output.")
 @click.pass_context
 def cli(ctx: click.core.Context, verbose: bool) -> None:  # noqa: FBT001
@@ -47,14 +42,17 @@ def cli(ctx: click.core.Context, verbose: bool) -> None:  # noqa: FBT001
 @click.pass_context
 def init(ctx: click.core.Context, site_path: Path) -> None:
     """Create an new mackerel site."""
+    import tomli_w
+
     sample_site_path = Path(mackerel.__file__).parent / "site"
+    mcfg = config.AppConfig().mackerel
 
     logger.info("Copying sample site from %s to %s", sample_site_path, site_path)
     try:
         shutil.copytree(
             src=sample_site_path,
             dst=site_path,
-            ignore=shutil.ignore_patterns(str(config.AppConfig().mackerel.build_path)),
+            ignore=shutil.ignore_patterns(str(mcfg.build_path), str(mcfg.cache_path)),
         )
     except FileExistsError as e:
         ctx.fail(f"Initialize failed, file {e.filename} already exists")
@@ -75,6 +73,39 @@ def init(ctx: click.core.Context, site_path: Path) -> None:
     is_flag=True,
     help="Run build without persisting any files.",
 )
+@click.option(
+    "--force",
+    default=False,
+    is_flag=True,
+    help="Rebuild all files, ignoring the manifest of the previous build.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of processes reading documents, overrides the config.",
+)
+@click.option(
+    "--profile",
+    default=False,
+    is_flag=True,
+    help="Report the time spent in each phase and the slowest files.",
+)
+@click.option(
+    "--profile-top",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Number of slowest files reported by --profile.",
+)
+@click.option(
+    "--trace",
+    "trace_path",
+    type=click.Path(dir_okay=False, resolve_path=True, path_type=Path),
+    default=None,
+    help="Write a Chrome trace event file of the build, implies --profile.",
+)
 @click.option(
     "--config",
     "-c",
@@ -94,14 +125,25 @@ def init(ctx: click.core.Context, site_path: Path) -> None:
     ),
 )
 @click.pass_context
-def build_(
+def build_(  # noqa: PLR0913
     ctx: click.core.Context,
     config_path: Path,
     dry_run: bool,  # noqa: FBT001
+    force: bool,  # noqa: FBT001
+    jobs: int | None,
+    profile: bool,  # noqa: FBT001
+    profile_top: int,
+    trace_path: Path | None,
     yes: bool,  # noqa: FBT001
 ) -> None:
     """Build the static site."""
+    from mackerel.build import build
+    from mackerel.cache import BYTECODE_CACHE_NAME
+    from mackerel.renderers import Jinja2Renderer
+
     cfg = config.load_config(config_path)
+    if jobs is not None:
+        cfg.mackerel.jobs = jobs
     if cfg.mackerel.build_path.exists() and not yes:
         click.confirm(
             (
@@ -110,19 +152,31 @@ def build_(
             ),
             abort=True,
         )
-    # TODO: Add support for multiple renderers & parsers here
-    build(
-        cfg=cfg,
-        content_renderer=MarkdownRenderer(cfg.content_renderer),
-        metadata_parser=PythonFrontmatterParser(),
-        template_renderer=Jinja2Renderer(
-            template_path=cfg.mackerel.template_path,
-            template_suffix=cfg.mackerel.template_suffix,
-            cfg=cfg.template_renderer,
-        ),
-        dry_run=dry_run,
-    )
+    profiler = profiling.Profiler() if profile or trace_path else None
+    with profiling.profiling(profiler):
+        # TODO: Add support for multiple renderers here
+        build(
+            cfg=cfg,
+            content_renderer=create_content_renderer(cfg, dry_run=dry_run),
+            metadata_parser=create_metadata_parser(cfg),
+            template_renderer=Jinja2Renderer(
+                template_path=cfg.mackerel.template_path,
+                template_suffix=cfg.mackerel.template_suffix,
+                cfg=cfg.template_renderer,
+                # Dry runs compile the templates without writing their bytecode
+                cache_path=(
+                    None if dry_run else cfg.mackerel.cache_path / BYTECODE_CACHE_NAME
+                ),
+            ),
+            dry_run=dry_run,
+            incremental=not force,
+        )
     click.echo("Mackerel build finished.")
+    if profiler is not None:
+        click.echo(profiler.report(top=profile_top))
+    if profiler is not None and trace_path is not None:
+        profiler.write_trace(trace_path)
+        click.echo(f"Trace written to {trace_path}")
 
 
 @cli.command()
@@ -139,47 +193,171 @@ def build_(
 @click.pass_context
 def develop(ctx: click.core.Context, config_path: Path, host: str, port: int) -> None:
     """Runs a local development server."""
-    cfg = config.load_config(config_path)
+    from mackerel import develop as server
+
     verbose = bool(ctx.obj and ctx.obj.get("verbose", False))
-    run_process(
-        config_path,
-        cfg.mackerel.content_path,
-        cfg.mackerel.template_path,
-        target=run_server,
-        args=(host, port, config_path, verbose),
-    )
+    server.run_server(host, port, config_path, verbose)
 
 
-def run_server(host: str, port: int, config_path: Path, verbose: bool) -> None:  # noqa: FBT001
-    """Run a simple HTTP server."""
-    setup_logging(verbose)
-    cfg = config.load_config(config_path)
+@cli.command()
+@click.option("--docs", type=click.IntRange(min=1), default=100, show_default=True)
+@click.option(
+    "--body-size",
+    type=click.IntRange(min=0),
+    default=2000,
+    show_default=True,
+    help="Approximate size in bytes of each document body.",
+)
+@click.option("--categories", type=click.IntRange(min=0), default=5, show_default=True)
+@click.option(
+    "--categories-per-doc",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--category-lists-per-doc",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "--static-files",
+    type=click.IntRange(min=0),
+    default=10,
+    show_default=True,
+)
+@click.option(
+    "--static-size",
+    type=click.IntRange(min=0),
+    default=16 * 1024,
+    show_default=True,
+    help="Size in bytes of each static file.",
+)
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=1, show_default=True)
+@click.option("--repeat", type=click.IntRange(min=1), default=3, show_default=True)
+@click.option(
+    "--memory/--no-memory",
+    default=True,
+    show_default=True,
+    help="Measure the peak memory of a cold build, which runs it once more.",
+)
+@click.option(
+    "--output",
+    "-o",
+    "output_path",
+    type=click.Path(dir_okay=False, resolve_path=True, path_type=Path),
+    default=None,
+    help="Write the results as JSON to this file.",
+)
+@click.option(
+    "--compare",
+    "baseline_path",
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True, path_type=Path),
+    default=None,
+    help="Compare the results to those of a previous --output file.",
+)
+@click.option(
+    "--site-path",
+    type=click.Path(exists=False, resolve_path=True, path_type=Path),
+    default=None,
+    help="Generate the site in this directory and keep it.",
+)
+@click.pass_context
+def bench(  # noqa: PLR0913
+    ctx: click.core.Context,
+    docs: int,
+    body_size: int,
+    categories: int,
+    categories_per_doc: int,
+    category_lists_per_doc: int,
+    static_files: int,
+    static_size: int,
+    jobs: int,
+    repeat: int,
+    memory: bool,  # noqa: FBT001
+    output_path: Path | None,
+    baseline_path: Path | None,
+    site_path: Path | None,
+) -> None:
+    """Benchmark building a synthetic site."""
+    from mackerel import bench as benchmarks
 
-    def rebuild_site() -> None:
-        """Rebuild the site."""
-        build(
-            cfg=cfg,
-            content_renderer=MarkdownRenderer(cfg.content_renderer),
-            metadata_parser=PythonFrontmatterParser(),
-            template_renderer=Jinja2Renderer(
-                template_path=cfg.mackerel.template_path,
-                template_suffix=cfg.mackerel.template_suffix,
-                cfg=cfg.template_renderer,
-            ),
+    try:
+        spec = benchmarks.SiteSpec(
+            docs=docs,
+            body_size=body_size,
+            categories=categories,
+            categories_per_doc=categories_per_doc,
+            category_lists_per_doc=category_lists_per_doc,
+            static_files=static_files,
+            static_size=static_size,
         )
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from None
+    if site_path is not None and site_path.exists():
+        ctx.fail(f"Site path {site_path} already exists")
+    with tempfile.TemporaryDirectory(prefix="mackerel-bench-") as tmp:
+        results = benchmarks.run_benchmarks(
+            site_path or Path(tmp) / "site",
+            spec,
+            jobs=jobs,
+            repeat=repeat,
+            memory=memory,
+        )
+    baseline = json.loads(baseline_path.read_text()) if baseline_path else None
+    click.echo(benchmarks.format_results(results, baseline))
+    if output_path is not None:
+        output_path.write_text(json.dumps(results, indent=2))
+        click.echo(f"Results written to {output_path}")
+
 
-    rebuild_site()
-    handler = partial(
-        http.server.SimpleHTTPRequestHandler,
-        directory=cfg.mackerel.build_path,
+@cli.group()
+def cache() -> None:
+    """Inspect or clear the rendered content cache."""
+
+
+@cache.command()
+@click.option(
+    "--config",
+    "-c",
+    "config_path",
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True, path_type=Path),
+    default="mackerelconfig.toml",
+    help="Path to mackerel configuration file.",
+)
+def stats(config_path: Path) -> None:
+    """Show the size of the rendered content cache."""
+    render_cache = create_render_cache(config.load_config(config_path))
+    cache_stats = render_cache.stats()
+    render_cache.close()
+    click.echo(f"Path: {cache_stats.path}")
+    click.echo(f"Entries: {cache_stats.entries}")
+    click.echo(
+        f"Size: {cache_stats.size / 2**20:.1f} MiB "
+        f"of {cache_stats.max_size / 2**20:.1f} MiB",
     )
-    with http.server.ThreadingHTTPServer((host, port), handler) as httpd:
-        click.echo(f"Serving mackerel at http://{host}:{port}")
-        try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            logger.info("Shutting down server.")
-            httpd.server_close()
+
+
+@cache.command()
+@click.option(
+    "--config",
+    "-c",
+    "config_path",
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True, path_type=Path),
+    default="mackerelconfig.toml",
+    help="Path to mackerel configuration file.",
+)
+def clear(config_path: Path) -> None:
+    """Remove the rendered content and the compiled templates caches."""
+    from mackerel.cache import BYTECODE_CACHE_NAME
+
+    cfg = config.load_config(config_path)
+    render_cache = create_render_cache(cfg)
+    render_cache.clear()
+    render_cache.close()
+    shutil.rmtree(cfg.mackerel.cache_path / BYTECODE_CACHE_NAME, ignore_errors=True)
+    click.echo("Mackerel cache cleared.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+"""The compress module writes precompressed copies of the build outputs."""
+
+import gzip
+import importlib
+import logging
+import os
+from collections.abc import Callable
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from types import ModuleType
+from typing import Final
+
+from mackerel import profiling
+
+logger = logging.getLogger(__name__)
+
+try:
+    _brotli: ModuleType | None = importlib.import_module("brotli")
+except ImportError:  # brotli is optional, only gzip copies are written
+    _brotli = None
+
+# Files smaller than this gain nothing from being served compressed
+MIN_COMPRESS_SIZE: Final[int] = 256
+# Formats that are compressed already
+COMPRESSED_SUFFIXES: Final[frozenset[str]] = frozenset(
+    {
+        ".7z",
+        ".avif",
+        ".br",
+        ".bz2",
+        ".gif",
+        ".gz",
+        ".jpeg",
+        ".jpg",
+        ".mp3",
+        ".mp4",
+        ".ogg",
+        ".pdf",
+        ".png",
+        ".webm",
+        ".webp",
+        ".woff",
+        ".woff2",
+        ".xz",
+        ".zip",
+        ".zst",
+    }
+)
+
+
+def compressors() -> dict[str, Callable[[bytes], bytes]]:
+    """Return the compression functions by file suffix.
+
+    Brotli copies are only written when the brotli module is installed.
+    """
+    found: dict[str, Callable[[bytes], bytes]] = {
+        ".gz": partial(gzip.compress, compresslevel=9, mtime=0),
+    }
+    if _brotli is not None:
+        found[".br"] = partial(_brotli.compress, quality=11)
+    return found
+
+
+def compress_file(
+    path: Path,
+    methods: dict[str, Callable[[bytes], bytes]],
+) -> list[Path]:
+    """Write compressed copies of a file next to it, like `page.html.gz`.
+
+    Already compressed formats and small files are skipped. The copies get
+    the mtime of the file. Returns the paths of the written copies.
+    """
+    if path.suffix.lower() in COMPRESSED_SUFFIXES:
+        return []
+    st = path.stat()
+    if st.st_size < MIN_COMPRESS_SIZE:
+        return []
+    written: list[Path] = []
+    with profiling.span("compress_file", "compress", str(path)):
+        data = path.read_bytes()
+        for suffix, compress in methods.items():
+            target_path = path.with_name(path.name + suffix)
+            tmp_path = target_path.with_name(f".{target_path.name}.tmp")
+            tmp_path.write_bytes(compress(data))
+            tmp_path.replace(target_path)
+            os.utime(target_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            written.append(target_path)
+    return written
+
+
+def compress_files(paths: Iterable[Path]) -> list[Path]:
+    """Write compressed copies of the files on a thread pool.
+
+    The compressors release the GIL while compressing, so the files are
+    compressed in parallel. Returns the paths of the written copies.
+    """
+    pending = list(paths)
+    if not pending:
+        return []
+    methods = compressors()
+    for path in pending:
+        logger.info("Compressing file: %s", path)
+    with ThreadPoolExecutor() as executor:
+        results = list(executor.map(partial(compress_file, methods=methods), pending))
+    return [path for written in results for path in written]
@@ -13,8 +13,7 @@ from typing import Any
 from typing import Literal
 from typing import Self
 
-from mackerel import __title__
-from mackerel import __url__
+import mackerel
 from mackerel import types as t
 
 
@@ -43,6 +42,21 @@ class MackerelConfig:
     )
     content_renderer: str = "MarkdownRenderer"
     template_renderer: str = "Jinja2Renderer"
+    metadata_parser: str = "PythonFrontmatterParser"
+    jobs: int = 1
+    static_copy_mode: Literal["copy", "hardlink"] = "copy"
+    # Add the content hash to the names of the template assets
+    fingerprint_assets: bool = False
+    # Write gzip, and brotli if installed, copies of the written files
+    precompress: bool = False
+    # Glob patterns of the source paths to skip, besides those listed in the
+    # .mackerelignore file of the content and template directories
+    ignore: list[str] = field(default_factory=lambda: [".git", "node_modules"])
+    # Output types to minify, "html" pages and "css" template assets
+    minify: list[Literal["html", "css"]] = field(default_factory=list)
+    cache_path: Path = field(default_factory=lambda: Path(".mackerel-cache"))
+    # Size limit of the rendered content cache in bytes, 0 disables it
+    render_cache_size: int = 64 * 1024 * 1024
 
     navigation: list[t.NavItem] = field(
         default_factory=lambda: [
@@ -52,8 +66,8 @@ class MackerelConfig:
                 children=[],
             ),
             t.NavItem(
-                label=t.Label(__title__),
-                url=t.AbsoluteURL(__url__),
+                label=t.Label(mackerel.__title__),
+                url=t.AbsoluteURL(mackerel.__url__),
             ),
         ],
     )
@@ -64,6 +78,28 @@ class MackerelConfig:
             if not suffix.startswith("."):
                 msg = f"Invalid file suffix: '{suffix}'. It must start with '.'"
                 raise ValueError(msg)
+        if self.static_copy_mode not in ("copy", "hardlink"):
+            msg = (
+                f"Invalid static copy mode: '{self.static_copy_mode}'. "
+                "It must be 'copy' or 'hardlink'"
+            )
+            raise ValueError(msg)
+        for output_type in self.minify:
+            if output_type not in ("html", "css"):
+                msg = (
+                    f"Invalid minify output type: '{output_type}'. "
+                    "It must be 'html' or 'css'"
+                )
+                raise ValueError(msg)
+        if self.jobs < 1:
+            msg = f"Invalid number of jobs: {self.jobs}. It must be at least 1"
+            raise ValueError(msg)
+        if self.render_cache_size < 0:
+            msg = (
+                f"Invalid render cache size: {self.render_cache_size}. "
+                "It must be at least 0"
+            )
+            raise ValueError(msg)
 
 
 @dataclass
@@ -72,6 +108,7 @@ class Jinja2RendererConfig:
 
     trim_blocks: bool = True
     lstrip_blocks: bool = True
+    bytecode_cache: bool = True
 
 
 @dataclass
@@ -81,7 +118,6 @@ class MarkdownRendererConfig:
     output_format: Literal["html", "xhtml"] = "html"
     extensions: list[str] = field(
         default_factory=lambda: [
-            "markdown.extensions.meta",
             "markdown.extensions.extra",
         ],
     )
@@ -181,6 +217,7 @@ def load_config(config_path: Path) -> AppConfig:
             "build_path": build_path,
             "content_path": content_path,
             "template_path": template_path,
+            "cache_path": base_dir / mcfg.cache_path,
             "navigation": _parse_nav_items(raw_navigation),
         },
     )
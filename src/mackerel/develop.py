@@ -0,0 +1,149 @@
+"""The develop module keeps a site in memory to rebuild it on changes."""
+
+import http.server
+import logging
+import threading
+from collections.abc import Collection
+from pathlib import Path
+from typing import Any
+
+import click
+from watchfiles import DefaultFilter
+from watchfiles import watch
+
+from mackerel import config
+from mackerel import types as t
+from mackerel.build import build
+from mackerel.cache import BYTECODE_CACHE_NAME
+from mackerel.factories import create_content_renderer
+from mackerel.factories import create_metadata_parser
+from mackerel.factories import setup_logging
+from mackerel.livereload import LiveReloadHandler
+from mackerel.livereload import ReloadBroadcaster
+from mackerel.livereload import reload_event
+from mackerel.manifest import BuildManifest
+from mackerel.manifest import save_manifest
+from mackerel.renderers import Jinja2Renderer
+
+logger = logging.getLogger(__name__)
+
+
+class DevelopSite:
+    """A site kept in memory between the builds of the development server.
+
+    The config, the renderers and the manifest of the last build are reused,
+    so a rebuild only checks the changed paths and renders what depends on
+    them.
+    """
+
+    def __init__(self, config_path: Path) -> None:
+        """Load the site from the given config file."""
+        self.config_path = config_path
+        self.manifest: BuildManifest | None = None
+        self.load()
+
+    def load(self) -> None:
+        """Load the config and create the renderers."""
+        self.cfg = config.load_config(self.config_path)
+        self.content_renderer = create_content_renderer(self.cfg)
+        self.metadata_parser = create_metadata_parser(self.cfg)
+        self.template_renderer = Jinja2Renderer(
+            template_path=self.cfg.mackerel.template_path,
+            template_suffix=self.cfg.mackerel.template_suffix,
+            cfg=self.cfg.template_renderer,
+            cache_path=self.cfg.mackerel.cache_path / BYTECODE_CACHE_NAME,
+        )
+
+    def rebuild(self, changes: Collection[Path] | None = None) -> t.BuildResult:
+        """Build the site, only checking the changed paths if given."""
+        if changes is not None and self.config_path in changes:
+            logger.info("Reloading config: %s", self.config_path)
+            self.load()
+            changes = None
+        try:
+            result = build(
+                cfg=self.cfg,
+                content_renderer=self.content_renderer,
+                metadata_parser=self.metadata_parser,
+                template_renderer=self.template_renderer,
+                manifest=self.manifest,
+                changes=changes,
+                persist_manifest=False,
+            )
+        except:
+            # The outputs may be partially written, check every file next time
+            self.manifest = None
+            raise
+        self.manifest = result.manifest
+        return result
+
+    def save(self) -> None:
+        """Persist the manifest of the last build."""
+        if self.manifest is not None:
+            save_manifest(self.manifest, self.cfg.mackerel.build_path)
+
+
+def _watched_paths(cfg: config.AppConfig) -> tuple[Path, Path, Path]:
+    """The content, template and build paths the server watches."""
+    mcfg = cfg.mackerel
+    return mcfg.content_path, mcfg.template_path, mcfg.build_path
+
+
+def run_server(host: str, port: int, config_path: Path, verbose: bool) -> None:  # noqa: FBT001
+    """Run a simple HTTP server, rebuilding the site when a source changes.
+
+    Served pages get a live reload script and are reloaded, or have their
+    stylesheets swapped, when a rebuild changed them. When a config reload
+    moves the content, template or build path, the new paths are watched and
+    served.
+    """
+    setup_logging(verbose)
+    site = DevelopSite(config_path)
+    site.rebuild()
+    broadcaster = ReloadBroadcaster()
+
+    def handler(*args: Any) -> LiveReloadHandler:  # noqa: ANN401
+        return LiveReloadHandler(
+            *args,
+            directory=site.cfg.mackerel.build_path,
+            broadcaster=broadcaster,
+        )
+
+    with http.server.ThreadingHTTPServer((host, port), handler) as httpd:
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        click.echo(f"Serving mackerel at http://{host}:{port}")
+        try:
+            while True:
+                watched = _watched_paths(site.cfg)
+                content_path, template_path, build_path = watched
+                for changes in watch(
+                    config_path,
+                    content_path,
+                    template_path,
+                    watch_filter=DefaultFilter(ignore_paths=[build_path]),
+                ):
+                    paths = {Path(path) for _, path in changes}
+                    logger.info("Rebuilding %d changed paths.", len(paths))
+                    try:
+                        result = site.rebuild(paths)
+                    except Exception:
+                        logger.exception("Rebuild failed.")
+                        continue
+                    click.echo(
+                        f"Rebuilt {len(result.written)} documents, "
+                        f"copied {len(result.copied)} files.",
+                    )
+                    event = reload_event(result, site.cfg.mackerel.build_path)
+                    if event is not None:
+                        broadcaster.publish(event)
+                    if _watched_paths(site.cfg) != watched:
+                        logger.info("Watching the paths of the reloaded config.")
+                        break
+                else:
+                    break
+        except KeyboardInterrupt:
+            logger.info("Shutting down server.")
+        finally:
+            broadcaster.close()
+            httpd.shutdown()
+            site.save()
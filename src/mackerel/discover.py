@@ -0,0 +1,126 @@
+"""The discover module walks the source directories of a site."""
+
+import logging
+import os
+import stat
+from collections.abc import Iterable
+from collections.abc import Iterator
+from contextlib import suppress
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path
+from pathlib import PurePosixPath
+from typing import Final
+from typing import Self
+
+logger = logging.getLogger(__name__)
+
+# Name of the file listing the ignored paths of a source directory
+IGNORE_FILE_NAME: Final[str] = ".mackerelignore"
+
+
+@dataclass(frozen=True, slots=True)
+class IgnorePattern:
+    """A glob pattern of ignored paths, like a line of a `.gitignore` file."""
+
+    glob: str
+    # Patterns with a slash match the path from the root, others any name
+    anchored: bool
+    directory_only: bool
+
+    @classmethod
+    def parse(cls, line: str) -> Self | None:
+        """Parse a line of an ignore file, None for blank lines and comments."""
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return None
+        glob = line.strip("/")
+        return cls(
+            glob=glob,
+            anchored="/" in line.rstrip("/"),
+            directory_only=line.endswith("/"),
+        )
+
+    def matches(self, relative_path: str, is_dir: bool) -> bool:  # noqa: FBT001
+        """Check if the path relative to the root matches the pattern."""
+        if self.directory_only and not is_dir:
+            return False
+        if self.anchored:
+            return fnmatchcase(relative_path, self.glob)
+        return fnmatchcase(relative_path.rpartition("/")[2], self.glob)
+
+
+@dataclass(frozen=True, slots=True)
+class IgnoreRules:
+    """The paths ignored under a source directory."""
+
+    patterns: tuple[IgnorePattern, ...] = ()
+
+    @classmethod
+    def load(cls, root: Path, patterns: Iterable[str] = ()) -> Self:
+        """Load the rules of the ignore file of root, after the given patterns."""
+        lines = list(patterns)
+        with suppress(FileNotFoundError):
+            lines.extend((root / IGNORE_FILE_NAME).read_text().splitlines())
+        return cls(
+            tuple(
+                pattern
+                for line in lines
+                if (pattern := IgnorePattern.parse(line)) is not None
+            ),
+        )
+
+    def ignores(self, relative_path: str, is_dir: bool) -> bool:  # noqa: FBT001
+        """Check if an entry is ignored, its parent directory being walked."""
+        if not is_dir and relative_path == IGNORE_FILE_NAME:
+            return True
+        return any(pattern.matches(relative_path, is_dir) for pattern in self.patterns)
+
+    def ignores_path(self, relative_path: PurePosixPath) -> bool:
+        """Check if a file is ignored, or one of its parent directories."""
+        parents = [p.as_posix() for p in reversed(relative_path.parents[:-1])]
+        return any(self.ignores(parent, is_dir=True) for parent in parents) or (
+            self.ignores(relative_path.as_posix(), is_dir=False)
+        )
+
+
+def scan_files(
+    root: Path,
+    ignore: IgnoreRules | None = None,
+) -> Iterator[tuple[str, os.stat_result]]:
+    """Walk the files under root, yielding their path and stat.
+
+    The walk uses os.scandir, so directories and files are told apart
+    without extra system calls and each file is stat once. Symlinks to files
+    are followed, symlinks to directories are not walked, like
+    `Path.rglob`. Entries are yielded sorted by name, directory by directory.
+    Ignored directories are not walked.
+    """
+    ignore = ignore or IgnoreRules()
+    root_len = len(str(root)) + 1
+    pending = [str(root)]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except FileNotFoundError:
+            continue
+        subdirectories: list[str] = []
+        for entry in entries:
+            relative_path = entry.path[root_len:].replace(os.sep, "/")
+            if entry.is_dir(follow_symlinks=False):
+                if not ignore.ignores(relative_path, is_dir=True):
+                    subdirectories.append(entry.path)
+                continue
+            if ignore.ignores(relative_path, is_dir=False):
+                logger.debug("Ignoring file: %s", entry.path)
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue  # A broken symlink, or removed since it was listed
+            if stat.S_ISREG(st.st_mode):
+                yield entry.path, st
+        # Walked depth first, in name order
+        pending.extend(reversed(subdirectories))
@@ -0,0 +1,68 @@
+"""Create the renderers, parsers and caches selected by the config.
+
+Shared by the CLI and the development server. The factories import the
+renderers and parsers when called, since they depend on heavy packages that
+commands like `mackerel --version` do not need.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+from typing import Final
+
+import click
+
+if TYPE_CHECKING:
+    from mackerel import config
+    from mackerel import types as t
+    from mackerel.cache import RenderCache
+
+LOG_FORMAT: Final[str] = "%(levelname)s:%(name)s:%(message)s"
+
+
+def create_metadata_parser(cfg: config.AppConfig) -> t.MetadataParser:
+    """Create the metadata parser selected in the config."""
+    from mackerel.parsers import METADATA_PARSERS
+
+    name = cfg.mackerel.metadata_parser
+    try:
+        return METADATA_PARSERS[name]()
+    except KeyError:
+        msg = f"Unknown metadata parser: '{name}'"
+        raise click.ClickException(msg) from None
+
+
+def create_render_cache(cfg: config.AppConfig) -> RenderCache:
+    """Create the rendered content cache of the site."""
+    from mackerel.cache import RENDER_CACHE_NAME
+    from mackerel.cache import RenderCache
+
+    return RenderCache(
+        cfg.mackerel.cache_path / RENDER_CACHE_NAME,
+        max_size=cfg.mackerel.render_cache_size,
+    )
+
+
+def create_content_renderer(
+    cfg: config.AppConfig,
+    *,
+    dry_run: bool = False,
+) -> t.ContentRenderer:
+    """Create the content renderer, behind the render cache unless disabled.
+
+    Dry runs render without the cache, which would write its database.
+    """
+    from mackerel.cache import CachedContentRenderer
+    from mackerel.renderers import MarkdownRenderer
+
+    renderer = MarkdownRenderer(cfg.content_renderer)
+    if dry_run or cfg.mackerel.render_cache_size == 0:
+        return renderer
+    return CachedContentRenderer(renderer, create_render_cache(cfg))
+
+
+def setup_logging(verbose: bool) -> None:  # noqa: FBT001
+    """Setup logging configuration."""
+    level = logging.INFO if verbose else logging.WARNING
+    logging.basicConfig(level=level, format=LOG_FORMAT, force=True)
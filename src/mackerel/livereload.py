@@ -0,0 +1,189 @@
+"""Live reload of the pages served by the development server."""
+
+import http.server
+import io
+import json
+import logging
+import queue
+import threading
+from collections.abc import Generator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from typing import BinaryIO
+from typing import Final
+from urllib.parse import urlsplit
+
+from mackerel import types as t
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PATH: Final[str] = "/_mackerel/livereload"
+KEEPALIVE_INTERVAL: Final[float] = 15.0
+
+# The event name, "reload" or "css", and the changed URLs
+ReloadEvent = tuple[str, list[str]]
+
+# Reloads the page when its URL or an asset it references changed, swaps the
+# stylesheets otherwise, as they may load the changed assets
+CLIENT_SCRIPT: Final[str] = f"""<script>
+(() => {{
+  const normalize = (path) => path.endsWith("/") ? path + "index.html" : path;
+  const local = (value) => {{
+    const url = new URL(value, location.href);
+    return url.origin === location.origin ? normalize(url.pathname) : null;
+  }};
+  const swapStylesheets = (changed) => {{
+    for (const link of document.querySelectorAll("link[rel~=stylesheet]")) {{
+      if (changed(local(link.href))) {{
+        const href = new URL(link.href);
+        href.searchParams.set("mackerel", Date.now());
+        link.href = href.toString();
+      }}
+    }}
+  }};
+  const source = new EventSource("{EVENTS_PATH}");
+  source.addEventListener("reload", (e) => {{
+    const urls = new Set(JSON.parse(e.data).urls);
+    const selector = "[src], link[href]:not([rel~=stylesheet])";
+    const assets = Array.from(
+      document.querySelectorAll(selector),
+      (el) => local(el.getAttribute("src") ?? el.getAttribute("href")),
+    );
+    if ([normalize(location.pathname), ...assets].some((url) => urls.has(url))) {{
+      location.reload();
+    }} else if ([...urls].some((url) => !url.endsWith(".html"))) {{
+      swapStylesheets((url) => url !== null);
+    }}
+  }});
+  source.addEventListener("css", (e) => {{
+    const urls = JSON.parse(e.data).urls;
+    swapStylesheets((url) => urls.includes(url));
+  }});
+}})();
+</script>
+"""
+
+
+def inject_script(html: bytes) -> bytes:
+    """Insert the live reload client script before the closing body tag."""
+    script = CLIENT_SCRIPT.encode()
+    index = html.lower().rfind(b"</body>")
+    if index == -1:
+        return html + script
+    return html[:index] + script + html[index:]
+
+
+def reload_event(
+    result: t.BuildResult,
+    build_path: t.BuildPath,
+) -> ReloadEvent | None:
+    """Create the event announcing the URLs a build changed, if any.
+
+    When only stylesheets were copied, the event is a CSS event so the pages
+    swap them without reloading.
+    """
+    paths = [*result.written, *result.copied]
+    if not paths:
+        return None
+    urls = sorted("/" + path.relative_to(build_path).as_posix() for path in paths)
+    if not result.written and all(url.endswith(".css") for url in urls):
+        return "css", urls
+    return "reload", urls
+
+
+class ReloadBroadcaster:
+    """Deliver the reload events to every connected page."""
+
+    def __init__(self) -> None:
+        """Initialize without subscribers."""
+        self._lock = threading.Lock()
+        self._subscribers: list[queue.SimpleQueue[ReloadEvent | None]] = []
+
+    @contextmanager
+    def subscribe(
+        self,
+    ) -> Generator[queue.SimpleQueue[ReloadEvent | None], None, None]:
+        """Receive the published events until the context exits."""
+        events: queue.SimpleQueue[ReloadEvent | None] = queue.SimpleQueue()
+        with self._lock:
+            self._subscribers.append(events)
+        try:
+            yield events
+        finally:
+            with self._lock:
+                self._subscribers.remove(events)
+
+    def publish(self, event: ReloadEvent) -> None:
+        """Send an event to all subscribers."""
+        with self._lock:
+            for events in self._subscribers:
+                events.put(event)
+
+    def close(self) -> None:
+        """Disconnect all subscribers."""
+        with self._lock:
+            for events in self._subscribers:
+                events.put(None)
+
+
+class LiveReloadHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve the build directory with the live reload script and events."""
+
+    def __init__(
+        self,
+        *args: Any,  # noqa: ANN401
+        broadcaster: ReloadBroadcaster,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Initialize the handler with the broadcaster of the server."""
+        self.broadcaster = broadcaster
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Serve a file or the event stream."""
+        if urlsplit(self.path).path == EVENTS_PATH:
+            self.send_events()
+        else:
+            super().do_GET()
+
+    def send_head(self) -> BinaryIO | None:
+        """Send the headers of a file, adding the client script to HTML pages."""
+        path = Path(self.translate_path(self.path))
+        if path.is_dir() and urlsplit(self.path).path.endswith("/"):
+            path /= "index.html"
+        if path.suffix != ".html" or not path.is_file():
+            return super().send_head()
+        body = inject_script(path.read_bytes())
+        self.send_response(http.HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def send_events(self) -> None:
+        """Stream the reload events until the page or the server disconnects."""
+        self.send_response(http.HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        with self.broadcaster.subscribe() as events:
+            try:
+                self.wfile.write(b": connected\n\n")
+                self.wfile.flush()
+                while True:
+                    try:
+                        event = events.get(timeout=KEEPALIVE_INTERVAL)
+                    except queue.Empty:
+                        self.wfile.write(b": keepalive\n\n")
+                        self.wfile.flush()
+                        continue
+                    if event is None:
+                        return
+                    name, urls = event
+                    data = json.dumps({"urls": urls})
+                    self.wfile.write(f"event: {name}\ndata: {data}\n\n".encode())
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                logger.debug("Live reload client disconnected.")
@@ -0,0 +1,145 @@
+"""The manifest module records what a build produced for incremental builds."""
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import Any
+from typing import Final
+from typing import Self
+
+from mackerel import types as t
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME: Final[str] = ".mackerel-manifest.json"
+MANIFEST_VERSION: Final[int] = 1
+ASSET_MANIFEST_NAME: Final[str] = "asset-manifest.json"
+
+
+def file_digest(path: Path) -> str:
+    """Return the content hash of a file."""
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def text_digest(text: str) -> str:
+    """Return the content hash of a string."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+@dataclass(slots=True)
+class FileEntry:
+    """A source file seen by a previous build."""
+
+    digest: str
+    mtime_ns: int
+    size: int
+    output: str = ""
+
+    def matches_stat(self, st: os.stat_result) -> bool:
+        """Check if the file stat matches the recorded one."""
+        return self.mtime_ns == st.st_mtime_ns and self.size == st.st_size
+
+
+@dataclass(slots=True)
+class DocumentEntry(FileEntry):
+    """A document file seen by a previous build."""
+
+    template: str = ""
+    draft: bool = False
+    categories: list[str] = field(default_factory=list)
+    category_lists: list[str] = field(default_factory=list)
+    # Template files the document renders with, empty if unknown
+    templates: list[str] = field(default_factory=list)
+    # Number of pages written for paginated category lists
+    pages: int = 1
+
+
+@dataclass(slots=True)
+class BuildManifest:
+    """The inputs and outputs of a build, keyed by source path."""
+
+    fingerprint: str = ""
+    templates: dict[str, FileEntry] = field(default_factory=dict)
+    assets: dict[str, FileEntry] = field(default_factory=dict)
+    static: dict[str, FileEntry] = field(default_factory=dict)
+    documents: dict[str, DocumentEntry] = field(default_factory=dict)
+    # Files written to the build path, relative to it, pruned once stale
+    outputs: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        """Create a manifest from its JSON representation."""
+        return cls(
+            fingerprint=data["fingerprint"],
+            templates={k: FileEntry(**v) for k, v in data["templates"].items()},
+            assets={k: FileEntry(**v) for k, v in data["assets"].items()},
+            static={k: FileEntry(**v) for k, v in data["static"].items()},
+            documents={k: DocumentEntry(**v) for k, v in data["documents"].items()},
+            outputs=list(data.get("outputs", [])),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to a JSON compatible dictionary."""
+        return {"version": MANIFEST_VERSION, **asdict(self)}
+
+
+def load_manifest(build_path: t.BuildPath) -> BuildManifest:
+    """Load the manifest of the previous build, or an empty one."""
+    path = build_path / MANIFEST_NAME
+    try:
+        data = json.loads(path.read_text())
+        if data.get("version") != MANIFEST_VERSION:
+            return BuildManifest()
+        return BuildManifest.from_dict(data)
+    except FileNotFoundError:
+        return BuildManifest()
+    except (ValueError, KeyError, TypeError):
+        logger.warning("Ignoring unreadable build manifest: %s", path)
+        return BuildManifest()
+
+
+def save_manifest(manifest: BuildManifest, build_path: t.BuildPath) -> None:
+    """Persist the manifest in the build directory."""
+    build_path.mkdir(parents=True, exist_ok=True)
+    path = build_path / MANIFEST_NAME
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest.to_dict(), separators=(",", ":")))
+    tmp_path.replace(path)
+
+
+def save_asset_manifest(assets: dict[str, str], build_path: t.BuildPath) -> None:
+    """Write the build paths of the template assets, keyed by source path."""
+    build_path.mkdir(parents=True, exist_ok=True)
+    path = build_path / ASSET_MANIFEST_NAME
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(assets, indent=2, sort_keys=True))
+    tmp_path.replace(path)
+
+
+def check_file(
+    path: Path,
+    entry: FileEntry | None,
+    st: os.stat_result | None = None,
+) -> tuple[bool, FileEntry]:
+    """Check a source file against its manifest entry.
+
+    Returns whether the file changed and its current entry. The digest is only
+    computed when size or mtime differ from the recorded ones. The stat of
+    the file is taken when not given.
+    """
+    if st is None:
+        st = path.stat()
+    if entry is not None and entry.matches_stat(st):
+        return False, entry
+    digest = file_digest(path)
+    return entry is None or entry.digest != digest, FileEntry(
+        digest=digest,
+        mtime_ns=st.st_mtime_ns,
+        size=st.st_size,
+    )
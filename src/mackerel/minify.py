@@ -0,0 +1,265 @@
+"""The minify module strips the whitespace and comments of HTML and CSS."""
+
+import re
+from collections.abc import Collection
+from collections.abc import Iterable
+from collections.abc import Iterator
+from itertools import chain
+from typing import Final
+from typing import Self
+
+from mackerel.cache import RenderCache
+from mackerel.config import AppConfig
+from mackerel.manifest import text_digest
+
+# Changing the minifiers changes their output, so it is part of the cache key
+MINIFY_VERSION: Final[int] = 1
+
+# Elements whose content is kept as is
+_RAW_TAGS: Final[frozenset[str]] = frozenset({"pre", "script", "style", "textarea"})
+# Elements around which whitespace is not rendered
+_BLOCK_TAGS: Final[frozenset[str]] = frozenset(
+    {
+        "address",
+        "article",
+        "aside",
+        "blockquote",
+        "body",
+        "br",
+        "dd",
+        "details",
+        "div",
+        "dl",
+        "dt",
+        "fieldset",
+        "figcaption",
+        "figure",
+        "footer",
+        "form",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "head",
+        "header",
+        "hr",
+        "html",
+        "li",
+        "link",
+        "main",
+        "meta",
+        "nav",
+        "ol",
+        "option",
+        "p",
+        "pre",
+        "script",
+        "section",
+        "select",
+        "style",
+        "summary",
+        "table",
+        "tbody",
+        "td",
+        "tfoot",
+        "th",
+        "thead",
+        "title",
+        "tr",
+        "ul",
+    }
+)
+# Comments kept in the output, like conditional comments
+_KEPT_COMMENTS: Final[tuple[str, ...]] = ("<!--[if", "<!--<![endif", "<!--!")
+
+_TAG = re.compile(r"""<(/?)([a-zA-Z!][^\s/>]*)(?:[^>"']|"[^"]*"|'[^']*')*>""")
+_WHITESPACE = re.compile(r"\s+")
+_CSS_TOKEN = re.compile(
+    r"""
+    "(?:\\.|[^"\\])*"           # double quoted string
+    | '(?:\\.|[^'\\])*'         # single quoted string
+    | /\*.*?\*/                 # comment
+    | \s+                       # whitespace
+    | [^"'/\s{};,>:]+           # anything else up to punctuation
+    | .                         # punctuation
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+# CSS punctuation that needs no whitespace before and after it
+_CSS_PUNCTUATION: Final[str] = "{};,>"
+
+
+def minify_html(chunks: Iterable[str]) -> Iterator[str]:  # noqa: C901, PLR0912, PLR0915
+    """Minify HTML as it is generated, chunk by chunk.
+
+    Runs of whitespace in text are collapsed into one space, which is dropped
+    next to block elements. Comments are removed, except conditional ones.
+    Tags and the content of pre, textarea, script and style elements are
+    kept as they are. Incomplete tags at the end of a chunk are held back
+    until the next one.
+    """
+    buffer = ""
+    raw_tag: str | None = None
+    # Whitespace seen but not written yet, and whether a block tag came last
+    space = False
+    after_block = True
+    for chunk in chain(chunks, [None]):
+        final = chunk is None
+        buffer += chunk or ""
+        lower = buffer.lower()
+        out: list[str] = []
+        pos = 0
+        while pos < len(buffer):
+            if raw_tag is not None:
+                end = lower.find(f"</{raw_tag}", pos)
+                if end == -1:
+                    # Keep enough for the closing tag split across chunks
+                    stop = (
+                        len(buffer)
+                        if final
+                        else max(pos, len(buffer) - len(raw_tag) - 2)
+                    )
+                    out.append(buffer[pos:stop])
+                    pos = stop
+                    break
+                out.append(buffer[pos:end])
+                pos = end
+                raw_tag = None
+                continue
+            lt = buffer.find("<", pos)
+            text = buffer[pos:] if lt == -1 else buffer[pos:lt]
+            if text:
+                collapsed = _WHITESPACE.sub(" ", text)
+                if collapsed.startswith(" "):
+                    space = True
+                    collapsed = collapsed[1:]
+                if collapsed:
+                    if space and not after_block:
+                        out.append(" ")
+                    space = collapsed.endswith(" ")
+                    out.append(collapsed.removesuffix(" "))
+                    after_block = False
+            if lt == -1:
+                pos = len(buffer)
+                break
+            pos = lt
+            if buffer.startswith("<!--", pos):
+                end = buffer.find("-->", pos + 4)
+                if end == -1 and not final:
+                    break
+                end = len(buffer) if end == -1 else end + 3
+                comment = buffer[pos:end]
+                if comment.startswith(_KEPT_COMMENTS):
+                    out.append(comment)
+                pos = end
+                continue
+            match = _TAG.match(buffer, pos)
+            if match is None:
+                if not final and ">" not in buffer[pos:]:
+                    break  # The rest of the tag is in the next chunk
+                # A lone < in text
+                if space and not after_block:
+                    out.append(" ")
+                space = False
+                after_block = False
+                out.append("<")
+                pos += 1
+                continue
+            closing, name = match.group(1), match.group(2).lower()
+            block = name in _BLOCK_TAGS or name.startswith("!")
+            if space and not (block or after_block):
+                out.append(" ")
+            space = False
+            after_block = block
+            tag = match.group()
+            out.append(tag)
+            pos = match.end()
+            if not closing and name in _RAW_TAGS and not tag.endswith("/>"):
+                raw_tag = name
+        buffer = buffer[pos:]
+        if out:
+            yield "".join(out)
+
+
+def minify_css(css: str) -> str:
+    """Minify a stylesheet.
+
+    Comments are removed, except `/*! ... */` ones, whitespace is collapsed
+    and dropped around punctuation and after colons, and the last semicolon
+    of each block is removed. Strings are kept as they are.
+    """
+    out: list[str] = []
+    space = False
+    for match in _CSS_TOKEN.finditer(css):
+        part = match.group()
+        if part.startswith("/*"):
+            if part.startswith("/*!"):
+                out.append(part)
+            continue
+        if part.isspace():
+            space = True
+            continue
+        if part in _CSS_PUNCTUATION:
+            if part == "}" and out and out[-1] == ";":
+                out.pop()
+        elif space and out and out[-1] not in _CSS_PUNCTUATION and out[-1] != ":":
+            out.append(" ")
+        space = False
+        out.append(part)
+    return "".join(out)
+
+
+class Minifier:
+    """Minify the outputs of the configured types, html or css.
+
+    Pages are minified as their chunks are rendered, so they are never held
+    in memory in full. Minified stylesheets are cached by the hash of their
+    content when a cache is given.
+    """
+
+    def __init__(
+        self, types: Collection[str], cache: RenderCache | None = None
+    ) -> None:
+        """Initialize with the output types to minify and the result cache."""
+        self.types = frozenset(types)
+        self.cache = cache
+
+    def __reduce__(
+        self,
+    ) -> tuple[type[Self], tuple[frozenset[str], RenderCache | None]]:
+        """Pickle the types and the cache settings."""
+        return type(self), (self.types, self.cache)
+
+    def html(self, chunks: Iterable[str]) -> Iterable[str]:
+        """Minify the chunks of a page if HTML is minified."""
+        if "html" not in self.types:
+            return chunks
+        return minify_html(chunks)
+
+    def css(self, css: str) -> str | None:
+        """Minify a stylesheet, None if CSS is not minified."""
+        if "css" not in self.types:
+            return None
+        key = text_digest(f"minify-css-{MINIFY_VERSION}\0{css}")
+        minified = self.cache.get(key) if self.cache is not None else None
+        if minified is None:
+            minified = minify_css(css)
+            if self.cache is not None:
+                self.cache.put(key, minified)
+        return minified
+
+
+def create_minifier(
+    cfg: AppConfig,
+    cache: RenderCache | None = None,
+) -> Minifier | None:
+    """Create the minifier of the configured types, if any.
+
+    The minified stylesheets are kept in the given cache, the build passes
+    the render cache of its content renderer.
+    """
+    if not cfg.mackerel.minify:
+        return None
+    return Minifier(cfg.mackerel.minify, cache)
@@ -1,42 +1,162 @@
 """A module for all provided parsers."""
 
+import datetime as dt
+import json
+import re
+import tomllib
+from collections.abc import Callable
+from collections.abc import Mapping
 from pathlib import Path
 from typing import Any
+from typing import Final
 from typing import cast
 
 import frontmatter  # type: ignore[import-untyped]  # TODO: remove when frontmatter gets types
+import yaml
+from dateutil.parser import ParserError
+from dateutil.parser import parse as parse_datetime_fallback
 
 from mackerel import types as t
 
+YAMLLoader: type[yaml.CSafeLoader | yaml.SafeLoader]
+try:
+    YAMLLoader = yaml.CSafeLoader
+except AttributeError:  # PyYAML built without libyaml
+    YAMLLoader = yaml.SafeLoader
+
+
+def parse_datetime(value: object) -> dt.datetime | None:
+    """Parse a frontmatter date value, None if it is missing or invalid.
+
+    YAML and TOML loaders already return datetimes for unquoted values, ISO
+    8601 strings take the fromisoformat fast path and dateutil is only the
+    fallback for other formats.
+    """
+    if value is None:
+        return None
+    if isinstance(value, dt.datetime):
+        return value
+    if isinstance(value, dt.date):
+        return dt.datetime.combine(value, dt.time())
+    text = str(value)
+    try:
+        return dt.datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    try:
+        return parse_datetime_fallback(text)
+    except (ParserError, OverflowError):
+        return None
+
+
+def document_metadata(metadata: Mapping[str, Any]) -> t.DocumentMetadata:
+    """Create the document metadata from the loaded frontmatter."""
+    # TODO: Allow extra custom attributes
+    return t.DocumentMetadata(
+        title=t.Title(metadata["title"]),
+        template=Path(metadata["template"]),
+        created_at=t.CreatedAt(str(metadata["created_at"]))
+        if "created_at" in metadata
+        else None,
+        modified_at=t.ModifiedAt(str(metadata["modified_at"]))
+        if "modified_at" in metadata
+        else None,
+        created_datetime=parse_datetime(metadata.get("created_at")),
+        modified_datetime=parse_datetime(metadata.get("modified_at")),
+        draft=bool(metadata.get("draft", False)),
+        excerpt=t.Excerpt(metadata.get("excerpt", ""))
+        if "excerpt" in metadata
+        else None,
+        categories=[t.Category(cat) for cat in metadata.get("categories", [])],
+        category_lists=[
+            t.CategoryList(
+                name=t.Category(cat["name"]),
+                sort_by=cat.get("sort_by"),
+                order=cat.get("order", "desc"),
+                per_page=cat.get("per_page"),
+            )
+            for cat in metadata.get("category_lists", [])
+        ],
+    )
+
 
 class PythonFrontmatterParser(t.MetadataParser):
     """Python frontmatter based parser."""
 
+    def split(self, raw: str) -> tuple[str, str]:
+        """Split the frontmatter from the document body."""
+        text = raw.strip()
+        handler = frontmatter.detect_format(text, frontmatter.handlers)
+        if handler is None:
+            return "", text
+        try:
+            _, content = handler.split(text)
+        except ValueError:
+            return "", text
+        return text[: len(text) - len(content)], content.strip()
+
     def parse(self, raw: str) -> t.DocumentMetadata:
-        """Parse the frontmatter from a document file."""
-        # TODO: Allow extra custom attributes
+        """Parse the frontmatter from a document header."""
         raw_metadata, _ = frontmatter.parse(raw)
         metadata = cast("dict[str, Any]", raw_metadata)
-        return t.DocumentMetadata(
-            title=t.Title(metadata["title"]),
-            template=Path(metadata["template"]),
-            created_at=t.CreatedAt(str(metadata["created_at"]))
-            if "created_at" in metadata
-            else None,
-            modified_at=t.ModifiedAt(str(metadata["modified_at"]))
-            if "modified_at" in metadata
-            else None,
-            draft=bool(metadata.get("draft", False)),
-            excerpt=t.Excerpt(metadata.get("excerpt", ""))
-            if "excerpt" in metadata
-            else None,
-            categories=[t.Category(cat) for cat in metadata.get("categories", [])],
-            category_lists=[
-                t.CategoryList(
-                    name=t.Category(cat["name"]),
-                    sort_by=cat.get("sort_by"),
-                    order=cat.get("order", "desc"),
-                )
-                for cat in metadata.get("category_lists", [])
-            ],
-        )
+        return document_metadata(metadata)
+
+
+def _load_yaml(text: str) -> Any:  # noqa: ANN401
+    return yaml.load(text, Loader=YAMLLoader)  # noqa: S506
+
+
+# Opening delimiter, boundary line pattern and loader of each frontmatter format
+FRONTMATTER_FORMATS: Final[dict[str, tuple[re.Pattern[str], Callable[[str], Any]]]] = {
+    "---": (re.compile(r"^-{3,}[ \t]*\r?$", re.MULTILINE), _load_yaml),
+    "+++": (re.compile(r"^\+{3,}[ \t]*\r?$", re.MULTILINE), tomllib.loads),
+    ";;;": (re.compile(r"^;{3,}[ \t]*\r?$", re.MULTILINE), json.loads),
+}
+
+
+class FastFrontmatterParser(t.MetadataParser):
+    """Frontmatter parser using the libyaml, tomllib and json loaders directly.
+
+    Supports YAML frontmatter between `---`, TOML between `+++` and JSON
+    between `;;;` lines. The format is picked from the opening delimiter, so
+    there is no handler detection.
+    """
+
+    def _boundaries(self, text: str) -> tuple[re.Match[str], re.Match[str]] | None:
+        fmt = FRONTMATTER_FORMATS.get(text[:3])
+        if fmt is None:
+            return None
+        boundary, _ = fmt
+        opening = boundary.match(text)
+        if opening is None:
+            return None
+        closing = boundary.search(text, opening.end())
+        if closing is None:
+            return None
+        return opening, closing
+
+    def split(self, raw: str) -> tuple[str, str]:
+        """Split the frontmatter from the document body."""
+        text = raw.strip()
+        boundaries = self._boundaries(text)
+        if boundaries is None:
+            return "", text
+        _, closing = boundaries
+        return text[: closing.end()], text[closing.end() :].strip()
+
+    def parse(self, raw: str) -> t.DocumentMetadata:
+        """Parse the frontmatter from a document header."""
+        text = raw.strip()
+        boundaries = self._boundaries(text)
+        if boundaries is None:
+            return document_metadata({})
+        opening, closing = boundaries
+        _, load = FRONTMATTER_FORMATS[text[:3]]
+        metadata = load(text[opening.end() : closing.start()])
+        return document_metadata(metadata if isinstance(metadata, dict) else {})
+
+
+METADATA_PARSERS: Final[dict[str, type[t.MetadataParser]]] = {
+    "PythonFrontmatterParser": PythonFrontmatterParser,
+    "FastFrontmatterParser": FastFrontmatterParser,
+}
@@ -0,0 +1,222 @@
+"""The profiling module times the phases and the files of a build."""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from collections.abc import Generator
+from collections.abc import Iterable
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from contextlib import contextmanager
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import TypeVar
+
+_A = TypeVar("_A")
+_R = TypeVar("_R")
+
+
+@dataclass(frozen=True, slots=True)
+class Span:
+    """A timed block of a build, in nanoseconds."""
+
+    name: str
+    category: str
+    label: str
+    start: int
+    wall: int
+    cpu: int
+    pid: int
+    tid: int
+
+
+@dataclass(frozen=True, slots=True)
+class SpanTotal:
+    """The summed time of the spans sharing a key."""
+
+    key: str
+    count: int
+    wall: int
+    cpu: int
+
+
+def _ms(ns: int) -> str:
+    return f"{ns / 1e6:10.2f} ms"
+
+
+class Profiler:
+    """Record the wall and CPU time of the spans of a build.
+
+    CPU time is the time of the thread running the span, so spans of the
+    thread and process pools are measured on their own. Spans can be
+    recorded from several threads.
+    """
+
+    def __init__(self) -> None:
+        """Initialize without spans."""
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        category: str,
+        label: str = "",
+    ) -> Generator[None, None, None]:
+        """Time the block of the context."""
+        start = time.perf_counter_ns()
+        cpu_start = time.thread_time_ns()
+        try:
+            yield
+        finally:
+            span = Span(
+                name=name,
+                category=category,
+                label=label,
+                start=start,
+                wall=time.perf_counter_ns() - start,
+                cpu=time.thread_time_ns() - cpu_start,
+                pid=os.getpid(),
+                tid=threading.get_ident(),
+            )
+            with self._lock:
+                self.spans.append(span)
+
+    def extend(self, spans: Iterable[Span]) -> None:
+        """Record spans measured by another process."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def drain(self) -> list[Span]:
+        """Remove and return the recorded spans."""
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return spans
+
+    def totals(
+        self,
+        key: Callable[[Span], str | None],
+    ) -> list[SpanTotal]:
+        """Sum the spans by key, skipping those without one, slowest first."""
+        counts: defaultdict[str, int] = defaultdict(int)
+        walls: defaultdict[str, int] = defaultdict(int)
+        cpus: defaultdict[str, int] = defaultdict(int)
+        for span in self.spans:
+            k = key(span)
+            if k is None:
+                continue
+            counts[k] += 1
+            walls[k] += span.wall
+            cpus[k] += span.cpu
+        return sorted(
+            (SpanTotal(k, counts[k], walls[k], cpus[k]) for k in counts),
+            key=lambda total: total.wall,
+            reverse=True,
+        )
+
+    def report(self, top: int = 10) -> str:
+        """Summarize the phases, the operations and the slowest files."""
+        sections = {
+            "Phases": self.totals(lambda s: s.name if s.category == "phase" else None),
+            "Operations": self.totals(
+                lambda s: s.name if s.category != "phase" else None
+            ),
+            f"Slowest documents (top {top})": self.totals(
+                lambda s: s.label if s.category == "document" else None
+            )[:top],
+            f"Slowest templates (top {top})": self.totals(
+                lambda s: s.label if s.category == "template" else None
+            )[:top],
+            f"Slowest static files (top {top})": self.totals(
+                lambda s: s.label if s.category == "static" else None
+            )[:top],
+        }
+        lines: list[str] = []
+        for title, totals in sections.items():
+            if not totals:
+                continue
+            lines.append(f"{title}:")
+            width = max(len(total.key) for total in totals)
+            lines.extend(
+                f"  {total.key:<{width}} {total.count:6d}x "
+                f"wall {_ms(total.wall)}  cpu {_ms(total.cpu)}"
+                for total in totals
+            )
+        return "\n".join(lines)
+
+    def trace(self) -> dict[str, Any]:
+        """Convert the spans to the Chrome trace event format."""
+        origin = min((span.start for span in self.spans), default=0)
+        return {
+            "displayTimeUnit": "ms",
+            "traceEvents": [
+                {
+                    "name": f"{span.name} {span.label}".strip(),
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": (span.start - origin) / 1e3,
+                    "dur": span.wall / 1e3,
+                    "pid": span.pid,
+                    "tid": span.tid,
+                    "args": {"label": span.label, "cpu_ms": span.cpu / 1e6},
+                }
+                for span in sorted(self.spans, key=lambda span: span.start)
+            ],
+        }
+
+    def write_trace(self, path: Path) -> None:
+        """Write the spans to a trace file, viewable in Perfetto or Chrome."""
+        path.write_text(json.dumps(self.trace()))
+
+
+# The profiler of the running build, None when not profiling
+_active: Profiler | None = None
+
+
+def active() -> Profiler | None:
+    """Return the profiler of the running build, if any."""
+    return _active
+
+
+@contextmanager
+def profiling(profiler: Profiler | None) -> Generator[Profiler | None, None, None]:
+    """Record the spans of the builds run in the context with the profiler."""
+    global _active  # noqa: PLW0603
+    previous, _active = _active, profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+
+
+def span(name: str, category: str, label: str = "") -> AbstractContextManager[None]:
+    """Time a block with the active profiler, do nothing when not profiling."""
+    if _active is None:
+        return nullcontext()
+    return _active.span(name, category, label)
+
+
+def init_worker(enabled: bool) -> None:  # noqa: FBT001
+    """Profile the tasks of a worker process when the build is profiled."""
+    global _active  # noqa: PLW0603
+    _active = Profiler() if enabled else None
+
+
+def call_in_worker(fn: Callable[[_A], _R], arg: _A) -> tuple[_R, list[Span]]:
+    """Call a task in a worker process, returning the spans it recorded."""
+    result = fn(arg)
+    return result, [] if _active is None else _active.drain()
+
+
+def collect(results: Iterable[tuple[_R, list[Span]]]) -> Iterator[_R]:
+    """Record the spans returned by the worker tasks with the results."""
+    for result, spans in results:
+        if _active is not None:
+            _active.extend(spans)
+        yield result
@@ -1,28 +1,63 @@
 """A module for all provided renderers."""
 
+import json
+import logging
+from collections.abc import Iterator
 from dataclasses import asdict
+from pathlib import Path
+from typing import Self
 
 import jinja2
+import jinja2.meta
 import markdown
 
 from mackerel import types as t
 from mackerel.config import Jinja2RendererConfig
 from mackerel.config import MarkdownRendererConfig
 
+logger = logging.getLogger(__name__)
+
 
 class MarkdownRenderer(t.ContentRenderer):
     """Markdown-based content renderer."""
 
     def __init__(self, cfg: MarkdownRendererConfig) -> None:
         """Initialize the Markdown renderer with the given configuration."""
+        self.cfg = cfg
         self.md = markdown.Markdown(**asdict(cfg))
 
+    def __reduce__(self) -> tuple[type[Self], tuple[MarkdownRendererConfig]]:
+        """Pickle only the config, so each worker process builds its own parser."""
+        return type(self), (self.cfg,)
+
+    def cache_key(self) -> str:
+        """Identify the output by the config and the Markdown version."""
+        return json.dumps(
+            {"markdown": markdown.__version__, **asdict(self.cfg)},
+            sort_keys=True,
+        )
+
     def render(self, raw: str) -> t.HTML:
         """Render the raw Markdown content into HTML."""
         html = self.md.reset().convert(raw)
         return t.HTML(html)
 
 
+@jinja2.pass_context
+def asset_url(context: jinja2.runtime.Context, path: str) -> str:
+    """Return the URL of a template asset, with its fingerprint if enabled.
+
+    Paths are relative to the template directory. Unknown assets keep their
+    path.
+    """
+    key = path.lstrip("/")
+    ctx = context.get("ctx")
+    assets = ctx.assets if isinstance(ctx, t.TemplateContext) else {}
+    if key not in assets:
+        logger.warning("Unknown template asset: %s", path)
+    return "/" + assets.get(key, key)
+
+
 class Jinja2Renderer(t.TemplateRenderer):
     """Jinja2-based template renderer."""
 
@@ -31,18 +66,111 @@ class Jinja2Renderer(t.TemplateRenderer):
         template_path: t.TemplatePath,
         template_suffix: t.TemplateSuffix,
         cfg: Jinja2RendererConfig,
+        cache_path: Path | None = None,
     ) -> None:
-        """Initialize the Jinja2 env."""
+        """Initialize the Jinja2 env.
+
+        Compiled templates are cached in cache_path when given and the
+        bytecode cache is enabled in the config.
+        """
+        self.template_path = template_path
         self.template_suffix = template_suffix
+        self.cfg = cfg
+        self.cache_path = cache_path
+        options = asdict(cfg)
+        bytecode_cache = None
+        if options.pop("bytecode_cache") and cache_path is not None:
+            cache_path.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = jinja2.FileSystemBytecodeCache(str(cache_path))
+        # Templates are reloaded by load() instead of checked on every lookup
         self.env = jinja2.Environment(
             loader=jinja2.FileSystemLoader(template_path),
             autoescape=jinja2.select_autoescape(enabled_extensions=()),
-            **asdict(cfg),
+            bytecode_cache=bytecode_cache,
+            auto_reload=False,
+            **options,
         )
+        self.env.globals["asset_url"] = asset_url
+        self.templates: dict[Path, jinja2.Template] = {}
+
+    def __reduce__(
+        self,
+    ) -> tuple[
+        type[Self],
+        tuple[t.TemplatePath, t.TemplateSuffix, Jinja2RendererConfig, Path | None],
+    ]:
+        """Pickle only the settings, so each worker process builds its own env."""
+        return type(self), (
+            self.template_path,
+            self.template_suffix,
+            self.cfg,
+            self.cache_path,
+        )
+
+    def load(self) -> None:
+        """Compile all templates into the lookup table of the build.
+
+        Templates that fail to compile are left out, rendering with them
+        raises the error.
+        """
+        self.env.cache.clear()  # type: ignore[union-attr]
+        self.templates = {}
+        for name in self.env.list_templates(
+            extensions=[self.template_suffix.removeprefix(".")]
+        ):
+            try:
+                template = self.env.get_template(name)
+            except jinja2.TemplateError:
+                logger.exception("Error compiling template %s", name)
+                continue
+            self.templates[Path(name).with_suffix("")] = template
+
+    def _template(self, path: Path) -> jinja2.Template:
+        template = self.templates.get(path)
+        if template is None:
+            template = self.env.get_template(
+                str(path.with_suffix(self.template_suffix))
+            )
+            self.templates[path] = template
+        return template
 
     def render(self, ctx: t.TemplateContext, document: t.RenderedDocument) -> t.HTML:
         """Render the document using the Jinja2 template."""
-        template = self.env.get_template(
-            str(document.metadata.template.with_suffix(self.template_suffix))
-        )
+        template = self._template(document.metadata.template)
         return t.HTML(template.render(ctx=ctx, document=document))
+
+    def stream(
+        self,
+        ctx: t.TemplateContext,
+        document: t.RenderedDocument,
+    ) -> Iterator[str]:
+        """Render the document in the chunks generated by the Jinja2 template."""
+        template = self._template(document.metadata.template)
+        return template.generate(ctx=ctx, document=document)
+
+    def dependencies(self, template: Path) -> set[Path] | None:
+        """Find the templates a template extends, includes or imports.
+
+        Walks the parsed templates recursively. Returns None when a template
+        cannot be parsed or references a template by a dynamic name.
+        """
+        pending = [template.with_suffix(self.template_suffix).as_posix()]
+        found: set[str] = set()
+        while pending:
+            name = pending.pop()
+            if name in found:
+                continue
+            # Missing templates are kept, adding them changes the output
+            found.add(name)
+            try:
+                source, _, _ = self.env.loader.get_source(self.env, name)  # type: ignore[union-attr]
+                ast = self.env.parse(source)
+            except jinja2.TemplateNotFound:
+                continue
+            except jinja2.TemplateSyntaxError:
+                return None
+            for ref in jinja2.meta.find_referenced_templates(ast):
+                if ref is None:
+                    return None
+                pending.append(ref)
+        return {Path(name) for name in found}
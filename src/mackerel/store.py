@@ -0,0 +1,175 @@
+"""The store module keeps the rendered documents of a build out of memory."""
+
+import mmap
+import tempfile
+from collections.abc import Generator
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Mapping
+from collections.abc import Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from typing import BinaryIO
+from typing import Self
+from typing import overload
+
+from mackerel import types as t
+
+# URL, metadata, offset and length of the HTML of a stored document
+_Entry = tuple[t.RelativeURL, t.DocumentMetadata, int, int]
+
+
+class DocumentStore(Mapping[t.BuildPath, t.RenderedDocument]):
+    """Rendered documents with their HTML spilled to a file.
+
+    Only the URL and the metadata of each document are kept in memory. The
+    HTML is appended to the store file when a document is added and read
+    back through a memory map when the document is looked up, so memory
+    use is proportional to the metadata instead of the content. A pickled
+    store reads the same file, for worker processes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initialize an empty store writing to the given file."""
+        self.path = path
+        self.entries: dict[t.BuildPath, _Entry] = {}
+        self._size = 0
+        self._file: BinaryIO | None = None
+        self._map: mmap.mmap | None = None
+
+    @classmethod
+    @contextmanager
+    def temporary(cls) -> Generator[Self, None, None]:
+        """Create a store in a temporary directory, removed on exit."""
+        with tempfile.TemporaryDirectory(prefix="mackerel-") as tmp:
+            store = cls(Path(tmp) / "documents.html")
+            try:
+                yield store
+            finally:
+                store.close()
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle the path and the entries, the file is opened again."""
+        if self._file is not None:
+            self._file.flush()
+        return {"path": self.path, "entries": self.entries, "size": self._size}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore a store reading the same file."""
+        self.path = state["path"]
+        self.entries = state["entries"]
+        self._size = state["size"]
+        self._file = None
+        self._map = None
+
+    def add(self, target_path: t.BuildPath, doc: t.RenderedDocument) -> None:
+        """Store a document, appending its HTML to the store file."""
+        file = self._file
+        if file is None:
+            file = self._file = self.path.open("ab")
+        data = doc.html.encode()
+        file.write(data)
+        self.entries[target_path] = (doc.url, doc.metadata, self._size, len(data))
+        self._size += len(data)
+
+    def metadata(self, target_path: t.BuildPath) -> t.DocumentMetadata:
+        """Return the metadata of a document without reading its HTML."""
+        return self.entries[target_path][1]
+
+    def reorder(self, target_paths: Iterable[t.BuildPath]) -> None:
+        """Order the documents by the given target paths."""
+        self.entries = {path: self.entries[path] for path in target_paths}
+
+    def _read(self, offset: int, length: int) -> str:
+        if length == 0:
+            return ""
+        if self._map is None or offset + length > len(self._map):
+            if self._file is not None:
+                self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            with self.path.open("rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset : offset + length].decode()
+
+    def __getitem__(self, target_path: t.BuildPath) -> t.RenderedDocument:
+        """Load a document with its HTML."""
+        url, metadata, offset, length = self.entries[target_path]
+        return t.RenderedDocument(
+            url=url,
+            html=t.HTML(self._read(offset, length)),
+            metadata=metadata,
+        )
+
+    def __iter__(self) -> Iterator[t.BuildPath]:
+        """Iterate over the target paths of the documents."""
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        """Count the documents."""
+        return len(self.entries)
+
+    def close(self) -> None:
+        """Close the store file and its memory map."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class DocumentSequence(Sequence[t.RenderedDocument]):
+    """A read-only view of documents in a mapping, loaded when accessed.
+
+    Slicing returns another view over the same target paths, so taking the
+    first few items of a long list only loads those documents.
+    """
+
+    __slots__ = ("_docs", "_indices", "_paths")
+
+    def __init__(
+        self,
+        docs: Mapping[t.BuildPath, t.RenderedDocument],
+        paths: Sequence[t.BuildPath],
+        indices: range | None = None,
+    ) -> None:
+        """Initialize a view of the documents at the given target paths."""
+        self._docs = docs
+        self._paths = paths
+        self._indices = range(len(paths)) if indices is None else indices
+
+    @overload
+    def __getitem__(self, index: int) -> t.RenderedDocument: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "DocumentSequence": ...
+
+    def __getitem__(
+        self,
+        index: int | slice,
+    ) -> "t.RenderedDocument | DocumentSequence":
+        """Load a document, or view a slice of the documents."""
+        if isinstance(index, slice):
+            return DocumentSequence(self._docs, self._paths, self._indices[index])
+        return self._docs[self._paths[self._indices[index]]]
+
+    def __len__(self) -> int:
+        """Count the documents without loading them."""
+        return len(self._indices)
+
+    def __repr__(self) -> str:
+        """Show the target paths of the documents."""
+        paths = [self._paths[i].as_posix() for i in self._indices]
+        return f"{type(self).__name__}({paths!r})"
+
+
+def document_metadata(
+    docs: Mapping[t.BuildPath, t.RenderedDocument],
+    target_path: t.BuildPath,
+) -> t.DocumentMetadata:
+    """Return the metadata of a document, without its HTML if it is stored."""
+    if isinstance(docs, DocumentStore):
+        return docs.metadata(target_path)
+    return docs[target_path].metadata
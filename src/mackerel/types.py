@@ -6,11 +6,19 @@ from abc import abstractmethod
 from dataclasses import dataclass
 from dataclasses import field
 from pathlib import Path
+from typing import TYPE_CHECKING
 from typing import Any
 from typing import Literal
 from typing import NewType
 from typing import Protocol
 
+if TYPE_CHECKING:
+    import datetime as dt
+    from collections.abc import Iterator
+    from collections.abc import Sequence
+
+    from mackerel.manifest import BuildManifest
+
 
 # Files
 # Using subclasses for type distinction since NewType does not support
@@ -47,6 +55,14 @@ class CategoryList:
     name: Category
     sort_by: Literal["title", "created_at", "modified_at"] = "title"
     order: Literal["asc", "desc"] = "desc"
+    # Split the documents showing the list into pages of this many items
+    per_page: int | None = None
+
+    def __post_init__(self) -> None:
+        """Post-initialization validation."""
+        if self.per_page is not None and self.per_page < 1:
+            msg = f"Invalid per_page: {self.per_page}. It must be at least 1"
+            raise ValueError(msg)
 
 
 @dataclass(frozen=True, slots=True)
@@ -61,6 +77,8 @@ class DocumentMetadata:
     excerpt: Excerpt | None = None
     categories: list[Category] = field(default_factory=list)
     category_lists: list[CategoryList] = field(default_factory=list)
+    created_datetime: dt.datetime | None = None
+    modified_datetime: dt.datetime | None = None
 
 
 @dataclass(frozen=True, slots=True)
@@ -76,7 +94,18 @@ class RenderedDocument:
 class BuildCategoryList(CategoryList):
     """Represents a category list for building the site."""
 
-    items: list[RenderedDocument] = field(default_factory=list)
+    # Read-only and shared by all the pages showing the list
+    items: Sequence[RenderedDocument] = field(default_factory=tuple)
+
+
+@dataclass(frozen=True, slots=True)
+class Pagination:
+    """Represents the position of a page in a paginated document."""
+
+    page: int
+    pages: int
+    prev_url: RelativeURL | None = None
+    next_url: RelativeURL | None = None
 
 
 @dataclass(frozen=True, slots=True)
@@ -84,6 +113,7 @@ class BuildDocument(RenderedDocument):
     """Represents a document ready for template rendering."""
 
     category_lists: list[BuildCategoryList] = field(default_factory=list)
+    pagination: Pagination | None = None
 
 
 # Navigation
@@ -114,6 +144,8 @@ class TemplateContext:
 
     user: UserConfig = field(default_factory=lambda: UserConfig({}))
     nav: list[NavItem] = field(default_factory=list)
+    # Build paths of the template assets, fingerprinted if enabled
+    assets: dict[str, str] = field(default_factory=dict)
 
 
 class TemplateRenderer(Protocol):
@@ -123,6 +155,30 @@ class TemplateRenderer(Protocol):
     def render(self, ctx: TemplateContext, document: BuildDocument) -> HTML:
         """Render the content with the given metadata using a template."""
 
+    def stream(self, ctx: TemplateContext, document: BuildDocument) -> Iterator[str]:
+        """Render the document in chunks, to write them as they are rendered.
+
+        The default yields the whole output of render.
+        """
+        yield self.render(ctx, document)
+
+    def load(self) -> None:
+        """Load the templates before a build renders its documents.
+
+        Called by every build with documents to write, before writing them,
+        so changed templates are picked up by long running processes. Builds
+        without changed documents skip it. The default does nothing.
+        """
+
+    def dependencies(self, template: Path) -> set[Path] | None:
+        """Find the template files a document template renders with.
+
+        The paths are relative to the template path and include the template
+        itself. The default returns None, the dependencies are unknown and
+        documents are rendered again when any template changes.
+        """
+        return None
+
 
 # Renderers
 DocSuffix = NewType("DocSuffix", str)
@@ -134,18 +190,47 @@ class ContentRenderer(Protocol):
 
     @abstractmethod
     def render(self, raw: str) -> HTML:
-        """Render the raw content into HTML."""
+        """Render the raw content body into HTML."""
         ...
 
+    def cache_key(self) -> str | None:
+        """Identify the output of the renderer for caching.
+
+        Renderers with the same key must render a body to the same HTML. The
+        default returns None, the output is not cached.
+        """
+        return None
+
 
 class MetadataParser(Protocol):
     """Protocol for parsing metadata from content files."""
 
+    def split(self, raw: str) -> tuple[str, str]:
+        """Split the raw document into its metadata header and its body.
+
+        The default passes the whole document as both, so parsers written
+        before the split keep parsing and rendering the raw document.
+        """
+        return raw, raw
+
     @abstractmethod
     def parse(self, raw: str) -> DocumentMetadata:
-        """Parse the metadata of the document into a DocumentMetadata object."""
+        """Parse the metadata header into a DocumentMetadata object."""
         ...
 
 
 # Build
 BuildPath = NewType("BuildPath", Path)
+
+
+@dataclass(frozen=True, slots=True)
+class BuildResult:
+    """Represents the files a build wrote to the build path."""
+
+    written: list[BuildPath] = field(default_factory=list)
+    copied: list[BuildPath] = field(default_factory=list)
+    manifest: BuildManifest | None = None
+    # Precompressed copies of the written and copied files
+    compressed: list[BuildPath] = field(default_factory=list)
+    # Outputs of the previous build the sources no longer produce
+    removed: list[BuildPath] = field(default_factory=list)
@@ -0,0 +1,72 @@
+"""Test cases for the benchmarks of synthetic sites."""
+
+from pathlib import Path
+
+import pytest
+
+from mackerel import config
+from mackerel.bench import BENCHMARKS
+from mackerel.bench import SiteSpec
+from mackerel.bench import format_results
+from mackerel.bench import generate_site
+from mackerel.bench import run_benchmarks
+
+
+def test_generate_site(tmp_path: Path) -> None:
+    """Test the documents and static files of a generated site."""
+    spec = SiteSpec(
+        docs=3,
+        body_size=500,
+        categories=2,
+        categories_per_doc=2,
+        category_lists_per_doc=1,
+        static_files=2,
+        static_size=100,
+    )
+    config_path = generate_site(tmp_path / "site", spec, jobs=2)
+    cfg = config.load_config(config_path)
+    assert cfg.mackerel.jobs == 2
+    posts = sorted((cfg.mackerel.content_path / "posts").iterdir())
+    assert [post.name for post in posts] == [
+        "post-00000.md",
+        "post-00001.md",
+        "post-00002.md",
+    ]
+    assert "categories: [category-0, category-1]" in posts[0].read_text()
+    assert "  - name: category-0" in posts[0].read_text()
+    assert len(posts[0].read_text()) > 500
+    static = sorted((cfg.mackerel.content_path / "static").iterdir())
+    assert [f.stat().st_size for f in static] == [100, 100]
+
+    # The same spec generates the same site
+    generate_site(tmp_path / "again", spec)
+    assert (tmp_path / "again" / "content" / "posts" / "post-00000.md").read_text() == (
+        posts[0].read_text()
+    )
+
+
+def test_site_spec_validation() -> None:
+    """Test that a site spec cannot reference missing categories."""
+    with pytest.raises(ValueError, match="Invalid number of docs: 0"):
+        SiteSpec(docs=0)
+    with pytest.raises(ValueError, match="Invalid categories per doc: 3"):
+        SiteSpec(categories=2, categories_per_doc=3)
+    with pytest.raises(ValueError, match="Invalid category lists per doc: 3"):
+        SiteSpec(categories=2, category_lists_per_doc=3)
+
+
+def test_run_benchmarks(tmp_path: Path) -> None:
+    """Test the results of benchmarking a small site."""
+    spec = SiteSpec(docs=3, body_size=100, static_files=1, static_size=10)
+    results = run_benchmarks(tmp_path / "site", spec, repeat=2)
+    assert results["spec"]["docs"] == 3
+    assert list(results["results"]) == list(BENCHMARKS)
+    for timing in results["results"].values():
+        assert len(timing["runs"]) == 2
+        assert 0 < timing["min"] <= timing["median"]
+    assert results["peak_memory"] > 0
+    assert (tmp_path / "site" / "_build" / "posts" / "post-00000.html").exists()
+
+    report = format_results(results, baseline=results)
+    assert "cold_build" in report
+    assert "1.00x baseline" in report
@@ -1,19 +1,39 @@
 """Tests for the build module."""
 
+import datetime as dt
+import gzip
+import json
+from collections.abc import Iterator
 from pathlib import Path
+from unittest import mock
 
 import pytest
 
+from mackerel import manifest as manifest_module
 from mackerel import types as t
+from mackerel.build import CategoryIndex
 from mackerel.build import build
 from mackerel.build import copy_static_file
-from mackerel.build import create_category_items
+from mackerel.build import copy_static_files
 from mackerel.build import fetch_content_files
 from mackerel.build import fetch_template_assets
+from mackerel.build import fingerprint_path
+from mackerel.build import page_path
+from mackerel.build import prune_outputs
 from mackerel.build import read_document
 from mackerel.build import write_documents
+from mackerel.cache import CachedContentRenderer
+from mackerel.cache import RenderCache
+from mackerel.compress import compressors
 from mackerel.config import AppConfig
 from mackerel.config import MackerelConfig
+from mackerel.discover import IGNORE_FILE_NAME
+from mackerel.manifest import ASSET_MANIFEST_NAME
+from mackerel.manifest import MANIFEST_NAME
+from mackerel.manifest import BuildManifest
+from mackerel.parsers import PythonFrontmatterParser
+from mackerel.renderers import Jinja2Renderer
+from mackerel.store import DocumentStore
 
 
 class MockContentRenderer(t.ContentRenderer):
@@ -46,6 +66,21 @@ class MockTemplateRenderer(t.TemplateRenderer):
         )
 
 
+class ListTemplateRenderer(t.TemplateRenderer):
+    """A template renderer showing the items of the category lists."""
+
+    def render(self, ctx: t.TemplateContext, document: t.BuildDocument) -> t.HTML:
+        """Render the document followed by its category list items."""
+        return t.HTML(
+            document.html
+            + "".join(
+                f"<li>{item.metadata.title}: {item.html}</li>"
+                for category_list in document.category_lists
+                for item in category_list.items
+            ),
+        )
+
+
 @pytest.mark.parametrize(
     ("relative_dir", "expected_content", "dry_run"),
     [
@@ -92,6 +127,60 @@ def test_copy_static(
         assert expected_path.read_text() == expected_content
 
 
+@pytest.mark.parametrize("link", [False, True], ids=["copy", "hardlink"])
+def test_copy_static_files(tmp_path: Path, link: bool) -> None:
+    """Ensure static files are copied in bulk keeping their mtime."""
+    content_path = tmp_path / "content"
+    build_path = tmp_path / "build"
+    files = []
+    for name in ("a.txt", "sub/b.txt", "sub/deep/c.txt"):
+        f = content_path / name
+        f.parent.mkdir(parents=True, exist_ok=True)
+        f.write_text(name)
+        files.append((t.StaticFile(f), t.BuildPath(build_path / name)))
+
+    copied = copy_static_files(files, link=link)
+
+    assert copied == [target_path for _, target_path in files]
+    for f, target_path in files:
+        assert target_path.read_text() == f.read_text()
+        assert target_path.stat().st_mtime_ns == f.stat().st_mtime_ns
+        assert target_path.samefile(f) is link
+
+
+def test_build_hardlink_then_copy(tmp_path: Path) -> None:
+    """Ensure copying over the hard links of a previous build keeps the sources."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    build_path = mcfg.build_path
+    static = mcfg.content_path / "static.txt"
+    styles = mcfg.template_path / "style.css"
+    styles.write_text("body {}")
+    mcfg.static_copy_mode = "hardlink"
+    _build_incremental(cfg)
+    assert (build_path / "static.txt").samefile(static)
+    assert (build_path / "style.css").samefile(styles)
+
+    mcfg.static_copy_mode = "copy"
+    result = _build_incremental(cfg)
+    assert set(result.copied) == {build_path / "static.txt", build_path / "style.css"}
+    assert static.read_text() == "static"
+    assert styles.read_text() == "body {}"
+    assert (build_path / "static.txt").read_text() == "static"
+    assert not (build_path / "static.txt").samefile(static)
+    assert not (build_path / "style.css").samefile(styles)
+    assert not list(build_path.glob(".*.tmp"))
+
+
+def test_copy_static_files_dry_run(tmp_path: Path) -> None:
+    """Ensure a dry run copies nothing."""
+    f = tmp_path / "a.txt"
+    f.write_text("a")
+    target_path = t.BuildPath(tmp_path / "build" / "a.txt")
+    assert copy_static_files([(t.StaticFile(f), target_path)], dry_run=True) == []
+    assert not target_path.exists()
+
+
 @pytest.mark.parametrize(
     ("relative_dir", "expected_heading"),
     [
@@ -137,8 +226,54 @@ def test_read_document(
     assert doc.html == t.HTML(f"<span>{expected_heading}</span>")
 
 
+class ParseOnlyMetadataParser:
+    """A structural metadata parser without split, reading the title line."""
+
+    def parse(self, raw: str) -> t.DocumentMetadata:
+        """Parse the first line of the raw document as the title."""
+        return t.DocumentMetadata(
+            title=t.Title(raw.splitlines()[0].removeprefix("title: ")),
+            template=Path("default.html"),
+        )
+
+
+class ParseOnlySubclassParser(ParseOnlyMetadataParser, t.MetadataParser):
+    """A metadata parser subclassing the protocol without overriding split."""
+
+
+@pytest.mark.parametrize(
+    "metadata_parser",
+    [ParseOnlyMetadataParser(), ParseOnlySubclassParser()],
+    ids=["structural", "subclass"],
+)
+def test_read_document_parse_only_parser(
+    tmp_path: Path,
+    metadata_parser: t.MetadataParser,
+) -> None:
+    """Ensure parsers without split get the whole document, as before split."""
+    raw = "title: Parsed\n\n# Heading"
+    file_path = tmp_path / "document.md"
+    file_path.write_text(raw)
+    cfg = AppConfig(
+        mackerel=MackerelConfig(
+            build_path=t.BuildPath(tmp_path / "build"),
+            content_path=t.ContentPath(tmp_path),
+            template_path=t.TemplatePath(tmp_path / "templates"),
+        ),
+    )
+    _, doc = read_document(
+        f=t.DocumentFile(file_path),
+        cfg=cfg,
+        content_renderer=MockContentRenderer(),
+        metadata_parser=metadata_parser,
+    )
+    assert doc.metadata.title == t.Title("Parsed")
+    assert doc.html == t.HTML(f"<span>{raw}</span>")
+
+
+@pytest.mark.parametrize("jobs", [1, 2], ids=["serial", "parallel"])
 @pytest.mark.parametrize("dry_run", [True, False], ids=["dry_run", "not_dry_run"])
-def test_write_documents(tmp_path: Path, dry_run: bool) -> None:
+def test_write_documents(tmp_path: Path, dry_run: bool, jobs: int) -> None:
     """Test the write_documents function."""
     content_path = tmp_path
     build_path = t.BuildPath(tmp_path / "build")
@@ -148,6 +283,7 @@ def test_write_documents(tmp_path: Path, dry_run: bool) -> None:
             build_path=t.BuildPath(build_path),
             content_path=t.ContentPath(content_path),
             template_path=t.TemplatePath(tmp_path / "templates"),
+            jobs=jobs,
         ),
     )
     docs = {
@@ -200,6 +336,220 @@ def test_write_documents(tmp_path: Path, dry_run: bool) -> None:
             assert target_path.read_text() == expected_html
 
 
+@pytest.mark.parametrize("jobs", [1, 2], ids=["serial", "parallel"])
+def test_write_documents_from_store(tmp_path: Path, jobs: int) -> None:
+    """Test writing documents loaded from a document store."""
+    build_path = t.BuildPath(tmp_path / "build")
+    cfg = AppConfig(mackerel=MackerelConfig(build_path=build_path, jobs=jobs))
+    with DocumentStore.temporary() as docs:
+        for name, categories, category_lists in (
+            ("index", [], [t.CategoryList(name=t.Category("posts"))]),
+            ("post1", [t.Category("posts")], []),
+            ("post2", [t.Category("posts")], []),
+        ):
+            docs.add(
+                t.BuildPath(build_path / f"{name}.html"),
+                t.RenderedDocument(
+                    url=t.RelativeURL(f"/{name}.html"),
+                    html=t.HTML(f"<p>{name}</p>"),
+                    metadata=t.DocumentMetadata(
+                        title=t.Title(name),
+                        template=Path("page"),
+                        categories=categories,
+                        category_lists=category_lists,
+                    ),
+                ),
+            )
+        written = write_documents(
+            docs=docs,
+            cfg=cfg,
+            template_renderer=ListTemplateRenderer(),
+        )
+    assert sorted(written) == sorted(build_path.iterdir())
+    assert (build_path / "index.html").read_text() == (
+        "<p>index</p><li>post2: <p>post2</p></li><li>post1: <p>post1</p></li>"
+    )
+    assert (build_path / "post1.html").read_text() == "<p>post1</p>"
+
+
+def test_page_path() -> None:
+    """Test the paths of the pages of a paginated document."""
+    assert page_path(Path("blog/index.html"), 1) == Path("blog/index.html")
+    assert page_path(Path("blog/index.html"), 2) == Path("blog/page/2.html")
+    assert page_path(Path("blog.html"), 3) == Path("blog/page/3.html")
+
+
+class PaginationTemplateRenderer(t.TemplateRenderer):
+    """A template renderer showing the list items and the page links."""
+
+    def render(self, ctx: t.TemplateContext, document: t.BuildDocument) -> t.HTML:
+        """Render the category list items followed by the pagination."""
+        items = ",".join(
+            str(item.metadata.title)
+            for category_list in document.category_lists
+            for item in category_list.items
+        )
+        pagination = document.pagination
+        if pagination is None:
+            return t.HTML(items)
+        return t.HTML(
+            f"{items}|{pagination.page}/{pagination.pages}"
+            f"|{pagination.prev_url}|{pagination.next_url}"
+        )
+
+
+def test_write_documents_paginated(tmp_path: Path) -> None:
+    """Test that a document with a paginated list is written in pages."""
+    build_path = t.BuildPath(tmp_path / "build")
+    cfg = AppConfig(mackerel=MackerelConfig(build_path=build_path))
+    docs = {
+        t.BuildPath(build_path / "blog" / "index.html"): t.RenderedDocument(
+            url=t.RelativeURL("/blog/index.html"),
+            html=t.HTML(""),
+            metadata=t.DocumentMetadata(
+                title=t.Title("Blog"),
+                template=Path("list"),
+                category_lists=[
+                    t.CategoryList(name=t.Category("posts"), order="asc", per_page=2),
+                ],
+            ),
+        ),
+    }
+    for i in range(1, 6):
+        docs[t.BuildPath(build_path / f"post{i}.html")] = t.RenderedDocument(
+            url=t.RelativeURL(f"/post{i}.html"),
+            html=t.HTML(""),
+            metadata=t.DocumentMetadata(
+                title=t.Title(f"p{i}"),
+                template=Path("page"),
+                categories=[t.Category("posts")],
+            ),
+        )
+    written = write_documents(
+        docs=docs,
+        cfg=cfg,
+        template_renderer=PaginationTemplateRenderer(),
+    )
+    blog_path = build_path / "blog"
+    assert {path for path in written if path.is_relative_to(blog_path)} == {
+        blog_path / "index.html",
+        blog_path / "page" / "2.html",
+        blog_path / "page" / "3.html",
+    }
+    assert (blog_path / "index.html").read_text() == (
+        "p1,p2|1/3|None|/blog/page/2.html"
+    )
+    assert (blog_path / "page" / "2.html").read_text() == (
+        "p3,p4|2/3|/blog/index.html|/blog/page/3.html"
+    )
+    assert (blog_path / "page" / "3.html").read_text() == (
+        "p5|3/3|/blog/page/2.html|None"
+    )
+    assert (build_path / "post1.html").read_text() == ""
+
+
+def test_category_list_invalid_per_page() -> None:
+    """Test that a category list needs at least one item per page."""
+    with pytest.raises(ValueError, match="Invalid per_page: 0"):
+        t.CategoryList(name=t.Category("posts"), per_page=0)
+
+
+class CountingDocs(dict[t.BuildPath, t.RenderedDocument]):
+    """Documents counting the lookups of each document."""
+
+    def __init__(self, docs: dict[t.BuildPath, t.RenderedDocument]) -> None:
+        """Initialize with the documents to count."""
+        super().__init__(docs)
+        self.lookups: list[t.BuildPath] = []
+
+    def __getitem__(self, key: t.BuildPath) -> t.RenderedDocument:
+        """Count the lookup and return the document."""
+        self.lookups.append(key)
+        return super().__getitem__(key)
+
+
+def test_category_index_lazy_items() -> None:
+    """Test that category list items only load the accessed documents."""
+    docs = CountingDocs(
+        {
+            t.BuildPath(Path(f"post{i}.html")): t.RenderedDocument(
+                url=t.RelativeURL(f"/post{i}.html"),
+                html=t.HTML(f"<p>{i}</p>"),
+                metadata=t.DocumentMetadata(
+                    title=t.Title(f"Post {i:02}"),
+                    template=Path("page"),
+                    categories=[t.Category("posts")],
+                ),
+            )
+            for i in range(20)
+        }
+    )
+    index = CategoryIndex(docs)
+    category_list = t.CategoryList(name=t.Category("posts"))
+    items = index.get(category_list).items
+    assert index.get(category_list).items is items
+    # Indexing and sorting read the metadata of plain dicts through lookups
+    docs.lookups.clear()
+    assert len(items) == 20
+    assert docs.lookups == []
+
+    latest = items[:5]
+    assert len(latest) == 5
+    assert [doc.metadata.title for doc in latest] == [
+        f"Post {i:02}" for i in range(19, 14, -1)
+    ]
+    assert items[-1].html == "<p>0</p>"
+    assert [doc.html for doc in items[2:10:3]] == [
+        "<p>17</p>",
+        "<p>14</p>",
+        "<p>11</p>",
+    ]
+    assert len(docs.lookups) == 9
+    assert len(items[18:40]) == 2
+
+
+class FailingTemplateRenderer(t.TemplateRenderer):
+    """A template renderer failing halfway through its output."""
+
+    def render(self, ctx: t.TemplateContext, document: t.RenderedDocument) -> t.HTML:
+        """Render the start of the page and fail."""
+        return t.HTML("".join(self.stream(ctx, document)))
+
+    def stream(
+        self,
+        ctx: t.TemplateContext,
+        document: t.RenderedDocument,
+    ) -> Iterator[str]:
+        """Render the start of the page and fail."""
+        yield "<html>"
+        msg = "Template error"
+        raise ValueError(msg)
+
+
+def test_write_documents_failed_render(tmp_path: Path) -> None:
+    """Test that a failed render keeps the previous output intact."""
+    build_path = t.BuildPath(tmp_path / "build")
+    cfg = AppConfig(mackerel=MackerelConfig(build_path=build_path))
+    target_path = t.BuildPath(build_path / "doc.html")
+    target_path.parent.mkdir()
+    target_path.write_text("previous")
+    docs = {
+        target_path: t.RenderedDocument(
+            url=t.RelativeURL("/doc.html"),
+            metadata=t.DocumentMetadata(title=t.Title("Doc"), template=Path("doc")),
+            html=t.HTML("<p>Doc</p>"),
+        ),
+    }
+    with pytest.raises(ValueError, match="Template error"):
+        write_documents(
+            docs=docs,
+            cfg=cfg,
+            template_renderer=FailingTemplateRenderer(),
+        )
+    assert target_path.read_text() == "previous"
+    assert list(build_path.iterdir()) == [target_path]
+
+
 def test_fetch_content_files(tmp_path: Path) -> None:
     """Test the fetch_content_files function."""
     content_path = tmp_path
@@ -249,8 +599,8 @@ def test_fetch_template_assets(tmp_path: Path) -> None:
     assert files[0] == template_asset
 
 
-def test_create_category_items_sorting_and_caching() -> None:
-    """Test create_category_items with sorting and caching behavior."""
+def test_category_index_sorting_and_caching() -> None:
+    """Test CategoryIndex with sorting and caching behavior."""
     # Create 3 rendered documents with different metadata
     doc1 = t.RenderedDocument(
         url=t.RelativeURL("/alpha.html"),
@@ -296,7 +646,8 @@ def test_create_category_items_sorting_and_caching() -> None:
         order="desc",
     )
 
-    result = create_category_items(category_list, docs)
+    index = CategoryIndex(docs)
+    result = index.get(category_list)
 
     # Check that only doc2 and doc1 appear, and in descending order
     assert isinstance(result, t.BuildCategoryList)
@@ -306,9 +657,53 @@ def test_create_category_items_sorting_and_caching() -> None:
     ]
 
     # Call again to ensure it's cached and returns same result
-    result_cached = create_category_items(category_list, docs)
+    result_cached = index.get(category_list)
     assert result is result_cached  # Identity check confirms caching
 
+    # Documents with timezones or without dates sort together with the rest
+    docs[t.BuildPath(Path("doc4.html"))] = t.RenderedDocument(
+        url=t.RelativeURL("/delta.html"),
+        html=t.HTML("<p>Delta</p>"),
+        metadata=t.DocumentMetadata(
+            title=t.Title("Delta"),
+            template=Path("default.html"),
+            created_datetime=dt.datetime(2024, 1, 15, tzinfo=dt.UTC),
+            categories=[t.Category("blog")],
+        ),
+    )
+    docs[t.BuildPath(Path("doc5.html"))] = t.RenderedDocument(
+        url=t.RelativeURL("/epsilon.html"),
+        html=t.HTML("<p>Epsilon</p>"),
+        metadata=t.DocumentMetadata(
+            title=t.Title("Epsilon"),
+            template=Path("default.html"),
+            categories=[t.Category("blog")],
+        ),
+    )
+    assert [
+        doc.metadata.title for doc in CategoryIndex(docs).get(category_list).items
+    ] == [t.Title("Beta"), t.Title("Delta"), t.Title("Alpha"), t.Title("Epsilon")]
+    del docs[t.BuildPath(Path("doc4.html"))]
+    del docs[t.BuildPath(Path("doc5.html"))]
+
+    # A new index for other docs does not serve the stale list
+    del docs[t.BuildPath(Path("doc2.html"))]
+    assert [
+        doc.metadata.title for doc in CategoryIndex(docs).get(category_list).items
+    ] == [
+        t.Title("Alpha"),
+    ]
+    assert (
+        list(
+            CategoryIndex(docs)
+            .get(
+                t.CategoryList(name=t.Category("missing")),
+            )
+            .items
+        )
+        == []
+    )
+
 
 @pytest.mark.parametrize("dry_run", [True, False], ids=["dry_run", "not_dry_run"])
 def test_build(tmp_path: Path, dry_run: bool) -> None:
@@ -360,3 +755,577 @@ def test_build(tmp_path: Path, dry_run: bool) -> None:
         assert not (cfg.mackerel.build_path / "document.html").exists()
         assert not (cfg.mackerel.build_path / "static.txt").exists()
         assert not (cfg.mackerel.build_path / "assets/asset.css").exists()
+
+
+def _incremental_site(tmp_path: Path) -> AppConfig:
+    """Create a small site with a category list page."""
+    cfg = AppConfig(
+        mackerel=MackerelConfig(
+            build_path=t.BuildPath(tmp_path / "build"),
+            content_path=t.ContentPath(tmp_path / "content"),
+            template_path=t.TemplatePath(tmp_path / "templates"),
+        ),
+    )
+    cfg.mackerel.content_path.mkdir(parents=True)
+    cfg.mackerel.template_path.mkdir(parents=True)
+    (cfg.mackerel.template_path / "page.html").write_text("{{ document.html }}")
+    (cfg.mackerel.content_path / "static.txt").write_text("static")
+    (cfg.mackerel.content_path / "index.md").write_text(
+        "---\ntitle: Index\ntemplate: page\n"
+        "category_lists:\n  - name: posts\n---\nIndex",
+    )
+    (cfg.mackerel.content_path / "post.md").write_text(
+        "---\ntitle: Post\ntemplate: page\ncategories: [posts]\n---\nPost",
+    )
+    (cfg.mackerel.content_path / "about.md").write_text(
+        "---\ntitle: About\ntemplate: page\n---\nAbout",
+    )
+    return cfg
+
+
+def _build_incremental(
+    cfg: AppConfig,
+    manifest: BuildManifest | None = None,
+    changes: set[Path] | None = None,
+) -> t.BuildResult:
+    return build(
+        cfg=cfg,
+        content_renderer=MockContentRenderer(),
+        metadata_parser=PythonFrontmatterParser(),
+        template_renderer=ListTemplateRenderer(),
+        manifest=manifest,
+        changes=changes,
+    )
+
+
+def test_build_incremental(tmp_path: Path) -> None:
+    """Test that a second build skips the unchanged files."""
+    cfg = _incremental_site(tmp_path)
+    build_path = cfg.mackerel.build_path
+
+    result = _build_incremental(cfg)
+    assert set(result.written) == {
+        build_path / "index.html",
+        build_path / "post.html",
+        build_path / "about.html",
+    }
+    assert result.copied == [build_path / "static.txt"]
+    assert (build_path / MANIFEST_NAME).exists()
+
+    result = _build_incremental(cfg)
+    assert result.written == []
+    assert result.copied == []
+
+
+def test_build_incremental_category_list(tmp_path: Path) -> None:
+    """Test that documents showing a changed category are written again."""
+    cfg = _incremental_site(tmp_path)
+    build_path = cfg.mackerel.build_path
+    _build_incremental(cfg)
+
+    post = cfg.mackerel.content_path / "post.md"
+    post.write_text(post.read_text().replace("Post", "Edited post"))
+    result = _build_incremental(cfg)
+    assert set(result.written) == {
+        build_path / "index.html",
+        build_path / "post.html",
+    }
+
+    post.unlink()
+    result = _build_incremental(cfg)
+    assert result.written == [build_path / "index.html"]
+
+
+def test_build_incremental_template_and_missing_output(tmp_path: Path) -> None:
+    """Test that template changes and missing outputs trigger writes."""
+    cfg = _incremental_site(tmp_path)
+    build_path = cfg.mackerel.build_path
+    _build_incremental(cfg)
+
+    (build_path / "about.html").unlink()
+    (build_path / "static.txt").unlink()
+    result = _build_incremental(cfg)
+    assert result.written == [build_path / "about.html"]
+    assert result.copied == [build_path / "static.txt"]
+
+    # Pages are rendered again, but not replaced when their content is the same
+    (cfg.mackerel.template_path / "page.html").write_text("{{ document.title }}")
+    with mock.patch.object(
+        ListTemplateRenderer,
+        "render",
+        autospec=True,
+        side_effect=ListTemplateRenderer.render,
+    ) as render:
+        result = _build_incremental(cfg)
+    assert render.call_count == 3
+    assert result.written == []
+
+
+def test_build_incremental_pagination(tmp_path: Path) -> None:
+    """Test that missing pages are written again and new pages are added."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    build_path = mcfg.build_path
+    index = mcfg.content_path / "index.md"
+    index.write_text(index.read_text().replace("posts", "posts\n    per_page: 1"))
+    _build_incremental(cfg)
+    assert not (build_path / "page").exists()
+
+    (mcfg.content_path / "post2.md").write_text(
+        "---\ntitle: Post 2\ntemplate: page\ncategories: [posts]\n---\nPost 2",
+    )
+    result = _build_incremental(cfg)
+    # The first page still shows the first post, only the new page changed
+    assert set(result.written) == {
+        build_path / "page" / "2.html",
+        build_path / "post2.html",
+    }
+    assert result.manifest is not None
+    assert result.manifest.documents["index.md"].pages == 2
+
+    (build_path / "page" / "2.html").unlink()
+    result = _build_incremental(cfg)
+    assert result.written == [build_path / "page" / "2.html"]
+
+
+def test_fingerprint_path() -> None:
+    """Test adding the content hash to asset names."""
+    digest = "0123456789abcdef"
+    assert fingerprint_path("assets/styles.css", digest) == (
+        "assets/styles.0123456789ab.css"
+    )
+    assert fingerprint_path("app.min.js", digest) == "app.min.0123456789ab.js"
+
+
+def test_build_fingerprint_assets(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that assets are fingerprinted and pages link to the new names."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    mcfg.fingerprint_assets = True
+    build_path = mcfg.build_path
+    (mcfg.template_path / "styles.css").write_text("body {}")
+    (mcfg.template_path / "page.html").write_text("{{ asset_url('styles.css') }}")
+
+    def build_site() -> t.BuildResult:
+        return build(
+            cfg=cfg,
+            content_renderer=MockContentRenderer(),
+            metadata_parser=PythonFrontmatterParser(),
+            template_renderer=Jinja2Renderer(
+                template_path=mcfg.template_path,
+                template_suffix=mcfg.template_suffix,
+                cfg=cfg.template_renderer,
+            ),
+        )
+
+    result = build_site()
+    (styles_path,) = build_path.glob("styles.*.css")
+    assert styles_path in result.copied
+    assert (build_path / "index.html").read_text() == f"/{styles_path.name}"
+    assert json.loads((build_path / ASSET_MANIFEST_NAME).read_text()) == {
+        "styles.css": styles_path.name,
+    }
+
+    # Unchanged assets keep their name without being hashed again
+    digests = mock.Mock(wraps=manifest_module.file_digest)
+    monkeypatch.setattr(manifest_module, "file_digest", digests)
+    result = build_site()
+    assert result.copied == result.written == []
+    digests.assert_not_called()
+
+    (mcfg.template_path / "styles.css").write_text("body { color: red; }")
+    result = build_site()
+    (new_styles_path,) = set(build_path.glob("styles.*.css")) - {styles_path}
+    assert result.copied == [new_styles_path]
+    assert len(result.written) == 3
+    assert (build_path / "index.html").read_text() == f"/{new_styles_path.name}"
+
+
+def test_build_precompress(tmp_path: Path) -> None:
+    """Test that only written and copied files get compressed copies."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    mcfg.precompress = True
+    build_path = mcfg.build_path
+    (mcfg.content_path / "static.txt").write_text("static " * 100)
+    result = _build_incremental(cfg)
+    assert result.compressed == [
+        build_path / f"static.txt{suffix}" for suffix in compressors()
+    ]
+    assert gzip.decompress((build_path / "static.txt.gz").read_bytes()) == (
+        b"static " * 100
+    )
+
+    result = _build_incremental(cfg)
+    assert result.compressed == []
+
+
+def test_build_changes(tmp_path: Path) -> None:
+    """Test that a build given the changed paths only checks those."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    manifest = _build_incremental(cfg).manifest
+
+    # Changes outside the given paths are not picked up
+    (mcfg.content_path / "about.md").write_text(
+        "---\ntitle: About\ntemplate: page\n---\nEdited about",
+    )
+    result = _build_incremental(cfg, manifest, set())
+    assert result == t.BuildResult(manifest=result.manifest)
+
+    post = mcfg.content_path / "post.md"
+    post.write_text(post.read_text().replace("Post", "Edited post"))
+    new = mcfg.content_path / "new.md"
+    new.write_text("---\ntitle: New\ntemplate: page\ncategories: [posts]\n---\nNew")
+    static = mcfg.content_path / "static.txt"
+    static.unlink()
+    result = _build_incremental(cfg, result.manifest, {post, new, static})
+    assert set(result.written) == {
+        mcfg.build_path / "index.html",
+        mcfg.build_path / "post.html",
+        mcfg.build_path / "new.html",
+    }
+    assert result.copied == []
+    assert result.manifest is not None
+    assert set(result.manifest.documents) == {
+        "index.md",
+        "post.md",
+        "new.md",
+        "about.md",
+    }
+    assert "static.txt" not in result.manifest.static
+
+
+def test_build_changes_full_discovery(tmp_path: Path) -> None:
+    """Test that unknown deleted paths fall back to a full discovery."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    manifest = _build_incremental(cfg).manifest
+
+    sub_path = mcfg.content_path / "sub"
+    sub_path.mkdir()
+    (sub_path / "page.md").write_text("---\ntitle: Sub\ntemplate: page\n---\nSub")
+    result = _build_incremental(cfg, manifest, {sub_path / "page.md"})
+    assert result.written == [mcfg.build_path / "sub" / "page.html"]
+
+    moved_path = mcfg.content_path / "moved"
+    sub_path.rename(moved_path)
+    result = _build_incremental(cfg, result.manifest, {sub_path, moved_path})
+    assert result.written == [mcfg.build_path / "moved" / "page.html"]
+
+
+def test_build_incremental_template_dependencies(tmp_path: Path) -> None:
+    """Test that only the documents depending on a changed template are written."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    (mcfg.template_path / "base.html").write_text("{% block body %}{% endblock %}")
+    (mcfg.template_path / "page.html").write_text(
+        '{% extends "base.html" %}{% block body %}{{ document.html }}{% endblock %}'
+    )
+    (mcfg.template_path / "about.html").write_text("{{ document.html }}")
+    about = mcfg.content_path / "about.md"
+    about.write_text(about.read_text().replace("template: page", "template: about"))
+
+    def build_site() -> t.BuildResult:
+        return build(
+            cfg=cfg,
+            content_renderer=MockContentRenderer(),
+            metadata_parser=PythonFrontmatterParser(),
+            template_renderer=Jinja2Renderer(
+                template_path=mcfg.template_path,
+                template_suffix=mcfg.template_suffix,
+                cfg=cfg.template_renderer,
+            ),
+        )
+
+    result = build_site()
+    assert result.manifest is not None
+    assert result.manifest.documents["post.md"].templates == ["base.html", "page.html"]
+
+    (mcfg.template_path / "base.html").write_text(
+        "<main>{% block body %}{% endblock %}"
+    )
+    result = build_site()
+    assert set(result.written) == {
+        mcfg.build_path / "index.html",
+        mcfg.build_path / "post.html",
+    }
+
+    (mcfg.template_path / "about.html").write_text(
+        '{% include "nav.html" ignore missing %}'
+    )
+    result = build_site()
+    assert result.written == [mcfg.build_path / "about.html"]
+
+    # Adding a missing template renders the documents looking for it again
+    (mcfg.template_path / "nav.html").write_text("<nav></nav>")
+    result = build_site()
+    assert result.written == [mcfg.build_path / "about.html"]
+    assert (mcfg.build_path / "about.html").read_text() == "<nav></nav>"
+
+
+def test_build_not_incremental(tmp_path: Path) -> None:
+    """Test that a non incremental build renders all files again."""
+    cfg = _incremental_site(tmp_path)
+    _build_incremental(cfg)
+    template_renderer = MockTemplateRenderer()
+    with mock.patch.object(
+        template_renderer, "render", wraps=template_renderer.render
+    ) as render:
+        result = build(
+            cfg=cfg,
+            content_renderer=MockContentRenderer(),
+            metadata_parser=PythonFrontmatterParser(),
+            template_renderer=template_renderer,
+            incremental=False,
+        )
+    assert render.call_count == 3
+    # The template renderer changed the output of every page
+    assert len(result.written) == 3
+    assert len(result.copied) == 1
+
+
+def test_build_parallel(tmp_path: Path) -> None:
+    """Test that a parallel build writes the same files as a serial one."""
+    outputs = []
+    for jobs in (1, 2):
+        cfg = _incremental_site(tmp_path / str(jobs))
+        cfg.mackerel.jobs = jobs
+        for i in range(10):
+            (cfg.mackerel.content_path / f"post{i}.md").write_text(
+                f"---\ntitle: Post {i}\ntemplate: page\ncategories: [posts]\n---\n{i}",
+            )
+        (cfg.mackerel.content_path / "broken.md").write_text("No frontmatter")
+        _build_incremental(cfg)
+        build_path = cfg.mackerel.build_path
+        outputs.append(
+            {
+                f.relative_to(build_path): f.read_bytes()
+                for f in sorted(build_path.rglob("*.html"))
+            },
+        )
+    assert outputs[0] == outputs[1]
+    assert len(outputs[0]) == 13
+
+
+@pytest.mark.parametrize("render_cache_size", [0, 1024 * 1024], ids=["", "cached"])
+def test_build_minify(tmp_path: Path, render_cache_size: int) -> None:
+    """Test that pages and template stylesheets are minified."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    mcfg.minify = ["html", "css"]
+    mcfg.cache_path = tmp_path / "cache"
+    mcfg.render_cache_size = render_cache_size
+    build_path = mcfg.build_path
+    (mcfg.template_path / "page.html").write_text(
+        "<div>\n    <p>  {{ document.metadata.title }}  </p>\n</div>\n",
+    )
+    (mcfg.template_path / "styles.css").write_text("a {\n  color: red;\n}\n")
+    (mcfg.template_path / "script.js").write_text("a  =  1\n")
+
+    content_renderer: t.ContentRenderer = MockContentRenderer()
+    if render_cache_size:
+        cache = RenderCache(mcfg.cache_path / "renders.sqlite3", render_cache_size)
+        content_renderer = CachedContentRenderer(content_renderer, cache)
+
+    def build_site() -> t.BuildResult:
+        return build(
+            cfg=cfg,
+            content_renderer=content_renderer,
+            metadata_parser=PythonFrontmatterParser(),
+            template_renderer=Jinja2Renderer(
+                template_path=mcfg.template_path,
+                template_suffix=mcfg.template_suffix,
+                cfg=cfg.template_renderer,
+            ),
+        )
+
+    result = build_site()
+    assert (build_path / "index.html").read_text() == "<div><p>Index</p></div>"
+    assert (build_path / "styles.css").read_text() == "a{color:red}"
+    assert (build_path / "script.js").read_text() == "a  =  1\n"
+    assert build_path / "styles.css" in result.copied
+
+    # Minified stylesheets are not copied again for their size
+    result = build_site()
+    assert result.copied == result.written == []
+    if isinstance(content_renderer, CachedContentRenderer):
+        # The stylesheet, the bodies of the mock renderer are not cached
+        assert content_renderer.cache.stats().entries == 1
+
+
+def test_build_ignored_files(tmp_path: Path) -> None:
+    """Test that ignored sources are neither copied nor rendered."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    build_path = mcfg.build_path
+    (mcfg.content_path / ".git").mkdir()
+    (mcfg.content_path / ".git" / "HEAD").write_text("ref: refs/heads/main")
+    (mcfg.content_path / "notes.md").write_text(
+        "---\ntitle: Notes\ntemplate: page\n---\nNotes",
+    )
+    (mcfg.content_path / IGNORE_FILE_NAME).write_text("notes.md\n")
+    (mcfg.template_path / "node_modules").mkdir()
+    (mcfg.template_path / "node_modules" / "pkg.js").write_text("pkg")
+
+    result = _build_incremental(cfg)
+    assert set(result.written) == {
+        build_path / "index.html",
+        build_path / "post.html",
+        build_path / "about.html",
+    }
+    assert result.copied == [build_path / "static.txt"]
+    assert result.manifest is not None
+    assert set(result.manifest.static) == {"static.txt"}
+    assert result.manifest.assets == {}
+
+    # Ignored paths changed in development are skipped, ignore files changes
+    # are picked up by walking the sources again
+    notes = mcfg.content_path / "notes.md"
+    result = _build_incremental(cfg, result.manifest, {notes})
+    assert result.written == result.copied == []
+    (mcfg.content_path / IGNORE_FILE_NAME).write_text("")
+    result = _build_incremental(
+        cfg, result.manifest, {mcfg.content_path / IGNORE_FILE_NAME}
+    )
+    assert build_path / "notes.html" in result.written
+
+
+def test_build_prunes_stale_outputs(tmp_path: Path) -> None:
+    """Test that outputs of removed sources are deleted, other files kept."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    build_path = mcfg.build_path
+    (mcfg.content_path / "docs").mkdir()
+    (mcfg.content_path / "docs" / "guide.md").write_text(
+        "---\ntitle: Guide\ntemplate: page\n---\nGuide",
+    )
+    result = _build_incremental(cfg)
+    assert result.manifest is not None
+    assert result.manifest.outputs == [
+        "about.html",
+        "docs/guide.html",
+        "index.html",
+        "post.html",
+        "static.txt",
+    ]
+    (build_path / "robots.txt").write_text("User-agent: *")
+
+    (mcfg.content_path / "docs" / "guide.md").unlink()
+    (mcfg.content_path / "docs").rmdir()
+    (mcfg.content_path / "about.md").rename(mcfg.content_path / "contact.md")
+    result = _build_incremental(cfg)
+    assert set(result.removed) == {
+        build_path / "about.html",
+        build_path / "docs" / "guide.html",
+    }
+    assert build_path / "contact.html" in result.written
+    assert not (build_path / "docs").exists()
+    assert (build_path / "robots.txt").exists()
+
+    # A build not reusing the manifest still prunes the recorded outputs
+    (mcfg.content_path / "contact.md").unlink()
+    result = build(
+        cfg=cfg,
+        content_renderer=MockContentRenderer(),
+        metadata_parser=PythonFrontmatterParser(),
+        template_renderer=ListTemplateRenderer(),
+        incremental=False,
+    )
+    assert result.removed == [build_path / "contact.html"]
+    assert sorted(p.name for p in build_path.iterdir()) == [
+        MANIFEST_NAME,
+        "index.html",
+        "post.html",
+        "robots.txt",
+        "static.txt",
+    ]
+
+
+def test_build_keeps_unchanged_pages(tmp_path: Path) -> None:
+    """Test that pages rendered with the same content are not replaced."""
+    cfg = _incremental_site(tmp_path)
+    build_path = cfg.mackerel.build_path
+    _build_incremental(cfg)
+    before = {
+        name: (build_path / name).stat()
+        for name in ("index.html", "post.html", "about.html")
+    }
+
+    post = cfg.mackerel.content_path / "post.md"
+    post.write_text(post.read_text().replace("Post", "Edited post"))
+    (cfg.mackerel.template_path / "page.html").write_text("{{ document.title }}")
+    result = _build_incremental(cfg)
+    assert set(result.written) == {build_path / "index.html", build_path / "post.html"}
+    after = (build_path / "about.html").stat()
+    assert (after.st_ino, after.st_mtime_ns) == (
+        before["about.html"].st_ino,
+        before["about.html"].st_mtime_ns,
+    )
+    assert not list(build_path.glob(".*.tmp"))
+
+
+def test_build_prunes_generated_outputs(tmp_path: Path) -> None:
+    """Test that old asset names, extra pages and compressed copies are pruned."""
+    cfg = _incremental_site(tmp_path)
+    mcfg = cfg.mackerel
+    mcfg.fingerprint_assets = True
+    mcfg.precompress = True
+    build_path = mcfg.build_path
+    index = mcfg.content_path / "index.md"
+    index.write_text(index.read_text().replace("posts", "posts\n    per_page: 1"))
+    (mcfg.content_path / "post2.md").write_text(
+        "---\ntitle: Post 2\ntemplate: page\ncategories: [posts]\n---\n"
+        + "Post 2 " * 100,
+    )
+    styles = mcfg.template_path / "styles.css"
+    styles.write_text("body {}")
+    result = _build_incremental(cfg)
+    (old_styles,) = build_path.glob("styles.*.css")
+    assert (build_path / "page" / "2.html").exists()
+    assert result.manifest is not None
+    assert "post2.html.gz" in result.manifest.outputs
+
+    styles.write_text("body { color: red; }")
+    (mcfg.content_path / "post2.md").unlink()
+    result = _build_incremental(cfg)
+    assert set(result.removed) == {
+        old_styles,
+        build_path / "page" / "2.html",
+        build_path / "post2.html",
+        *(
+            build_path / f"{name}{suffix}"
+            for name in ("page/2.html", "post2.html")
+            for suffix in compressors()
+        ),
+    }
+    assert not (build_path / "page").exists()
+
+    # Turning an option off prunes what it generated
+    mcfg.fingerprint_assets = False
+    result = _build_incremental(cfg)
+    assert build_path / ASSET_MANIFEST_NAME in result.removed
+    assert (build_path / "styles.css").exists()
+
+
+def test_prune_outputs(tmp_path: Path) -> None:
+    """Test that only paths inside the build path are removed."""
+    build_path = t.BuildPath(tmp_path / "build")
+    (build_path / "a" / "b").mkdir(parents=True)
+    (build_path / "a" / "b" / "page.html").write_text("page")
+    (build_path / "a" / "kept.html").write_text("kept")
+    (tmp_path / "outside.html").write_text("outside")
+
+    assert prune_outputs(build_path, ["a/b/page.html"], dry_run=True) == [
+        build_path / "a" / "b" / "page.html",
+    ]
+    assert (build_path / "a" / "b" / "page.html").exists()
+
+    removed = prune_outputs(build_path, ["a/b/page.html", "../outside.html"])
+    assert removed == [build_path / "a" / "b" / "page.html"]
+    assert not (build_path / "a" / "b").exists()
+    assert (build_path / "a" / "kept.html").exists()
+    assert (tmp_path / "outside.html").exists()
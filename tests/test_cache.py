@@ -0,0 +1,148 @@
+"""Test cases for the render cache."""
+
+import pickle
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from mackerel import types as t
+from mackerel.cache import FLUSH_HITS
+from mackerel.cache import CachedContentRenderer
+from mackerel.cache import CacheStats
+from mackerel.cache import RenderCache
+
+
+class CountingRenderer(t.ContentRenderer):
+    """A content renderer counting its renders."""
+
+    def __init__(self, key: str | None = "counting") -> None:
+        """Initialize with the cache key to report."""
+        self.key = key
+        self.renders = 0
+
+    def cache_key(self) -> str | None:
+        """Return the configured cache key."""
+        return self.key
+
+    def render(self, raw: str) -> t.HTML:
+        """Render the raw content as a paragraph."""
+        self.renders += 1
+        return t.HTML(f"<p>{raw}</p>")
+
+
+def test_render_cache_get_put(tmp_path: Path) -> None:
+    """Test storing and loading entries across connections."""
+    cache = RenderCache(tmp_path / "cache" / "renders.sqlite3", max_size=1024)
+    assert cache.get("key") is None
+    cache.put("key", "<p>html</p>")
+    assert cache.get("key") == "<p>html</p>"
+    cache.close()
+
+    cache = pickle.loads(pickle.dumps(cache))  # noqa: S301
+    assert cache.get("key") == "<p>html</p>"
+    assert cache.stats() == CacheStats(
+        path=tmp_path / "cache" / "renders.sqlite3",
+        entries=1,
+        size=11,
+        max_size=1024,
+    )
+    cache.clear()
+    assert cache.stats().entries == 0
+
+
+def test_render_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    """Test that the least recently used entries are evicted when full."""
+    cache = RenderCache(tmp_path / "renders.sqlite3", max_size=30)
+    cache.put("first", "a" * 10)
+    cache.put("second", "b" * 10)
+    cache.put("third", "c" * 10)
+    assert cache.get("first") == "a" * 10
+    cache.put("fourth", "d" * 10)
+    assert cache.get("second") is None
+    assert cache.get("third") is None
+    assert cache.get("first") == "a" * 10
+    assert cache.get("fourth") == "d" * 10
+
+    cache.put("too_big", "e" * 31)
+    assert cache.get("too_big") is None
+
+
+def _accessed(path: Path) -> dict[str, int]:
+    with sqlite3.connect(path) as db:
+        return dict(db.execute("SELECT key, accessed FROM renders"))
+
+
+def test_render_cache_batches_hits(tmp_path: Path) -> None:
+    """Test that the access times of hits are written in batches."""
+    path = tmp_path / "renders.sqlite3"
+    cache = RenderCache(path, max_size=1024)
+    cache.put("first", "a")
+    cache.put("second", "b")
+    assert _accessed(path) == {"first": 1, "second": 2}
+
+    assert cache.get("first") == "a"
+    assert _accessed(path) == {"first": 1, "second": 2}
+    cache.close()
+    assert _accessed(path) == {"first": 3, "second": 2}
+
+    keys = [f"key{i}" for i in range(FLUSH_HITS)]
+    for key in keys:
+        cache.put(key, "c")
+    for key in keys[:-1]:
+        cache.get(key)
+    assert _accessed(path)[keys[0]] == 4
+    cache.get(keys[-1])
+    assert _accessed(path)[keys[0]] == FLUSH_HITS + 4
+    cache.close()
+
+
+def _get_in_worker(cache: RenderCache) -> str | None:
+    return cache.get("key")
+
+
+def test_render_cache_flushes_hits_in_workers(tmp_path: Path) -> None:
+    """Test that the hits of a worker process are written when it exits."""
+    path = tmp_path / "renders.sqlite3"
+    cache = RenderCache(path, max_size=1024)
+    cache.put("key", "html")
+    cache.put("other", "html")
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(_get_in_worker, cache).result() == "html"
+    assert _accessed(path) == {"key": 3, "other": 2}
+    cache.close()
+
+
+def test_render_cache_threads(tmp_path: Path) -> None:
+    """Test that the threads of a process share the connection."""
+    cache = RenderCache(tmp_path / "renders.sqlite3", max_size=1024)
+    cache.put("key", "html")
+
+    def put_and_get(i: int) -> str | None:
+        cache.put(f"key{i}", "html")
+        return cache.get("key")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert set(executor.map(put_and_get, range(16))) == {"html"}
+    assert cache.stats().entries == 17
+    cache.close()
+
+
+def test_cached_content_renderer(tmp_path: Path) -> None:
+    """Test that bodies are rendered once per renderer key."""
+    cache = RenderCache(tmp_path / "renders.sqlite3", max_size=1024)
+    renderer = CountingRenderer()
+    cached = CachedContentRenderer(renderer, cache)
+    assert cached.render("one") == "<p>one</p>"
+    assert cached.render("one") == "<p>one</p>"
+    assert cached.render("two") == "<p>two</p>"
+    assert renderer.renders == 2
+
+    other = CountingRenderer(key="other")
+    assert CachedContentRenderer(other, cache).render("one") == "<p>one</p>"
+    assert other.renders == 1
+
+    uncached = CountingRenderer(key=None)
+    CachedContentRenderer(uncached, cache).render("one")
+    CachedContentRenderer(uncached, cache).render("one")
+    assert uncached.renders == 2
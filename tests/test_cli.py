@@ -1,6 +1,9 @@
 """Test cases for the CLI commands."""
 
+import json
 import shutil
+import subprocess
+import sys
 from pathlib import Path
 from unittest import mock
 
@@ -9,7 +12,6 @@ from click.testing import CliRunner
 
 import mackerel
 from mackerel.cli import cli
-from mackerel.cli import run_server
 
 
 @pytest.fixture(scope="module")
@@ -33,7 +35,9 @@ def test_help(runner: CliRunner) -> None:
         "  --help         Show this message and exit.\n"
         "\n"
         "Commands:\n"
+        "  bench    Benchmark building a synthetic site.\n"
         "  build    Build the static site.\n"
+        "  cache    Inspect or clear the rendered content cache.\n"
         "  develop  Runs a local development server.\n"
         "  init     Create an new mackerel site.\n"
     )
@@ -63,6 +67,31 @@ def test_init(runner: CliRunner, tmp_path: Path) -> None:
     assert "page.html" in template_files
 
 
+@pytest.mark.parametrize(
+    "args",
+    [["--help"], ["--version"], ["init", "my_site"]],
+    ids=["help", "version", "init"],
+)
+def test_startup_imports(tmp_path: Path, args: list[str]) -> None:
+    """Test that light commands do not import the renderers and the build."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-m", "mackerel.cli", *args],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported = {
+        line.rsplit("|", 1)[1].strip().split(".")[0]
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    assert imported.isdisjoint(
+        {"dateutil", "frontmatter", "jinja2", "markdown", "watchfiles", "yaml"},
+    )
+    assert ("tomli_w" in imported) == (args[0] == "init")
+
+
 def test_init_file_exists_error(runner: CliRunner, tmp_path: Path) -> None:
     """Test the init command with an existing directory."""
     result = runner.invoke(cli, ["init", str(tmp_path)])
@@ -94,6 +123,47 @@ def test_build(
     )
 
 
+def test_build_dry_run(
+    runner: CliRunner,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that a dry run does not write the render and bytecode caches."""
+    example_site = Path(__file__).parent / "site"
+    site_path = tmp_path / "my_site"
+    shutil.copytree(example_site, site_path)
+    monkeypatch.chdir(site_path)
+    result = runner.invoke(cli, ["build", "--dry-run"], input="y\n")
+    assert result.exit_code == 0
+    assert not (site_path / ".mackerel-cache").exists()
+
+
+def test_cache_stats_and_clear(
+    runner: CliRunner,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test the cache commands after a build filled the render cache."""
+    example_site = Path(__file__).parent / "site"
+    site_path = tmp_path / "my_site"
+    shutil.copytree(example_site, site_path)
+    monkeypatch.chdir(site_path)
+    runner.invoke(cli, ["build"], input="y\n")
+
+    result = runner.invoke(cli, ["cache", "stats"])
+    assert result.exit_code == 0
+    assert f"Path: {site_path / '.mackerel-cache' / 'renders.sqlite3'}" in result.output
+    assert "Entries: 0" not in result.output
+
+    assert (site_path / ".mackerel-cache" / "jinja2").exists()
+    result = runner.invoke(cli, ["cache", "clear"])
+    assert result.exit_code == 0
+    assert not (site_path / ".mackerel-cache" / "jinja2").exists()
+    assert "Mackerel cache cleared." in result.output
+    result = runner.invoke(cli, ["cache", "stats"])
+    assert "Entries: 0\nSize: 0.0 MiB of 64.0 MiB\n" in result.output
+
+
 def test_build_custom_config(
     runner: CliRunner,
     tmp_path: Path,
@@ -153,6 +223,117 @@ def test_build_auto_yes(
     assert "Mackerel build finished." in result.output
 
 
+def test_build_jobs(
+    runner: CliRunner,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test the build command with multiple jobs."""
+    example_site = Path(__file__).parent / "site"
+    site_path = tmp_path / "my_site"
+    shutil.copytree(example_site, site_path)
+
+    monkeypatch.chdir(site_path)
+    result = runner.invoke(cli, ["build", "--yes", "--jobs", "2"])
+    assert result.exit_code == 0
+    assert "Mackerel build finished." in result.output
+    assert (site_path / "_build" / "document.html").exists()
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"], ids=["serial", "parallel"])
+def test_build_profile(
+    runner: CliRunner,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    jobs: str,
+) -> None:
+    """Test the build command reporting timings and writing a trace."""
+    example_site = Path(__file__).parent / "site"
+    site_path = tmp_path / "my_site"
+    shutil.copytree(example_site, site_path)
+
+    monkeypatch.chdir(site_path)
+    trace_path = tmp_path / "trace.json"
+    result = runner.invoke(
+        cli,
+        [
+            "build",
+            "--yes",
+            "--jobs",
+            jobs,
+            "--profile-top",
+            "1",
+            "--trace",
+            str(trace_path),
+        ],
+    )
+    assert result.exit_code == 0
+    assert "Phases:" in result.output
+    assert "read_documents" in result.output
+    assert "Slowest documents (top 1):" in result.output
+    assert "/document.html" in result.output
+    assert "Slowest templates (top 1):" in result.output
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert {event["name"] for event in events} >= {
+        "discover",
+        "read_document /document.html",
+        "write_document /document.html",
+    }
+
+
+def test_bench(runner: CliRunner, tmp_path: Path) -> None:
+    """Test benchmarking a synthetic site and comparing the results."""
+    output_path = tmp_path / "results.json"
+    args = ["bench", "--docs", "2", "--static-files", "1", "--repeat", "1"]
+    result = runner.invoke(cli, [*args, "--no-memory", "--output", str(output_path)])
+    assert result.exit_code == 0
+    assert "develop_rebuild" in result.output
+    assert json.loads(output_path.read_text())["spec"]["docs"] == 2
+
+    result = runner.invoke(
+        cli,
+        [*args, "--compare", str(output_path), "--site-path", str(tmp_path / "site")],
+    )
+    assert result.exit_code == 0
+    assert "x baseline" in result.output
+    assert "peak_memory" in result.output
+    assert (tmp_path / "site" / "mackerelconfig.toml").exists()
+
+    result = runner.invoke(cli, [*args, "--categories-per-doc", "9"])
+    assert result.exit_code == 2
+    assert "Invalid categories per doc: 9" in result.output
+
+
+def test_build_metadata_parser(
+    runner: CliRunner,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test the build command with a metadata parser selected in the config."""
+    example_site = Path(__file__).parent / "site"
+    site_path = tmp_path / "my_site"
+    shutil.copytree(example_site, site_path)
+    config_path = site_path / "mackerelconfig.toml"
+    config_path.write_text(
+        config_path.read_text().replace(
+            "[mackerel]\n",
+            '[mackerel]\nmetadata_parser = "FastFrontmatterParser"\n',
+        ),
+    )
+
+    monkeypatch.chdir(site_path)
+    result = runner.invoke(cli, ["build", "--yes"])
+    assert result.exit_code == 0
+    assert (site_path / "_build" / "document.html").exists()
+
+    config_path.write_text(
+        config_path.read_text().replace("FastFrontmatterParser", "Unknown"),
+    )
+    result = runner.invoke(cli, ["build", "--yes"])
+    assert result.exit_code != 0
+    assert "Unknown metadata parser: 'Unknown'" in result.output
+
+
 def test_build_no_config_error(
     runner: CliRunner,
     tmp_path: Path,
@@ -190,29 +371,12 @@ def test_develop(
     site_path = tmp_path / "my_site"
     shutil.copytree(example_site, site_path)
     monkeypatch.chdir(site_path)
-    with mock.patch("mackerel.cli.run_process") as watcher:
-        result = runner.invoke(cli, ["develop", "-h 0.0.0.0", "-p 8080"])
+    with mock.patch("mackerel.develop.run_server") as server:
+        result = runner.invoke(cli, ["develop", "-h", "0.0.0.0", "-p", "8080"])  # noqa: S104
     assert result.exit_code == 0
-    watcher.assert_called_once()
-
-
-def test_run_server(
-    tmp_path: Path,
-    monkeypatch: pytest.MonkeyPatch,
-    capsys: pytest.CaptureFixture[str],
-) -> None:
-    """Test the run_server function directly."""
-    example_site = Path(__file__).parent / "site"
-    site_path = tmp_path / "my_site"
-    shutil.copytree(example_site, site_path)
-    monkeypatch.chdir(site_path)
-    with mock.patch("mackerel.cli.http.server") as server:
-        run_server(
-            host="127.0.0.42",
-            port=8080,
-            config_path=site_path / "mackerelconfig.toml",
-            verbose=False,
-        )
-    captured = capsys.readouterr()
-    assert "Serving mackerel at http://127.0.0.42:8080" in captured.out
-    server.ThreadingHTTPServer.assert_called_once()
+    server.assert_called_once_with(
+        "0.0.0.0",  # noqa: S104
+        8080,
+        site_path / "mackerelconfig.toml",
+        False,
+    )
@@ -0,0 +1,55 @@
+"""Test cases for the precompressed copies of the build outputs."""
+
+import gzip
+import os
+from pathlib import Path
+
+import pytest
+
+from mackerel import compress
+from mackerel.compress import MIN_COMPRESS_SIZE
+from mackerel.compress import compress_file
+from mackerel.compress import compress_files
+from mackerel.compress import compressors
+
+
+def test_compress_file(tmp_path: Path) -> None:
+    """Test that a gzip copy with the same mtime is written next to a file."""
+    path = tmp_path / "page.html"
+    data = b"<p>Hello</p>" * 100
+    path.write_bytes(data)
+    os.utime(path, ns=(1_000_000_000, 2_000_000_000))
+    written = compress_file(path, {".gz": gzip.compress})
+    assert written == [tmp_path / "page.html.gz"]
+    assert gzip.decompress(written[0].read_bytes()) == data
+    assert written[0].stat().st_mtime_ns == 2_000_000_000
+
+
+@pytest.mark.parametrize(
+    ("name", "size"),
+    [("image.png", 1000), ("font.woff2", 1000), ("small.css", MIN_COMPRESS_SIZE - 1)],
+    ids=["png", "woff2", "small"],
+)
+def test_compress_file_skipped(tmp_path: Path, name: str, size: int) -> None:
+    """Test that compressed formats and small files are not compressed."""
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    assert compress_file(path, compressors()) == []
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_compressors_without_brotli(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that only gzip copies are written without the brotli module."""
+    monkeypatch.setattr(compress, "_brotli", None)
+    assert list(compressors()) == [".gz"]
+
+
+def test_compress_files(tmp_path: Path) -> None:
+    """Test compressing several files on the thread pool."""
+    paths = [tmp_path / f"{i}.css" for i in range(3)]
+    for path in paths:
+        path.write_text("body { color: red; }\n" * 50)
+    written = compress_files(paths)
+    assert sorted(written) == sorted(
+        path.with_name(path.name + suffix) for path in paths for suffix in compressors()
+    )
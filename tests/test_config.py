@@ -27,6 +27,15 @@ def test_mackerel_config_defaults() -> None:
         "template_suffix": ".html",
         "content_renderer": "MarkdownRenderer",
         "template_renderer": "Jinja2Renderer",
+        "metadata_parser": "PythonFrontmatterParser",
+        "jobs": 1,
+        "static_copy_mode": "copy",
+        "fingerprint_assets": False,
+        "precompress": False,
+        "ignore": [".git", "node_modules"],
+        "minify": [],
+        "cache_path": Path(".mackerel-cache"),
+        "render_cache_size": 64 * 1024 * 1024,
     }
 
 
@@ -48,12 +57,37 @@ def test_mackerel_config_validation(
         partial(config.MackerelConfig, **{field: value})()
 
 
+def test_mackerel_config_jobs_validation() -> None:
+    """Test MackerelConfig jobs validation."""
+    with pytest.raises(ValueError, match="Invalid number of jobs: 0"):
+        config.MackerelConfig(jobs=0)
+
+
+def test_mackerel_config_render_cache_size_validation() -> None:
+    """Test MackerelConfig render cache size validation."""
+    with pytest.raises(ValueError, match="Invalid render cache size: -1"):
+        config.MackerelConfig(render_cache_size=-1)
+
+
+def test_mackerel_config_minify_validation() -> None:
+    """Test that only HTML and CSS outputs can be minified."""
+    with pytest.raises(ValueError, match="Invalid minify output type: 'js'"):
+        config.MackerelConfig(minify=["js"])  # type: ignore[list-item]
+
+
+def test_mackerel_config_static_copy_mode_validation() -> None:
+    """Test MackerelConfig static copy mode validation."""
+    with pytest.raises(ValueError, match="Invalid static copy mode: 'symlink'"):
+        config.MackerelConfig(static_copy_mode="symlink")  # type: ignore[arg-type]
+
+
 def test_jinja2_renderer_config_defaults() -> None:
     """Test the default settings of Jinja2RendererConfig."""
     cfg = asdict(config.Jinja2RendererConfig())
     assert cfg == {
         "trim_blocks": True,
         "lstrip_blocks": True,
+        "bytecode_cache": True,
     }
 
 
@@ -62,7 +96,7 @@ def test_markdown_renderer_config_defaults() -> None:
     cfg = asdict(config.MarkdownRendererConfig())
     assert cfg == {
         "output_format": "html",
-        "extensions": ["markdown.extensions.meta", "markdown.extensions.extra"],
+        "extensions": ["markdown.extensions.extra"],
     }
 
 
@@ -81,21 +115,34 @@ def test_app_config_to_dict() -> None:
     """Test converting AppConfig to dictionary."""
     cfg = config.AppConfig().to_dict()
     assert cfg == {
-        "Jinja2Renderer": {"lstrip_blocks": True, "trim_blocks": True},
+        "Jinja2Renderer": {
+            "bytecode_cache": True,
+            "lstrip_blocks": True,
+            "trim_blocks": True,
+        },
         "MarkdownRenderer": {
-            "extensions": ["markdown.extensions.meta", "markdown.extensions.extra"],
+            "extensions": ["markdown.extensions.extra"],
             "output_format": "html",
         },
         "mackerel": {
             "build_path": "_build",
             "build_suffix": ".html",
+            "cache_path": ".mackerel-cache",
             "content_path": "content",
             "content_renderer": "MarkdownRenderer",
             "doc_suffix": ".md",
+            "fingerprint_assets": False,
+            "jobs": 1,
+            "metadata_parser": "PythonFrontmatterParser",
+            "ignore": [".git", "node_modules"],
+            "minify": [],
             "navigation": [
                 {"children": [], "label": "Home", "url": "/"},
                 {"children": [], "label": "mackerel", "url": "https://mackerel.sh"},
             ],
+            "precompress": False,
+            "render_cache_size": 64 * 1024 * 1024,
+            "static_copy_mode": "copy",
             "template_path": "templates/starter",
             "template_renderer": "Jinja2Renderer",
             "template_suffix": ".html",
@@ -172,6 +219,7 @@ def test_load_config_no_file(tmp_path: Path) -> None:
     assert cfg.mackerel.build_path == tmp_path / "_build"
     assert cfg.mackerel.content_path == tmp_path / "content"
     assert cfg.mackerel.template_path == tmp_path / "templates/starter"
+    assert cfg.mackerel.cache_path == tmp_path / ".mackerel-cache"
 
 
 def test_load_config_paths_exist(tmp_path: Path) -> None:
@@ -0,0 +1,145 @@
+"""Test cases for the development server."""
+
+import shutil
+import subprocess
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from watchfiles import Change
+
+from mackerel.develop import DevelopSite
+from mackerel.develop import run_server
+from mackerel.manifest import MANIFEST_NAME
+
+
+def test_run_server(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test the run_server function directly."""
+    example_site = Path(__file__).parent / "site"
+    site_path = tmp_path / "my_site"
+    shutil.copytree(example_site, site_path)
+    monkeypatch.chdir(site_path)
+    with (
+        mock.patch("mackerel.develop.http.server") as server,
+        mock.patch("mackerel.develop.watch", return_value=[]) as watcher,
+    ):
+        run_server(
+            host="127.0.0.42",
+            port=8080,
+            config_path=site_path / "mackerelconfig.toml",
+            verbose=False,
+        )
+    captured = capsys.readouterr()
+    assert "Serving mackerel at http://127.0.0.42:8080" in captured.out
+    server.ThreadingHTTPServer.assert_called_once()
+    watcher.assert_called_once()
+    assert (site_path / "_build" / MANIFEST_NAME).exists()
+
+
+def test_run_server_rebuilds_changes(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that the server rebuilds only the changed documents."""
+    example_site = Path(__file__).parent / "site"
+    site_path = tmp_path / "my_site"
+    shutil.copytree(example_site, site_path)
+    monkeypatch.chdir(site_path)
+    doc = site_path / "content" / "document.md"
+
+    def changes() -> Iterator[set[tuple[Change, str]]]:
+        doc.write_text(doc.read_text() + "\nEdited about page.")
+        yield {(Change.modified, str(doc))}
+
+    with (
+        mock.patch("mackerel.develop.http.server"),
+        mock.patch("mackerel.develop.watch", return_value=changes()),
+    ):
+        run_server(
+            host="127.0.0.42",
+            port=8080,
+            config_path=site_path / "mackerelconfig.toml",
+            verbose=False,
+        )
+    captured = capsys.readouterr()
+    assert "Rebuilt 1 documents, copied 0 files." in captured.out
+    assert "Edited about page." in (site_path / "_build" / "document.html").read_text()
+
+
+def test_run_server_watches_reloaded_paths(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that the paths of a reloaded config are watched and served."""
+    example_site = Path(__file__).parent / "site"
+    site_path = tmp_path / "my_site"
+    shutil.copytree(example_site, site_path)
+    monkeypatch.chdir(site_path)
+    config_path = site_path / "mackerelconfig.toml"
+
+    def changes() -> Iterator[set[tuple[Change, str]]]:
+        config_path.write_text(
+            config_path.read_text().replace('"_build"', '"_public"'),
+        )
+        yield {(Change.modified, str(config_path))}
+
+    with (
+        mock.patch("mackerel.develop.http.server") as server,
+        mock.patch("mackerel.develop.watch", side_effect=[changes(), []]) as watcher,
+    ):
+        run_server(
+            host="127.0.0.42",
+            port=8080,
+            config_path=config_path,
+            verbose=False,
+        )
+    assert watcher.call_count == 2
+    watch_filter = watcher.call_args.kwargs["watch_filter"]
+    assert not watch_filter(Change.added, str(site_path / "_public" / "a.html"))
+    assert watch_filter(Change.added, str(site_path / "_build" / "a.html"))
+    handler = server.ThreadingHTTPServer.call_args.args[1]
+    with mock.patch("mackerel.develop.LiveReloadHandler") as handler_class:
+        handler("request", "address", "server")
+    assert handler_class.call_args.kwargs["directory"] == site_path / "_public"
+    assert (site_path / "_public" / "document.html").exists()
+
+
+def test_develop_site_rebuild_failure(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that a failed rebuild forgets the manifest of the last build."""
+    example_site = Path(__file__).parent / "site"
+    site_path = tmp_path / "my_site"
+    shutil.copytree(example_site, site_path)
+    monkeypatch.chdir(site_path)
+    site = DevelopSite(site_path / "mackerelconfig.toml")
+    site.rebuild()
+    assert site.manifest is not None
+
+    doc = site_path / "content" / "document.md"
+    with (
+        mock.patch("mackerel.develop.build", side_effect=RuntimeError),
+        pytest.raises(RuntimeError),
+    ):
+        site.rebuild({doc})
+    assert site.manifest is None
+
+
+def test_develop_does_not_import_cli() -> None:
+    """Test that the server imports its factories without the CLI module."""
+    subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            "-c",
+            "import sys, mackerel.develop; assert 'mackerel.cli' not in sys.modules",
+        ],
+        check=True,
+    )
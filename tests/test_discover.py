@@ -0,0 +1,99 @@
+"""Test cases for the discovery of the source files."""
+
+from pathlib import Path
+from pathlib import PurePosixPath
+
+import pytest
+
+from mackerel.discover import IGNORE_FILE_NAME
+from mackerel.discover import IgnorePattern
+from mackerel.discover import IgnoreRules
+from mackerel.discover import scan_files
+
+
+def _write(root: Path, *names: str) -> None:
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+
+
+def test_scan_files(tmp_path: Path) -> None:
+    """Test that files are found depth first in name order with their stat."""
+    _write(tmp_path, "b.md", "a/z.md", "a/b/c.md", "c.txt")
+    found = list(scan_files(tmp_path))
+    assert [path for path, _ in found] == [
+        str(tmp_path / name) for name in ("b.md", "c.txt", "a/z.md", "a/b/c.md")
+    ]
+    for path, st in found:
+        assert (st.st_size, st.st_mtime_ns) == (
+            Path(path).stat().st_size,
+            Path(path).stat().st_mtime_ns,
+        )
+
+
+def test_scan_files_missing_root(tmp_path: Path) -> None:
+    """Test that a missing directory has no files."""
+    assert list(scan_files(tmp_path / "missing")) == []
+
+
+def test_scan_files_symlinks(tmp_path: Path) -> None:
+    """Test that linked files are found but linked directories not walked."""
+    root = tmp_path / "root"
+    _write(tmp_path, "outside/file.txt", "target.txt")
+    root.mkdir()
+    (root / "file.txt").symlink_to(tmp_path / "target.txt")
+    (root / "dir").symlink_to(tmp_path / "outside", target_is_directory=True)
+    (root / "broken.txt").symlink_to(tmp_path / "missing.txt")
+    assert [path for path, _ in scan_files(root)] == [str(root / "file.txt")]
+
+
+def test_scan_files_ignored(tmp_path: Path) -> None:
+    """Test that ignored files and directories are skipped."""
+    _write(
+        tmp_path,
+        "index.md",
+        "draft.swp",
+        ".git/HEAD",
+        "posts/node_modules/pkg.js",
+        "posts/post.md",
+        "posts/drafts/draft.md",
+        "drafts/kept.md",
+        "build/out.html",
+        "posts/build",
+    )
+    (tmp_path / IGNORE_FILE_NAME).write_text(
+        "# Editor files\n*.swp\n\n/posts/drafts\nbuild/\n",
+    )
+    rules = IgnoreRules.load(tmp_path, [".git", "node_modules"])
+    assert [path for path, _ in scan_files(tmp_path, rules)] == [
+        str(tmp_path / name)
+        for name in ("index.md", "drafts/kept.md", "posts/build", "posts/post.md")
+    ]
+
+
+@pytest.mark.parametrize(
+    ("line", "pattern"),
+    [
+        ("", None),
+        ("  # comment", None),
+        ("*.swp", IgnorePattern("*.swp", anchored=False, directory_only=False)),
+        ("build/", IgnorePattern("build", anchored=False, directory_only=True)),
+        ("/drafts", IgnorePattern("drafts", anchored=True, directory_only=False)),
+        ("a/*.md", IgnorePattern("a/*.md", anchored=True, directory_only=False)),
+    ],
+)
+def test_ignore_pattern_parse(line: str, pattern: IgnorePattern | None) -> None:
+    """Test parsing the lines of an ignore file."""
+    assert IgnorePattern.parse(line) == pattern
+
+
+def test_ignore_rules_ignores_path(tmp_path: Path) -> None:
+    """Test that files in ignored directories are ignored."""
+    rules = IgnoreRules.load(tmp_path, ["node_modules", "/posts/drafts", "*.swp"])
+    assert rules.ignores_path(PurePosixPath("a/node_modules/pkg/index.js"))
+    assert rules.ignores_path(PurePosixPath("posts/drafts/draft.md"))
+    assert rules.ignores_path(PurePosixPath("posts/post.md.swp"))
+    assert rules.ignores_path(PurePosixPath(IGNORE_FILE_NAME))
+    assert not rules.ignores_path(PurePosixPath("drafts/posts/drafts.md"))
+    assert not rules.ignores_path(PurePosixPath("posts/post.md"))
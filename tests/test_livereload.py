@@ -0,0 +1,95 @@
+"""Test cases for the live reload of the development server."""
+
+import http.server
+import threading
+import urllib.request
+from collections.abc import Generator
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+from mackerel import types as t
+from mackerel.livereload import CLIENT_SCRIPT
+from mackerel.livereload import EVENTS_PATH
+from mackerel.livereload import LiveReloadHandler
+from mackerel.livereload import ReloadBroadcaster
+from mackerel.livereload import inject_script
+from mackerel.livereload import reload_event
+
+
+def test_inject_script() -> None:
+    """Test that the client script is inserted before the closing body tag."""
+    script = CLIENT_SCRIPT.encode()
+    assert inject_script(b"<html><BODY>Hi</BODY></html>") == (
+        b"<html><BODY>Hi" + script + b"</BODY></html>"
+    )
+    assert inject_script(b"<p>Hi</p>") == b"<p>Hi</p>" + script
+
+
+def test_reload_event(tmp_path: Path) -> None:
+    """Test the events created from a build result."""
+    build_path = t.BuildPath(tmp_path)
+    assert reload_event(t.BuildResult(), build_path) is None
+    assert reload_event(
+        t.BuildResult(copied=[t.BuildPath(tmp_path / "css" / "style.css")]),
+        build_path,
+    ) == ("css", ["/css/style.css"])
+    assert reload_event(
+        t.BuildResult(
+            written=[t.BuildPath(tmp_path / "index.html")],
+            copied=[t.BuildPath(tmp_path / "css" / "style.css")],
+        ),
+        build_path,
+    ) == ("reload", ["/css/style.css", "/index.html"])
+
+
+def test_broadcaster() -> None:
+    """Test that events reach the subscribers until they unsubscribe."""
+    broadcaster = ReloadBroadcaster()
+    with broadcaster.subscribe() as first, broadcaster.subscribe() as second:
+        broadcaster.publish(("reload", ["/index.html"]))
+        broadcaster.close()
+        assert first.get_nowait() == ("reload", ["/index.html"])
+        assert first.get_nowait() is None
+        assert second.get_nowait() == ("reload", ["/index.html"])
+    broadcaster.publish(("reload", ["/index.html"]))
+    assert first.empty()
+
+
+@pytest.fixture
+def server(
+    tmp_path: Path,
+) -> Generator[tuple[str, ReloadBroadcaster], None, None]:
+    """Serve a build directory with the live reload handler."""
+    (tmp_path / "index.html").write_text("<html><body>Index</body></html>")
+    (tmp_path / "style.css").write_text("body {}")
+    broadcaster = ReloadBroadcaster()
+    handler = partial(LiveReloadHandler, directory=tmp_path, broadcaster=broadcaster)
+    with http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler) as httpd:
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        host, port = httpd.server_address[:2]
+        yield f"http://{host!s}:{port}", broadcaster
+        broadcaster.close()
+        httpd.shutdown()
+
+
+def test_handler_injects_script(server: tuple[str, ReloadBroadcaster]) -> None:
+    """Test that HTML pages get the client script and other files do not."""
+    url, _ = server
+    with urllib.request.urlopen(f"{url}/") as response:  # noqa: S310
+        assert response.read() == inject_script(b"<html><body>Index</body></html>")
+    with urllib.request.urlopen(f"{url}/style.css") as response:  # noqa: S310
+        assert response.read() == b"body {}"
+
+
+def test_handler_sends_events(server: tuple[str, ReloadBroadcaster]) -> None:
+    """Test that published events are streamed to the page."""
+    url, broadcaster = server
+    with urllib.request.urlopen(f"{url}{EVENTS_PATH}") as response:  # noqa: S310
+        assert response.headers["Content-Type"] == "text/event-stream"
+        assert response.readline() == b": connected\n"
+        assert response.readline() == b"\n"
+        broadcaster.publish(("css", ["/style.css"]))
+        assert response.readline() == b"event: css\n"
+        assert response.readline() == b'data: {"urls": ["/style.css"]}\n'
@@ -0,0 +1,67 @@
+"""Tests for the manifest module."""
+
+from pathlib import Path
+
+from mackerel import types as t
+from mackerel.manifest import MANIFEST_NAME
+from mackerel.manifest import BuildManifest
+from mackerel.manifest import DocumentEntry
+from mackerel.manifest import FileEntry
+from mackerel.manifest import check_file
+from mackerel.manifest import file_digest
+from mackerel.manifest import load_manifest
+from mackerel.manifest import save_manifest
+
+
+def test_manifest_roundtrip(tmp_path: Path) -> None:
+    """Test saving and loading a manifest."""
+    build_path = t.BuildPath(tmp_path / "build")
+    manifest = BuildManifest(
+        fingerprint="abc",
+        static={"a.txt": FileEntry(digest="1", mtime_ns=2, size=3, output="a.txt")},
+        documents={
+            "doc.md": DocumentEntry(
+                digest="4",
+                mtime_ns=5,
+                size=6,
+                output="doc.html",
+                template="page",
+                categories=["posts"],
+                category_lists=["news"],
+            ),
+        },
+        outputs=["a.txt", "doc.html"],
+    )
+    save_manifest(manifest, build_path)
+    assert (build_path / MANIFEST_NAME).exists()
+    assert load_manifest(build_path) == manifest
+
+
+def test_load_manifest_missing_or_invalid(tmp_path: Path) -> None:
+    """Test that missing or unreadable manifests load as empty."""
+    build_path = t.BuildPath(tmp_path)
+    assert load_manifest(build_path) == BuildManifest()
+    (build_path / MANIFEST_NAME).write_text("{not json")
+    assert load_manifest(build_path) == BuildManifest()
+    (build_path / MANIFEST_NAME).write_text('{"version": 0}')
+    assert load_manifest(build_path) == BuildManifest()
+
+
+def test_check_file(tmp_path: Path) -> None:
+    """Test checking a file against its manifest entry."""
+    path = tmp_path / "file.txt"
+    path.write_text("content")
+
+    changed, entry = check_file(path, None)
+    assert changed
+    assert entry.digest == file_digest(path)
+    assert entry.size == len("content")
+
+    assert check_file(path, entry) == (False, entry)
+
+    # Same content with a different mtime is not a change
+    entry.mtime_ns -= 1
+    assert check_file(path, entry)[0] is False
+
+    path.write_text("new content")
+    assert check_file(path, entry)[0] is True
@@ -0,0 +1,130 @@
+"""Test cases for the HTML and CSS minifiers."""
+
+from collections.abc import Iterator
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from mackerel.cache import RenderCache
+from mackerel.config import AppConfig
+from mackerel.config import MackerelConfig
+from mackerel.minify import Minifier
+from mackerel.minify import create_minifier
+from mackerel.minify import minify_css
+from mackerel.minify import minify_html
+
+PAGE = """<!DOCTYPE html>
+<html>
+  <head>
+    <title> Page </title>
+    <!--[if IE]><link rel="stylesheet" href="ie.css"><![endif]-->
+  </head>
+  <body>
+    <!-- A comment -->
+    <p>Hello   <b>big</b>   <i>world</i>, 1 < 2</p>
+    <pre>  keep
+      this  </pre>
+    <a href="/"  title="a  b">link</a>
+    <script>if (a < b) { x = "</p>  "; }</script>
+  </body>
+</html>
+"""
+
+MINIFIED_PAGE = (
+    '<!DOCTYPE html><html><head><title>Page</title><!--[if IE]><link rel="stylesheet"'
+    ' href="ie.css"><![endif]--></head><body><p>Hello <b>big</b> <i>world</i>, 1 < 2'
+    '</p><pre>  keep\n      this  </pre><a href="/"  title="a  b">link</a>'
+    '<script>if (a < b) { x = "</p>  "; }</script></body></html>'
+)
+
+
+def test_minify_html() -> None:
+    """Test that whitespace and comments are removed outside of raw elements."""
+    assert "".join(minify_html([PAGE])) == MINIFIED_PAGE
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_minify_html_chunks(size: int) -> None:
+    """Test that tags and comments split across chunks are minified the same."""
+    chunks = [PAGE[i : i + size] for i in range(0, len(PAGE), size)]
+    assert "".join(minify_html(chunks)) == MINIFIED_PAGE
+
+
+def test_minify_html_unclosed() -> None:
+    """Test that unclosed comments and raw elements are kept until the end."""
+    assert "".join(minify_html(["<pre>  a", "  <"])) == "<pre>  a  <"
+    assert "".join(minify_html(["<p>a</p><!-- open"])) == "<p>a</p>"
+
+
+def test_minify_css() -> None:
+    """Test that whitespace, comments and last semicolons are removed."""
+    css = """/*! License */
+/* A comment */
+a:hover , b > c {
+    color: red ;
+    content: "a  ;  b";
+    margin: 0 auto;
+}
+@media screen and (max-width: 100px) {
+    a { width: calc(1px + 2px); }
+}
+"""
+    assert minify_css(css) == (
+        '/*! License */ a:hover,b>c{color:red;content:"a  ;  b";margin:0 auto}'
+        "@media screen and (max-width:100px){a{width:calc(1px + 2px)}}"
+    )
+
+
+def test_minify_css_descendant_pseudo_class() -> None:
+    """Test that the space of a descendant selector is kept before a colon."""
+    assert minify_css("a :hover { color: red }") == "a :hover{color:red}"
+
+
+def test_minifier_types() -> None:
+    """Test that only the configured output types are minified."""
+    minifier = Minifier(["css"])
+    chunks = ["<p>  a  </p>"]
+    assert minifier.html(chunks) is chunks
+    assert minifier.css("a { }") == "a{}"
+    assert Minifier(["html"]).css("a { }") is None
+
+
+def test_minifier_html_streams() -> None:
+    """Test that pages are minified chunk by chunk, even with a cache."""
+
+    def chunks() -> Iterator[str]:
+        yield "<p>  a  </p>"
+        msg = "Rendered past the first chunk"
+        raise RuntimeError(msg)
+
+    cache = mock.Mock(spec=RenderCache)
+    minifier = Minifier(["html"], cache)
+    assert next(iter(minifier.html(chunks()))) == "<p>a</p>"
+    cache.get.assert_not_called()
+
+
+def test_minifier_cache(tmp_path: Path) -> None:
+    """Test that minified stylesheets are cached by their content."""
+    cache = RenderCache(tmp_path / "cache.sqlite3", max_size=1024 * 1024)
+    minifier = Minifier(["css"], cache)
+    assert minifier.css("a { }") == "a{}"
+
+    with mock.patch("mackerel.minify.minify_css") as minify:
+        assert minifier.css("a { }") == "a{}"
+    minify.assert_not_called()
+
+
+def test_create_minifier(tmp_path: Path) -> None:
+    """Test that a minifier is only created when minification is configured."""
+    cache = RenderCache(tmp_path / "cache.sqlite3", max_size=1024 * 1024)
+    assert create_minifier(AppConfig(), cache) is None
+
+    cfg = AppConfig(mackerel=MackerelConfig(minify=["html"]))
+    minifier = create_minifier(cfg, cache)
+    assert minifier is not None
+    assert minifier.types == {"html"}
+    assert minifier.cache is cache
+    minifier = create_minifier(cfg)
+    assert minifier is not None
+    assert minifier.cache is None
@@ -1,10 +1,15 @@
 """Tests for the parsers module."""
 
+import datetime as dt
 import textwrap
 from pathlib import Path
 
+import pytest
+
 from mackerel import types as t
+from mackerel.parsers import FastFrontmatterParser
 from mackerel.parsers import PythonFrontmatterParser
+from mackerel.parsers import parse_datetime
 
 
 def test_python_frontmatter_parser() -> None:
@@ -24,6 +29,7 @@ def test_python_frontmatter_parser() -> None:
       - name: example
         sort_by: title
         order: asc
+        per_page: 10
     ---
 
     This is the content of the document.
@@ -33,12 +39,15 @@ def test_python_frontmatter_parser() -> None:
     assert metadata.template == Path("default")
     assert metadata.created_at == t.CreatedAt("2023-10-01 12:00:00")
     assert metadata.modified_at == t.ModifiedAt("2023-10-02 12:00:00")
+    assert metadata.created_datetime == dt.datetime(2023, 10, 1, 12, 0)  # noqa: DTZ001
+    assert metadata.modified_datetime == dt.datetime(2023, 10, 2, 12, 0)  # noqa: DTZ001
     assert metadata.categories == [t.Category("test"), t.Category("example")]
     assert metadata.category_lists == [
         t.CategoryList(
             name=t.Category("example"),
             sort_by="title",
             order="asc",
+            per_page=10,
         ),
     ]
     assert not metadata.draft
@@ -62,3 +71,136 @@ def test_python_frontmatter_parser_missing_fields() -> None:
     assert metadata.categories == []
     assert metadata.category_lists == []
     assert not metadata.draft
+
+
+def test_python_frontmatter_parser_split() -> None:
+    """Test splitting the frontmatter header from the body."""
+    parser = PythonFrontmatterParser()
+    raw = textwrap.dedent("""\
+    ---
+    title: Test Document
+    template: default
+    ---
+
+    Key: not metadata
+    """)
+    header, body = parser.split(raw)
+    assert header == "---\ntitle: Test Document\ntemplate: default\n---\n"
+    assert body == "Key: not metadata"
+    assert parser.parse(header).title == "Test Document"
+
+
+def test_python_frontmatter_parser_split_no_frontmatter() -> None:
+    """Test splitting a document without frontmatter."""
+    parser = PythonFrontmatterParser()
+    assert parser.split("Just content\n") == ("", "Just content")
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        textwrap.dedent("""\
+        ---
+        title: Test Document
+        template: default
+        created_at: 2023-10-01 12:00:00
+        categories: [test]
+        category_lists:
+          - name: test
+            sort_by: title
+        ---
+        """),
+        textwrap.dedent("""\
+        +++
+        title = "Test Document"
+        template = "default"
+        created_at = 2023-10-01 12:00:00
+        categories = ["test"]
+        category_lists = [{ name = "test", sort_by = "title" }]
+        +++
+        """),
+        textwrap.dedent("""\
+        ;;;
+        {
+          "title": "Test Document",
+          "template": "default",
+          "created_at": "2023-10-01 12:00:00",
+          "categories": ["test"],
+          "category_lists": [{"name": "test", "sort_by": "title"}]
+        }
+        ;;;
+        """),
+    ],
+    ids=["yaml", "toml", "json"],
+)
+def test_fast_frontmatter_parser(header: str) -> None:
+    """Test the FastFrontmatterParser with each frontmatter format."""
+    parser = FastFrontmatterParser()
+    raw = header + "\n# Heading\n\n---\n\nAfter a rule.\n"
+
+    header_part, body = parser.split(raw)
+    assert header_part == header.strip()
+    assert body == "# Heading\n\n---\n\nAfter a rule."
+
+    metadata = parser.parse(header_part)
+    assert metadata == t.DocumentMetadata(
+        title=t.Title("Test Document"),
+        template=Path("default"),
+        created_at=t.CreatedAt("2023-10-01 12:00:00"),
+        created_datetime=dt.datetime(2023, 10, 1, 12, 0),  # noqa: DTZ001
+        categories=[t.Category("test")],
+        category_lists=[t.CategoryList(name=t.Category("test"), sort_by="title")],
+    )
+
+
+def test_fast_frontmatter_parser_matches_python_frontmatter() -> None:
+    """Test that both parsers agree on YAML frontmatter."""
+    raw = textwrap.dedent("""\
+    ---
+    title: Test Document
+    template: default
+    created_at: 2023-10-01 12:00:00
+    modified_at: 2023-10-02
+    draft: true
+    excerpt: Short
+    categories:
+      - test
+    ---
+
+    Content.
+    """)
+    fast, python = FastFrontmatterParser(), PythonFrontmatterParser()
+    fast_header, fast_body = fast.split(raw)
+    python_header, python_body = python.split(raw)
+    assert fast_body == python_body
+    assert fast.parse(fast_header) == python.parse(python_header)
+
+
+def test_fast_frontmatter_parser_no_frontmatter() -> None:
+    """Test the FastFrontmatterParser without frontmatter."""
+    parser = FastFrontmatterParser()
+    assert parser.split("Just content\n") == ("", "Just content")
+    assert parser.split("---\nunterminated") == ("", "---\nunterminated")
+    with pytest.raises(KeyError, match="title"):
+        parser.parse("")
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (None, None),
+        (dt.datetime(2024, 1, 2, 3, 4), dt.datetime(2024, 1, 2, 3, 4)),  # noqa: DTZ001
+        (dt.date(2024, 1, 2), dt.datetime(2024, 1, 2)),  # noqa: DTZ001
+        ("2024-01-02T03:04:05", dt.datetime(2024, 1, 2, 3, 4, 5)),  # noqa: DTZ001
+        (
+            "2024-01-02T03:04:05+02:00",
+            dt.datetime(2024, 1, 2, 1, 4, 5, tzinfo=dt.UTC),
+        ),
+        ("January 2, 2024", dt.datetime(2024, 1, 2)),  # noqa: DTZ001
+        ("not a date", None),
+    ],
+    ids=["none", "datetime", "date", "iso", "iso_tz", "fallback", "invalid"],
+)
+def test_parse_datetime(value: object, expected: dt.datetime | None) -> None:
+    """Test parsing frontmatter date values."""
+    assert parse_datetime(value) == expected
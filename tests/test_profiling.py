@@ -0,0 +1,67 @@
+"""Test cases for the build profiler."""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from mackerel import profiling
+
+
+def _task(n: int) -> int:
+    with profiling.span("task", "document", str(n)):
+        return n * 2
+
+
+def test_span_without_profiler() -> None:
+    """Test that spans are not recorded when not profiling."""
+    assert profiling.active() is None
+    with profiling.span("task", "document", "1"):
+        pass
+    assert profiling.active() is None
+
+
+def test_profiler_report() -> None:
+    """Test the totals of the phases and the slowest files."""
+    profiler = profiling.Profiler()
+    with profiling.profiling(profiler), profiling.span("build", "phase"):
+        for n in (1, 2, 1):
+            _task(n)
+    assert profiling.active() is None
+    assert [span.name for span in profiler.spans] == ["task"] * 3 + ["build"]
+    totals = profiler.totals(lambda s: s.label if s.category == "document" else None)
+    assert {total.key: total.count for total in totals} == {"1": 2, "2": 1}
+    report = profiler.report(top=1)
+    assert "Phases:\n  build " in report
+    assert "Slowest documents (top 1):" in report
+    assert "Slowest templates" not in report
+
+
+def test_profiler_trace() -> None:
+    """Test the conversion to Chrome trace events."""
+    profiler = profiling.Profiler()
+    with profiling.profiling(profiler):
+        _task(1)
+    (event,) = profiler.trace()["traceEvents"]
+    assert event["name"] == "task 1"
+    assert event["cat"] == "document"
+    assert event["ph"] == "X"
+    assert event["ts"] == 0
+
+
+def test_collect_worker_spans() -> None:
+    """Test that the spans recorded in worker processes are collected."""
+    profiler = profiling.Profiler()
+    with (
+        profiling.profiling(profiler),
+        ProcessPoolExecutor(
+            max_workers=2,
+            initializer=profiling.init_worker,
+            initargs=(True,),
+        ) as executor,
+    ):
+        results = list(
+            profiling.collect(
+                executor.map(partial(profiling.call_in_worker, _task), [1, 2, 3])
+            )
+        )
+    assert results == [2, 4, 6]
+    assert sorted(span.label for span in profiler.spans) == ["1", "2", "3"]
@@ -1,5 +1,6 @@
 """Tests for the renderers module."""
 
+import pickle
 import textwrap
 from pathlib import Path
 
@@ -72,3 +73,160 @@ def test_jinja2_renderer(tmp_path: Path) -> None:
         "<!doctype html><meta charset=utf-8><title></title><h1>Test Document</h1>"
     )
     assert rendered_html == t.HTML(expected_html)
+
+
+def test_markdown_renderer_cache_key() -> None:
+    """Test that the cache key changes with the renderer config."""
+    renderer = MarkdownRenderer(MarkdownRendererConfig())
+    assert (
+        renderer.cache_key() == MarkdownRenderer(MarkdownRendererConfig()).cache_key()
+    )
+    assert (
+        renderer.cache_key()
+        != MarkdownRenderer(MarkdownRendererConfig(output_format="xhtml")).cache_key()
+    )
+
+
+def test_renderers_pickle_settings_only(tmp_path: Path) -> None:
+    """Test that renderers are rebuilt from their settings when unpickled."""
+    markdown_renderer = MarkdownRenderer(MarkdownRendererConfig())
+    restored_markdown = pickle.loads(pickle.dumps(markdown_renderer))  # noqa: S301
+    assert restored_markdown.md is not markdown_renderer.md
+    assert restored_markdown.render("*hi*") == markdown_renderer.render("*hi*")
+
+    template_path = t.TemplatePath(tmp_path)
+    (template_path / "page.html").write_text("{{ document.html }}")
+    jinja2_renderer = Jinja2Renderer(
+        template_path=template_path,
+        template_suffix=t.TemplateSuffix(".html"),
+        cfg=Jinja2RendererConfig(),
+    )
+    restored_jinja2 = pickle.loads(pickle.dumps(jinja2_renderer))  # noqa: S301
+    assert restored_jinja2.env is not jinja2_renderer.env
+    document = t.RenderedDocument(
+        url=t.RelativeURL("/page.html"),
+        html=t.HTML("<p>page</p>"),
+        metadata=t.DocumentMetadata(title=t.Title("Page"), template=Path("page")),
+    )
+    assert restored_jinja2.render(t.TemplateContext(), document) == "<p>page</p>"
+
+
+def test_jinja2_renderer_dependencies(tmp_path: Path) -> None:
+    """Test that template dependencies are found through the Jinja2 AST."""
+    template_path = t.TemplatePath(tmp_path)
+    (template_path / "partials").mkdir()
+    (template_path / "base.html").write_text(
+        '{% import "partials/macros.html" as m %}{% block body %}{% endblock %}'
+    )
+    (template_path / "partials" / "macros.html").write_text(
+        '{% from "partials/nav.html" import nav %}'
+    )
+    (template_path / "partials" / "nav.html").write_text(
+        "{% macro nav() %}{% endmacro %}"
+    )
+    (template_path / "page.html").write_text(
+        '{% extends "base.html" %}{% block body %}'
+        '{% include ["missing.html", "partials/nav.html"] %}{% endblock %}'
+    )
+    (template_path / "dynamic.html").write_text("{% include document.partial %}")
+    (template_path / "broken.html").write_text("{% if %}")
+    renderer = Jinja2Renderer(
+        template_path=template_path,
+        template_suffix=t.TemplateSuffix(".html"),
+        cfg=Jinja2RendererConfig(),
+    )
+    assert renderer.dependencies(Path("page")) == {
+        Path("page.html"),
+        Path("base.html"),
+        Path("missing.html"),
+        Path("partials/macros.html"),
+        Path("partials/nav.html"),
+    }
+    assert renderer.dependencies(Path("partials/nav")) == {Path("partials/nav.html")}
+    assert renderer.dependencies(Path("dynamic")) is None
+    assert renderer.dependencies(Path("broken")) is None
+
+
+def test_jinja2_renderer_load(tmp_path: Path) -> None:
+    """Test that load compiles all templates and picks up changed ones."""
+    template_path = t.TemplatePath(tmp_path / "templates")
+    (template_path / "partials").mkdir(parents=True)
+    (template_path / "page.html").write_text('{% include "partials/nav.html" %}')
+    (template_path / "partials" / "nav.html").write_text("<nav></nav>")
+    (template_path / "broken.html").write_text("{% if %}")
+    cache_path = tmp_path / "cache"
+    renderer = Jinja2Renderer(
+        template_path=template_path,
+        template_suffix=t.TemplateSuffix(".html"),
+        cfg=Jinja2RendererConfig(),
+        cache_path=cache_path,
+    )
+    renderer.load()
+    assert set(renderer.templates) == {Path("page"), Path("partials/nav")}
+    assert list(cache_path.iterdir())
+    document = t.RenderedDocument(
+        url=t.RelativeURL("/page.html"),
+        html=t.HTML(""),
+        metadata=t.DocumentMetadata(title=t.Title("Page"), template=Path("page")),
+    )
+    assert renderer.render(t.TemplateContext(), document) == "<nav></nav>"
+
+    (template_path / "partials" / "nav.html").write_text("<nav>Home</nav>")
+    assert renderer.render(t.TemplateContext(), document) == "<nav></nav>"
+    renderer.load()
+    assert renderer.render(t.TemplateContext(), document) == "<nav>Home</nav>"
+
+
+def test_jinja2_renderer_without_bytecode_cache(tmp_path: Path) -> None:
+    """Test that the bytecode cache can be disabled in the config."""
+    template_path = t.TemplatePath(tmp_path / "templates")
+    template_path.mkdir()
+    renderer = Jinja2Renderer(
+        template_path=template_path,
+        template_suffix=t.TemplateSuffix(".html"),
+        cfg=Jinja2RendererConfig(bytecode_cache=False),
+        cache_path=tmp_path / "cache",
+    )
+    assert renderer.env.bytecode_cache is None
+    assert not (tmp_path / "cache").exists()
+
+
+def test_jinja2_renderer_stream(tmp_path: Path) -> None:
+    """Test that the streamed chunks add up to the rendered page."""
+    template_path = t.TemplatePath(tmp_path)
+    (template_path / "list.html").write_text(
+        "<ul>{% for i in range(3) %}<li>{{ i }}</li>{% endfor %}</ul>"
+    )
+    renderer = Jinja2Renderer(
+        template_path=template_path,
+        template_suffix=t.TemplateSuffix(".html"),
+        cfg=Jinja2RendererConfig(),
+    )
+    document = t.RenderedDocument(
+        url=t.RelativeURL("/list.html"),
+        html=t.HTML(""),
+        metadata=t.DocumentMetadata(title=t.Title("List"), template=Path("list")),
+    )
+    chunks = list(renderer.stream(t.TemplateContext(), document))
+    assert len(chunks) > 1
+    assert "".join(chunks) == renderer.render(t.TemplateContext(), document)
+
+
+def test_jinja2_renderer_asset_url(tmp_path: Path) -> None:
+    """Test that asset_url links to the build paths of the assets."""
+    template_path = t.TemplatePath(tmp_path)
+    (template_path / "page.html").write_text(
+        "{{ asset_url('assets/styles.css') }} {{ asset_url('/missing.js') }}"
+    )
+    renderer = Jinja2Renderer(
+        template_path=template_path,
+        template_suffix=t.TemplateSuffix(".html"),
+        cfg=Jinja2RendererConfig(),
+    )
+    document = t.RenderedDocument(
+        url=t.RelativeURL("/page.html"),
+        html=t.HTML(""),
+        metadata=t.DocumentMetadata(title=t.Title("Page"), template=Path("page")),
+    )
+    ctx = t.TemplateContext(assets={"assets/styles.css": "assets/styles.0123.css"})
+    assert renderer.render(ctx, document) == "/assets/styles.0123.css /missing.js"
@@ -0,0 +1,51 @@
+"""Test cases for the document store."""
+
+import pickle
+from pathlib import Path
+
+from mackerel import types as t
+from mackerel.store import DocumentStore
+from mackerel.store import document_metadata
+
+
+def _doc(title: str, html: str) -> t.RenderedDocument:
+    return t.RenderedDocument(
+        url=t.RelativeURL(f"/{title}.html"),
+        html=t.HTML(html),
+        metadata=t.DocumentMetadata(title=t.Title(title), template=Path("page")),
+    )
+
+
+def test_document_store(tmp_path: Path) -> None:
+    """Test that documents are loaded back from the store file."""
+    first = t.BuildPath(tmp_path / "first.html")
+    second = t.BuildPath(tmp_path / "second.html")
+    empty = t.BuildPath(tmp_path / "empty.html")
+    with DocumentStore.temporary() as docs:
+        docs.add(first, _doc("first", "<p>First ünïcode</p>"))
+        docs.add(empty, _doc("empty", ""))
+        assert docs[first] == _doc("first", "<p>First ünïcode</p>")
+        # Documents added after the store was read are mapped again
+        docs.add(second, _doc("second", "<p>Second</p>"))
+        assert docs[second] == _doc("second", "<p>Second</p>")
+        assert docs[empty] == _doc("empty", "")
+        assert docs.metadata(second).title == "second"
+        assert document_metadata(docs, second).title == "second"
+
+        docs.reorder([second, first])
+        assert list(docs) == [second, first]
+        assert len(docs) == 2
+
+        restored = pickle.loads(pickle.dumps(docs))  # noqa: S301
+        assert restored[first] == docs[first]
+        restored.close()
+        store_path = docs.path
+        assert store_path.exists()
+    assert not store_path.exists()
+
+
+def test_document_metadata_of_mapping(tmp_path: Path) -> None:
+    """Test that the metadata of documents in other mappings is returned."""
+    target_path = t.BuildPath(tmp_path / "doc.html")
+    docs = {target_path: _doc("doc", "<p>Doc</p>")}
+    assert document_metadata(docs, target_path).title == "doc"